@@ -20,14 +20,19 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import copy
+import functools
+
 from problog.evaluator import Semiring
 from problog.engine import DefaultEngine
 from problog.program import PrologString
-from problog import get_evaluatable
+from problog.formula import LogicFormula
 import mpmath
+from SLProbLog.parser import convert_labels, structure_key
+from SLProbLog.backends import BACKENDS, compile_formula, default_selector
+from SLProbLog.governor import ResourceBudgetExceeded, SizeBudgetExceeded, supervise
 
 EPSILON = 10e-100
-mpmath.dps = 200
 
 def from_sl_opinion(wb, W = 2):
     prior = mpmath.mpf(W)
@@ -67,15 +72,30 @@ def moment_matching(b):
 
 class BetaDistribution():
 
+    __slots__ = ("_mu", "_var")
+
+    _epsilon = EPSILON
+    _ZERO = mpmath.mpf("0")
+    _ONE = mpmath.mpf("1")
+
     def __init__(self, m, v):
-        self._epsilon = EPSILON
-        self._ZERO = mpmath.mpf("0")
-        self._ONE = mpmath.mpf("1")
-        self._mu = mpmath.mpf(m)
-        self._var = mpmath.mpf(v)
+        # the distribution computes in the mpmath context of its mean: the global one, or the private context of a
+        # semiring needing more digits (see precision.py), which is never changed by another thread
+        mp = getattr(m, "context", mpmath.mp)
+        self._mu = mp.mpf(m)
+        self._var = mp.mpf(v)
+
+    def __getstate__(self):
+        return (self._mu, self._var)
+
+    def __setstate__(self, state):
+        # pickles created before __slots__ store the whole instance dictionary
+        if isinstance(state, dict):
+            state = (state["_mu"], state["_var"])
+        self._mu, self._var = state
 
     def is_complete_belief(self):
-        if mpmath.almosteq(self.mean(), self._ONE, self._epsilon):
+        if self._mu.context.almosteq(self.mean(), self._ONE, self._epsilon):
             return True
         return False
 
@@ -87,16 +107,16 @@ class BetaDistribution():
 
     def strength(self):
         var = self.variance()
-        if mpmath.almosteq(var, 0, self._epsilon):
-            var = mpmath.mpf(self._epsilon)
+        if self._mu.context.almosteq(var, 0, self._epsilon):
+            var = self._mu.context.mpf(self._epsilon)
 
         return (self.mean() * (1 - self.mean())) / var - 1
 
     def alpha(self):
-        return max(mpmath.mpf(self._epsilon), self.mean() * self.strength())
+        return max(self._mu.context.mpf(self._epsilon), self.mean() * self.strength())
 
     def beta(self):
-        return max(mpmath.mpf(self._epsilon), (1 - self.mean()) * self.strength())
+        return max(self._mu.context.mpf(self._epsilon), (1 - self.mean()) * self.strength())
 
     def sum(self, Y):
         mean = self.mean() + Y.mean()
@@ -128,26 +148,28 @@ class BetaDistribution():
 
         product = self.product(BetaDistribution(muneg, varneg))
 
-        if self._mu <= 0:
-            self._mu = mpmath.mpf(1e-10)
+        # self is left untouched: distributions may be shared between threads
+        mu = self._mu
+        if mu <= 0:
+            mu = self._mu.context.mpf(1e-10)
 
         if muneg <= 0:
-            muneg = mpmath.mpf(1e-10)
+            muneg = self._mu.context.mpf(1e-10)
 
-        var = mean**2 * (1.0-mean)**2 * ((self.variance() / (self._mu ** 2)) + (varneg / (muneg ** 2)) - 2 * (product.variance() / (self._mu * muneg)))
+        var = mean**2 * (1.0-mean)**2 * ((self.variance() / (mu ** 2)) + (varneg / (muneg ** 2)) - 2 * (product.variance() / (mu * muneg)))
 
         var = min(var, mean ** 2 * (1.0 - mean) / (1.0 + mean), (1.0 - mean) ** 2 * mean / (2 - mean))
 
         return BetaDistribution(mean, var)
 
     def __repr__(self):
-        return "b(%s,%s)" % (mpmath.nstr(self.mean(), mpmath.mp.dps), mpmath.nstr(self.variance(), mpmath.mp.dps))
+        return "b(%s,%s)" % (self.mean_str(), self.variance_str())
 
     def mean_str(self):
-        return mpmath.nstr(self.mean(), mpmath.mp.dps)
+        return mpmath.nstr(self.mean(), self._mu.context.dps)
 
     def variance_str(self):
-        return mpmath.nstr(self.variance(), mpmath.mp.dps)
+        return mpmath.nstr(self.variance(), self._mu.context.dps)
 
     def to_sl_opinion(self, a = 1/2, W=2):
         rx = max(mpmath.mpf(0), self.alpha() - a * W)
@@ -156,10 +178,20 @@ class BetaDistribution():
 
 class SLSemiring(Semiring):
 
+    _mp = mpmath.mp
+
+    def __init__(self, mp = None):
+        """
+        :param mp: mpmath context of the computation (e.g. a private mpmath.MPContext with more digits), by default
+        the global one, whose precision this package never changes
+        """
+        if mp is not None:
+            self._mp = mp
+
     def parse(self, w):
         start = w.find('(') + 1
         end = w.find(')')
-        return [mpmath.mpf(x) for x in w[start:end].replace(" ","").split(',')]
+        return [self._mp.mpf(x) for x in w[start:end].replace(" ","").split(',')]
 
     def one(self):
         return "w(1.0, 0.0, 0.0, 1.0)"
@@ -170,6 +202,13 @@ class SLSemiring(Semiring):
     def plus(self, x, y):
         [b1,d1,u1,a1] = self.parse(x)
         [b2,d2,u2,a2] = self.parse(y)
+
+        # zero() is the identity: the general formula would divide 0 by 0 when both base rates are 0
+        if [b1, d1, u1, a1] == [0, 1, 0, 0]:
+            return y
+        if [b2, d2, u2, a2] == [0, 1, 0, 0]:
+            return x
+
         u = (a1 * u1 + a2 * u2) / (a1 + a2)
         d = max(0.0, (a1 * (d1 - b2) + a2 * (d2 - b1)) / (a1 + a2))
         b = min(b1 + b2, 1.0)
@@ -179,6 +218,13 @@ class SLSemiring(Semiring):
     def times(self, x, y):
         [b1, d1, u1, a1] = self.parse(x)
         [b2, d2, u2, a2] = self.parse(y)
+
+        # one() is the identity: the general formula would divide 0 by 0 when both base rates are 1
+        if [b1, d1, u1, a1] == [1, 0, 0, 1]:
+            return y
+        if [b2, d2, u2, a2] == [1, 0, 0, 1]:
+            return x
+
         a = a1 * a2
         b = b1 * b2 + ((1 - a1) * a2 * b1 * u2 + a1 * (1 - a2) * u1 * b2) / (1 - a1 * a2)
         u = u1 * u2 + ((1 - a2) * b1 * u2 + (1 - a1) * u1 * b2) / (1 - a1 * a2)
@@ -225,10 +271,19 @@ class SLSemiring(Semiring):
 
 class BetaSemiring(Semiring):
 
+    _mp = mpmath.mp
+
+    def __init__(self, mp = None):
+        """
+        :param mp: mpmath context of the computation, see SLSemiring
+        """
+        if mp is not None:
+            self._mp = mp
+
     def parse(self, w):
         start = str(w).find('(') + 1
         end = str(w).find(')')
-        parsed = [mpmath.mpf(x) for x in str(w)[start:end].replace(" ","").split(',')]
+        parsed = [self._mp.mpf(x) for x in str(w)[start:end].replace(" ","").split(',')]
         return BetaDistribution(parsed[0], parsed[1])
 
     def one(self):
@@ -271,56 +326,68 @@ class BetaSemiring(Semiring):
 
 
 
+def _supervised_run(slproblog, mode, selection):
+    """
+    Body of the child processes of SLProbLog._governed
+    :return: the results of the request, the statistics of the evaluation and the backends selected (see _compile)
+    """
+    threshold, top_k = selection if selection is not None else (None, None)
+    res = slproblog.run_SL(threshold, top_k) if mode == "SL" else slproblog.run_beta(threshold, top_k)
+    return res, slproblog.stats, slproblog._selections
+
+
 class SLProbLog:
 
-    def __init__(self, program, sloutput = False):
+    def __init__(self, program, sloutput = False, backend = None, selector = None, low_memory = False,
+                 adaptive_precision = None, cache = None, budget = None, fallback = None, cancel = None,
+                 simplify = False):
+        """
+        :param program: SLProbLog program
+        :param sloutput: whether the results are SL opinions rather than Beta distributions
+        :param backend: knowledge compilation backend: one of BACKENDS, "auto" to choose it by trial compilation,
+        or None to let ProbLog choose
+        :param selector: BackendSelector used by "auto", by default the one shared by the whole process
+        :param low_memory: evaluate run_SL and run_beta on a d-DNNF keeping alive only the node values still to be
+        consumed (see Circuit.evaluate), at the cost of one traversal per query; the backend is then ignored and the
+        peak number of live values is reported in stats
+        :param adaptive_precision: if given, run_SL and run_beta evaluate the d-DNNF in float64, recomputing in mpmath
+        with this many digits only the ill-conditioned operations and what depends on them (see precision.py); the
+        number of escalated nodes is reported in stats
+        :param cache: ResultCache (see cache.py) consulted by run_SL and run_beta before evaluating the program
+        :param budget: governor.Budget: run_SL and run_beta then ground, compile and evaluate in a supervised child
+        process, raising a governor.ResourceBudgetExceeded when a limit is exceeded
+        :param fallback: function (program, mode, sloutput, error) returning the results when the budget is exceeded,
+        e.g. governor.vacuous
+        :param cancel: threading.Event cancelling the supervised evaluation when set
+        :param simplify: evaluate on a d-DNNF from which the one and zero weights (e.g. of the atoms introduced by the
+        compiler and of the evidence) have been folded away (see Circuit.simplify); the backend is then ignored and
+        the sizes before and after are reported in stats. The results are unchanged; run_beta, whose semiring cannot
+        be folded exactly, evaluates the circuit as compiled
+        """
+        if low_memory and adaptive_precision is not None:
+            raise Exception("low_memory and adaptive_precision cannot be combined")
+
+        if backend not in (None, "auto") + BACKENDS:
+            raise Exception("Unknown backend: %s" % backend)
+
         self._slproblog_program = program
         self._slout = sloutput
+        self._backend = backend
+        self._selector = selector if selector is not None else default_selector
+        self._low_memory = low_memory
+        self._adaptive_precision = adaptive_precision
+        self._cache = cache
+        self._budget = budget
+        self._fallback = fallback
+        self._cancel = cancel
+        self._simplify = simplify
+        self._supervised = False
+        # (structure key, semiring, choice) of the backends selected by "auto", for the parent of a supervised run
+        self._selections = []
+        self.stats = {}
 
     def _convert_input(self, to_sl = False, to_beta = False):
-        if to_sl and to_beta:
-            raise Exception("Cannot convert both to SL and to Beta")
-
-        lines = self._slproblog_program.splitlines()
-        newlines = []
-        for l in lines:
-            label_prolog = l.split("::")
-            if len(label_prolog) == 1:
-                newlines.append(l)
-            elif len(label_prolog) == 2:
-                if to_sl:
-                    if label_prolog[0][0] == "b":
-                        b = BetaSemiring().parse(label_prolog[0])
-                        wb = b.to_sl_opinion()
-                        newlines.append("w(%s,%s,%s,%s)::%s" % (mpmath.nstr(wb[0]),
-                                                                mpmath.nstr(wb[1]),
-                                                                mpmath.nstr(wb[2]),
-                                                                mpmath.nstr(wb[3]),
-                                                                label_prolog[1]))
-
-                    elif label_prolog[0][0] == "w":
-                        newlines.append(l)
-
-                    else:
-                        raise Exception("Problem with this line: %s" % (l))
-
-
-                elif to_beta:
-                    if label_prolog[0][0] == "w":
-                        w = SLSemiring().parse(label_prolog[0])
-                        bw = from_sl_opinion(w)
-                        newlines.append("%s::%s" % (repr(bw), label_prolog[1]))
-
-                    elif label_prolog[0][0] == "b":
-                        newlines.append(l)
-
-                    else:
-                        raise Exception("Problem with this line: %s" % (l))
-
-            else:
-                raise Exception("Problem with this line: %s" % (l))
-
-        return "\n".join(newlines)
+        return convert_labels(self._slproblog_program, to_sl=to_sl, to_beta=to_beta)
 
     def _convert_output(self, res, to_sl = False, to_beta = False):
         if to_sl and to_beta:
@@ -336,47 +403,367 @@ class SLProbLog:
         return ret
 
 
-    def run_SL(self):
+    def run_SL(self, threshold = None, top_k = None):
+        """
+        :param threshold: if given, only the queries whose result has an expected value of at least threshold are
+        returned: b + u * a for the opinions computed by the SL operators, the mean for the Beta distributions computed
+        by the Beta operators (before any conversion to the output form)
+        :param top_k: if given, only the top_k queries with the largest expected value are returned, in decreasing
+        order of expected value
+        With threshold or top_k the program is compiled into a d-DNNF whatever the backend, and the queries that cannot
+        qualify are excluded by cheap float64 bounds (see bounds.py) before any exact evaluation; their number is
+        reported in stats
+        """
+        if threshold is None and top_k is None:
+            return self._run("SL", self._run_SL)
+        semiring = SLSemiring()
+        return self._run("SL", lambda: self._run_selected(semiring, self._convert_input(to_sl = True),
+                                                          None if self._slout else from_sl_opinion,
+                                                          threshold, top_k),
+                         (threshold, top_k))
+
+    def run_beta(self, threshold = None, top_k = None):
+        """
+        :param threshold: see run_SL
+        :param top_k: see run_SL
+        """
+        if threshold is None and top_k is None:
+            return self._run("beta", self._run_beta)
+        semiring = BetaSemiring()
+        return self._run("beta", lambda: self._run_selected(semiring, self._convert_input(to_beta = True),
+                                                            (lambda b: b.to_sl_opinion()) if self._slout else None,
+                                                            threshold, top_k),
+                         (threshold, top_k))
+
+    def _run_SL(self):
         res = self._run_sl_operators_on_semiring(SLSemiring(), self._convert_input(to_sl = True))
         if self._slout:
             return res
         return self._convert_output(res, to_beta = True)
 
-    def run_beta(self):
+    def _run_beta(self):
         res = self._run_sl_operators_on_semiring(BetaSemiring(), self._convert_input(to_beta = True))
         if self._slout:
             return self._convert_output(res, to_sl=True)
         return res
 
+    def iter_SL(self, sort = False):
+        """
+        Streaming counterpart of run_SL: each query result is yielded as soon as it has been computed, without
+        building the dictionary of all the results. The program is compiled into a d-DNNF whatever the backend, and
+        low_memory is honoured; the cache and the budget are not used.
+        :param sort: yield the queries in the order of their names rather than in the order of the program
+        :return: generator of (query, result)
+        """
+        semiring = SLSemiring()
+        return self._iterate(semiring, self._convert_input(to_sl = True), None if self._slout else from_sl_opinion,
+                             sort)
+
+    def iter_beta(self, sort = False):
+        """
+        Streaming counterpart of run_beta, see iter_SL
+        """
+        semiring = BetaSemiring()
+        return self._iterate(semiring, self._convert_input(to_beta = True),
+                             (lambda b: b.to_sl_opinion()) if self._slout else None, sort)
+
+    def _iterate(self, semiring, program, convert, sort):
+        circuit = self._circuit(semiring, program)
+        if sort:
+            circuit.queries = sorted(circuit.queries, key = lambda q: q[0])
+        for k, v in circuit.evaluate(semiring, bounded = self._low_memory):
+            res = self._parse_value(semiring, v)
+            yield k, res if convert is None else convert(res)
+        if self._low_memory:
+            self.stats["peak_live_values"] = circuit.peak_live
+
+    def _run_selected(self, semiring, program, convert, threshold, top_k):
+        from SLProbLog import bounds
+
+        circuit = self._circuit(semiring, program)
+        keep = bounds.candidates(bounds.query_bounds(circuit, semiring), threshold, top_k)
+        self.stats["pruned_queries"] = len(circuit.queries) - len(keep)
+        circuit.queries = [q for q in circuit.queries if q[0] in keep]
+
+        res = {}
+        value = {}
+        for k, v in circuit.evaluate(semiring, bounded = self._low_memory):
+            v = self._parse_value(semiring, v)
+            value[k] = bounds.expected_value(v)
+            res[k] = v if convert is None else convert(v)
+        if threshold is not None:
+            res = {k: v for k, v in res.items() if value[k] >= threshold}
+        if top_k is not None:
+            return {k: res[k] for k in sorted(res, key = lambda k: (-value[k], k))[:top_k]}
+        return self._order_dicts(res)
+
+    def _run(self, mode, compute, selection = None):
+        try:
+            return self._cached(mode, lambda: self._governed(mode, compute, selection), selection)
+        except ResourceBudgetExceeded as e:
+            if self._fallback is None:
+                raise
+            self.stats["fallback"] = str(e)
+            return self._fallback(self._slproblog_program, mode, self._slout, e)
+
+    def _governed(self, mode, compute, selection = None):
+        if self._budget is None or self._supervised:
+            return compute()
+
+        # the child reruns the request on a copy, which can be pickled for processes that are not forked; it keeps the
+        # budget for the circuit size check of _compile_with
+        child = copy.copy(self)
+        child._cache = child._fallback = child._cancel = None
+        child._supervised = True
+        child._selections = []
+        child.stats = {}
+        res, stats, selections = supervise(functools.partial(_supervised_run, child, mode, selection), self._budget,
+                                           self._cancel)
+        # the trials made in the child are not repeated by the next requests
+        for key, semiring, choice in selections:
+            self._selector.record(key, semiring, choice)
+        self.stats.update(stats)
+        return res
+
+    def _cached(self, mode, compute, selection = None):
+        if self._cache is None:
+            return compute()
+
+        key = (mode, self._slout, self._backend, self._low_memory, self._adaptive_precision, self._simplify)
+        if selection is not None:
+            key += (selection,)
+        key = self._cache.key(self._slproblog_program, key)
+        res, hit = self._cache.get_or_compute(key, compute)
+        self.stats["cache"] = "hit" if hit else "miss"
+        return res
+
+
+    def run_montecarlo(self, samples = 1000, quantiles = (0.05, 0.5, 0.95), seed = None):
+        """
+        Propagates the uncertainty by sampling the leaf Beta distributions (SL opinions are converted with
+        from_sl_opinion) and evaluating the compiled circuit once on all the samples.
+        :return: dictionary query -> MonteCarloResult with empirical mean, variance and quantiles
+        """
+        from SLProbLog.montecarlo import run_montecarlo
+
+        semiring = BetaSemiring()
+        circuit = self._circuit(semiring, self._convert_input(to_beta = True), simplify = False)
+        return self._order_dicts(run_montecarlo(circuit, samples, quantiles, seed))
+
+    def learn(self, examples, max_iterations = 100, tolerance = 1e-6, W = 2, batch_size = 10000):
+        """
+        Estimates the labels of the program from partially observed examples by expectation maximisation, evaluating
+        all the examples on a single compiled circuit at each iteration (see learning.py).
+        :param examples: list of interpretations, each a dictionary atom -> True/False
+        :return: LearningResult, whose program has the learned labels
+        """
+        from SLProbLog.learning import Learner
+
+        learner = Learner(self._slproblog_program, examples, W, batch_size)
+        result = learner.run(max_iterations, tolerance)
+        self.stats.update(learner.stats)
+        self.stats["learning_iterations"] = result.iterations
+        return result
+
+    def run_conditional(self, requests, sl = False):
+        """
+        Evaluates each query given its own evidence, as run_SL (or run_beta) would on the program with that evidence
+        added, but grounding and compiling a single d-DNNF over all the atoms involved (whatever the backend): the
+        evidence is then just an assignment of the weights of its atoms, and the weight of each distinct evidence set
+        is evaluated once for all the queries sharing it; their number is reported in stats. The cache, the budget,
+        low_memory and adaptive_precision are not used.
+        :param requests: list of (query, evidence) pairs, the evidence being a dictionary (or iterable of pairs)
+        atom -> True/False, in addition to the evidence of the program
+        :param sl: use the SL operators rather than the Beta-based ones
+        :return: list of the result of each request
+        """
+        from problog.logic import Term
+
+        def atom(a):
+            return str(Term.from_string(str(a)))
+
+        requests = [(atom(q), {atom(a): bool(v) for a, v in dict(e).items()}) for q, e in requests]
+        if sl:
+            semiring = SLSemiring()
+            program = self._convert_input(to_sl = True)
+            convert = None if self._slout else from_sl_opinion
+        else:
+            semiring = BetaSemiring()
+            program = self._convert_input(to_beta = True)
+            convert = (lambda b: b.to_sl_opinion()) if self._slout else None
+
+        atoms = sorted({q for q, e in requests} | {a for q, e in requests for a in e})
+        circuit = self._circuit(semiring, program + "".join("\nquery(%s)." % a for a in atoms))
+        labeled = dict(circuit.queries)
+
+        literals = []
+        for q, e in requests:
+            evidence = []
+            for a, value in sorted(e.items()):
+                ref = labeled[a]
+                if ref == 0 or ref is None:
+                    # deterministic atom: the evidence is either always satisfied or impossible
+                    if (ref == 0) != value:
+                        raise Exception("Inconsistent evidence: %s" % a)
+                    continue
+                evidence.append((a, ref if value else -ref))
+            literals.append((labeled[q], evidence))
+
+        res = []
+        for v in circuit.conditional(semiring, literals):
+            v = self._parse_value(semiring, v)
+            res.append(v if convert is None else convert(v))
+        self.stats["evidence_evaluations"] = circuit.evidence_evaluations
+        return res
+
+    def anytime(self, sl = False):
+        """
+        Approximate inference for programs too large to compile: lower and upper bounds of each query are computed
+        by iterative deepening of the ground program (see anytime.py), and can be read at any time.
+        :param sl: use the SL operators rather than the Beta-based ones
+        :return: AnytimeInference, to be run with run(time_budget) or start(time_budget)
+        """
+        from SLProbLog.anytime import AnytimeInference
+
+        if sl:
+            semiring = SLSemiring()
+            ground = self._ground(self._convert_input(to_sl = True))
+            parse = semiring.parse if self._slout else lambda v: from_sl_opinion(semiring.parse(v))
+        else:
+            semiring = BetaSemiring()
+            ground = self._ground(self._convert_input(to_beta = True))
+
+            def parse(v):
+                b = semiring.parse(v)
+                # the trivial bounds 0 and 1 cannot be moment matched
+                if 0 < b.mean() < 1:
+                    b = moment_matching(b)
+                return b.to_sl_opinion() if self._slout else b
+        backend = self._backend if self._backend in BACKENDS else None
+        if sl and backend is None:
+            # the SL operators divide by zero on the x or not x nodes that smooth SDDs
+            backend = "ddnnf"
+        return AnytimeInference(semiring, ground, parse, backend)
+
+    def run_anytime(self, time_budget, sl = False):
+        """
+        :return: dictionary query -> Bounds(lower, upper) reached within time_budget seconds
+        """
+        inference = self.anytime(sl)
+        res = inference.run(time_budget)
+        self.stats["anytime_depth"] = inference.depth
+        self.stats["anytime_exact"] = inference.exact
+        return res
+
+    def run_fused(self):
+        """
+        Evaluates a program labelled with f(probability, w(b,d,u,a)) once, computing for each query the exact
+        probability, the result of run_SL and the result of run_beta.
+        :return: dictionary query -> FusedResult(probability, SL opinion, Beta distribution)
+        """
+        from SLProbLog.fused import FusedSemiring
+
+        semiring = FusedSemiring()
+        formula = self._compile(semiring, self._ground(self._slproblog_program))
+        return self._order_dicts(formula.evaluate(semiring=semiring))
+
+    def export_circuit(self, filename = None):
+        """
+        Compiles the program, with its labels converted to Beta distributions, into a flat Circuit that pool workers
+        can load (Circuit.load) or attach to (Circuit.attach) without recompiling, e.g. to run
+        montecarlo.run_montecarlo on it.
+        :param filename: if given, the circuit is also saved there (see Circuit.save)
+        :return: the Circuit
+        """
+        circuit = self._circuit(BetaSemiring(), self._convert_input(to_beta = True), simplify = False)
+        if filename is not None:
+            circuit.save(filename)
+        return circuit
 
     def _run_sl_operators_on_semiring(self, givensemiring, program = None):
-        engine = DefaultEngine()
         if program == None:
             program = self._slproblog_program
 
-        db = engine.prepare(PrologString(program))
         semiring = givensemiring
-        knowledge = get_evaluatable(None, semiring=semiring)
-        formula = knowledge.create_from(db, engine=engine, database=db)
-        res = formula.evaluate(semiring=semiring)
+        if self._adaptive_precision is not None:
+            return self._evaluate_adaptive(semiring, program)
 
-        ret = {}
-        for k, v in res.items():
-            if isinstance(semiring, BetaSemiring):
-                ret[k] = moment_matching(semiring.parse(v))
-            else:
-                ret[k] = semiring.parse(v)
+        if self._low_memory:
+            circuit = self._circuit(semiring, program)
+            res = self._parse_results(semiring, circuit.evaluate(semiring, bounded = True))
+            self.stats["peak_live_values"] = circuit.peak_live
+            return res
 
-        return self._order_dicts(ret)
+        if self._simplify:
+            return self._parse_results(semiring, self._circuit(semiring, program).evaluate(semiring))
 
+        formula = self._compile(semiring, self._ground(program))
+        return self._evaluate(semiring, formula)
 
-    def _order_dicts(self, dicinput):
-        res = {}
-        for k, v in dicinput.items():
-            res[str(k)] = v
+    def _ground(self, program):
+        engine = DefaultEngine()
+        db = engine.prepare(PrologString(program))
+        return LogicFormula.create_from(db, engine=engine, database=db)
+
+    def _compile(self, semiring, ground):
+        backend = self._backend
+        if backend == "auto":
+            key = structure_key(self._slproblog_program)
+            choice = self._selector.select(key, semiring, ground)
+            if self._supervised:
+                self._selections.append((key, semiring, choice))
+            backend, self.stats["backends"] = choice
+
+        return self._compile_with(backend, semiring, ground)
+
+    def _compile_with(self, backend, semiring, ground):
+        formula, compile_time, size = compile_formula(backend, semiring, ground)
+        if self._budget is not None and self._budget.size is not None and size > self._budget.size:
+            raise SizeBudgetExceeded(self._budget.size, size)
+        self.stats["backend"] = backend
+        self.stats["compile_time"] = compile_time
+        self.stats["circuit_size"] = size
+        return formula
+
+    def _circuit(self, semiring, program, simplify = True):
+        """
+        Grounds and compiles the program into a d-DNNF, whatever the chosen backend, and flattens it into a Circuit
+        :param simplify: whether the circuit may be simplified (if requested at construction), i.e. whether it is
+        evaluated with the weights of the program
+        """
+        from SLProbLog.circuit import Circuit
+
+        formula = self._compile_with("ddnnf", semiring, self._ground(program))
+        circuit = Circuit.from_formula(formula, semiring)
+        if simplify and self._simplify:
+            circuit, self.stats["simplification"] = circuit.simplify(semiring)
+        return circuit
+
+    def _evaluate_adaptive(self, semiring, program):
+        from SLProbLog import precision
+
+        if isinstance(semiring, BetaSemiring):
+            adaptive = precision.AdaptiveBetaSemiring(self._adaptive_precision)
+        else:
+            adaptive = precision.AdaptiveSLSemiring(self._adaptive_precision)
 
-        ret = {}
-        for k in sorted(res):
-            ret[k] = res[k]
+        circuit = self._circuit(adaptive, program)
+        res, escalated = precision.evaluate(circuit, adaptive)
+        self.stats["escalated_nodes"] = escalated
+        self.stats["escalations"] = adaptive.escalations
+        return self._parse_results(adaptive, res)
+
+    def _evaluate(self, semiring, formula):
+        return self._parse_results(semiring, formula.evaluate(semiring=semiring).items())
+
+    def _parse_value(self, semiring, v):
+        if isinstance(semiring, BetaSemiring):
+            return moment_matching(semiring.parse(v))
+        return semiring.parse(v)
 
-        return ret
\ No newline at end of file
+    def _parse_results(self, semiring, res):
+        return self._order_dicts({k: self._parse_value(semiring, v) for k, v in res})
+
+
+    def _order_dicts(self, dicinput):
+        return dict(sorted((str(k), v) for k, v in dicinput.items()))
\ No newline at end of file
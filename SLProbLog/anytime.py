@@ -0,0 +1,195 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import functools
+import threading
+import time
+from collections import namedtuple
+
+from problog import get_evaluatable
+from problog.formula import LogicDAG, LogicFormula
+from problog.logic import Term
+
+from SLProbLog.SLProbLog import BetaSemiring
+from SLProbLog.governor import Budget, TimeBudgetExceeded, supervise
+
+Bounds = namedtuple("Bounds", ["lower", "upper"])
+
+_EVIDENCE = Term("__evidence__")
+
+
+def truncate(ground, depth, upper):
+    """
+    Unfolds the ground program from its queries and evidence down to the given depth; the nodes below it are replaced
+    by true for an upper bound and by false for a lower bound (the other way round under a negation), so that each
+    query is implied by (upper=False) or implies (upper=True) its truncation.
+    :param ground: acyclic ground program (LogicDAG)
+    :param depth: number of levels of internal nodes kept
+    :param upper: whether to build the upper or the lower bound
+    :return: (acyclic LogicFormula whose queries are each query in conjunction with all the evidence, and a query
+    __evidence__ for the evidence alone; whether something has been truncated)
+    """
+    bound = LogicFormula()
+    atoms = {}
+    for k in range(1, len(ground) + 1):
+        node = ground.get_node(k)
+        if type(node).__name__ == "atom":
+            atoms[k] = bound.add_atom(node.identifier, node.probability, group=node.group, name=node.name,
+                                      cr_extra=False, is_extra=node.is_extra)
+
+    built = {}
+    truncated = [False]
+
+    def build(ref, level, upper):
+        if ref == 0 or ref is None:
+            return ref
+        if ref < 0:
+            return bound.negate(build(-ref, level, not upper))
+        if ref in atoms:
+            return atoms[ref]
+        if level == 0:
+            truncated[0] = True
+            return bound.TRUE if upper else bound.FALSE
+
+        if (ref, level, upper) not in built:
+            node = ground.get_node(ref)
+            children = [build(c, level - 1, upper) for c in node.children]
+            if type(node).__name__ == "conj":
+                built[(ref, level, upper)] = bound.add_and(children)
+            else:
+                built[(ref, level, upper)] = bound.add_or(children)
+        return built[(ref, level, upper)]
+
+    evidence = bound.add_and([build(node if value > 0 else ground.negate(node), depth, upper)
+                              for name, node, value in ground.evidence_all() if value != 0])
+    for name, node in ground.queries():
+        bound.add_query(name, bound.add_and([build(node, depth, upper), evidence]))
+    bound.add_query(_EVIDENCE, evidence)
+    return bound, truncated[0]
+
+
+def _evaluate(semiring, ground, backend, depth):
+    res = {}
+    truncated = False
+    for upper in (False, True):
+        bound, t = truncate(ground, depth, upper)
+        truncated = truncated or t
+        formula = get_evaluatable(backend, semiring=semiring).create_from(bound)
+        res[upper] = {str(k): v for k, v in formula.evaluate(semiring=semiring).items()}
+    return res, truncated
+
+
+def _expectation(semiring, value):
+    if isinstance(semiring, BetaSemiring):
+        return semiring.parse(value).mean()
+    b, d, u, a = semiring.parse(value)
+    return b + u * a
+
+
+class AnytimeInference:
+    """
+    Approximate inference by iterative deepening of the ground program: at each depth the truncated lower and upper
+    bound programs are compiled and evaluated, P(q | e) being bounded by P_lower(q, e) / P_upper(e) and
+    P_upper(q, e) / P_lower(e). Bounds only tighten as the depth grows, and are exact once nothing is truncated.
+    The bounds are on the expected probability: those of the Beta means are exact bounds of the means computed by
+    run_beta, those of the SL projected probabilities approximate bounds (and, since SL conditioning of q and e by e is
+    not the one run_SL performs, even the exact SL values may differ from those of run_SL).
+    """
+
+    def __init__(self, semiring, ground, parse, backend=None):
+        """
+        :param semiring: SLSemiring or BetaSemiring
+        :param ground: ground program, labelled for the semiring
+        :param parse: function turning a value of the semiring into a result (e.g. a BetaDistribution)
+        :param backend: knowledge compilation backend of the truncated programs
+        """
+        self._semiring = semiring
+        # positive cycles are broken first, otherwise the upper bound would never reach the exact value
+        self._ground = LogicDAG.create_from(ground)
+        self._parse = parse
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._thread = None
+        self.depth = 0
+        self.exact = False
+        self._bounds = {str(name): (semiring.zero(), semiring.one()) for name, node in self._ground.queries()}
+
+    def step(self, time_budget=None):
+        """
+        Computes the bounds at the next depth, in a child process killed after time_budget seconds.
+        :return: whether the bounds have been updated
+        """
+        depth = self.depth + 1
+        try:
+            # a module-level function rather than a closure, as it is pickled when stepping from the background thread
+            res, truncated = supervise(functools.partial(_evaluate, self._semiring, self._ground, self._backend, depth),
+                                       Budget(time=time_budget))
+        except TimeBudgetExceeded:
+            return False
+
+        evidence = str(_EVIDENCE)
+        bounds = {}
+        for name in self._bounds:
+            bounds[name] = (self._ratio(res[False][name], res[True][evidence], self._semiring.zero()),
+                            self._ratio(res[True][name], res[False][evidence], self._semiring.one()))
+        with self._lock:
+            self._bounds = bounds
+            self.depth = depth
+            self.exact = not truncated
+        return True
+
+    def _ratio(self, x, z, default):
+        if _expectation(self._semiring, z) == 0:
+            return default
+        return self._semiring.normalize(x, z)
+
+    def run(self, time_budget):
+        """
+        Deepens until the bounds are exact or time_budget seconds have passed.
+        """
+        deadline = time.perf_counter() + time_budget
+        while not self.exact:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not self.step(remaining):
+                break
+        return self.bounds()
+
+    def start(self, time_budget):
+        """
+        Runs in a background thread: bounds() can be called at any time for the current bounds.
+        """
+        self._thread = threading.Thread(target=self.run, args=(time_budget,), daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.bounds()
+
+    def bounds(self):
+        """
+        :return: dictionary query -> Bounds(lower, upper) of the current depth
+        """
+        with self._lock:
+            bounds = dict(self._bounds)
+        return {k: Bounds(self._parse(lower), self._parse(upper)) for k, (lower, upper) in sorted(bounds.items())}
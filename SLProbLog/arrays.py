@@ -0,0 +1,268 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from abc import ABC, abstractmethod
+
+import mpmath
+import numpy
+
+from SLProbLog.SLProbLog import BetaDistribution, EPSILON
+
+
+class _ValueArray(ABC):
+    """
+    Growable container storing each field of many values in its own contiguous float64 array; subclasses define
+    how a value is split into fields and rebuilt from them
+    """
+
+    __slots__ = ("_data", "_size")
+
+    _fields = 0
+
+    def __init__(self, capacity=16):
+        self._data = numpy.empty((self._fields, max(1, capacity)))
+        self._size = 0
+
+    @classmethod
+    def from_values(cls, values):
+        ret = cls(len(values))
+        for v in values:
+            ret.append(v)
+        return ret
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        :param array: array of shape (n, fields), e.g. as returned by the bulk converters below
+        """
+        array = numpy.asarray(array, dtype=float)
+        ret = cls(len(array))
+        ret._data[:, :len(array)] = array.T
+        ret._size = len(array)
+        return ret
+
+    def to_array(self):
+        """
+        :return: copy of the values as an array of shape (n, fields)
+        """
+        return self._data[:, :self._size].T.copy()
+
+    @abstractmethod
+    def _fields_of(self, value):
+        """
+        :return: the fields of a value, as floats
+        """
+
+    @abstractmethod
+    def _make(self, column):
+        """
+        :return: the value whose fields are in column
+        """
+
+    def append(self, value):
+        if self._size == self._data.shape[1]:
+            data = numpy.empty((self._fields, 2 * self._size))
+            data[:, :self._size] = self._data
+            self._data = data
+        self._data[:, self._size] = self._fields_of(value)
+        self._size += 1
+
+    def extend(self, values):
+        for v in values:
+            self.append(v)
+
+    def field(self, i):
+        """
+        :return: view on the contiguous array of the i-th field of all the values
+        """
+        return self._data[i, :self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        return self._make(self._data[:, i])
+
+    def __setitem__(self, i, value):
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        self._data[:, i] = self._fields_of(value)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._make(self._data[:, i])
+
+    def to_list(self):
+        return list(self)
+
+    @property
+    def nbytes(self):
+        return self._data[:, :self._size].nbytes
+
+
+class BetaArray(_ValueArray):
+    """
+    Many Beta distributions stored as contiguous arrays of means and variances
+    """
+
+    __slots__ = ()
+
+    _fields = 2
+
+    def _fields_of(self, value):
+        return (float(value.mean()), float(value.variance()))
+
+    def _make(self, column):
+        return BetaDistribution(column[0], column[1])
+
+    @property
+    def means(self):
+        return self.field(0)
+
+    @property
+    def variances(self):
+        return self.field(1)
+
+
+class OpinionArray(_ValueArray):
+    """
+    Many SL opinions [belief, disbelief, uncertainty, base rate] stored as contiguous arrays of each component
+    """
+
+    __slots__ = ()
+
+    _fields = 4
+
+    def _fields_of(self, value):
+        return [float(x) for x in value]
+
+    def _make(self, column):
+        return [mpmath.mpf(x) for x in column]
+
+    @property
+    def beliefs(self):
+        return self.field(0)
+
+    @property
+    def disbeliefs(self):
+        return self.field(1)
+
+    @property
+    def uncertainties(self):
+        return self.field(2)
+
+    @property
+    def base_rates(self):
+        return self.field(3)
+
+
+# Bulk converters: the same computations as from_sl_opinion, BetaDistribution.to_sl_opinion and moment_matching, on
+# float64 arrays of shape (n, 4) for opinions and (n, 2) for Beta distributions, with the same clamps.
+
+
+def _columns(values, fields):
+    if isinstance(values, _ValueArray):
+        data = values._data[:, :len(values)]
+    else:
+        data = numpy.asarray(values, dtype=float).reshape(-1, fields).T
+    if data.shape[0] != fields:
+        raise Exception("Expected %d fields, got %d" % (fields, data.shape[0]))
+    return data
+
+
+def _not_zero(x):
+    # mpmath.almosteq(0, x, EPSILON) holds exactly when |x| <= EPSILON
+    return numpy.where(numpy.abs(x) <= EPSILON, EPSILON, x)
+
+
+def sl_to_beta(opinions, W=2):
+    """
+    Bulk from_sl_opinion
+    :param opinions: array of shape (n, 4) of [belief, disbelief, uncertainty, base rate], or an OpinionArray
+    :return: array of shape (n, 2) of [mean, variance]
+    """
+    b, d, u, a = _columns(opinions, 4)
+    u = _not_zero(u)
+    b = _not_zero(b)
+
+    mean = b + u * a
+    sx = W / u
+    variance = mean * (1 - mean) / (sx + 1)
+    return numpy.stack((mean, variance), axis=1)
+
+
+def beta_parameters(betas):
+    """
+    Bulk BetaDistribution.alpha and BetaDistribution.beta
+    :param betas: array of shape (n, 2) of [mean, variance], or a BetaArray
+    :return: array of shape (n, 2) of [alpha, beta]
+    """
+    mean, variance = _columns(betas, 2)
+    variance = numpy.where(numpy.abs(variance) <= EPSILON, EPSILON, variance)
+    strength = (mean * (1 - mean)) / variance - 1
+    return numpy.stack((numpy.maximum(EPSILON, mean * strength), numpy.maximum(EPSILON, (1 - mean) * strength)),
+                       axis=1)
+
+
+def from_beta_parameters(parameters):
+    """
+    :param parameters: array of shape (n, 2) of [alpha, beta]
+    :return: array of shape (n, 2) of [mean, variance]
+    """
+    alpha, beta = _columns(parameters, 2)
+    s = alpha + beta
+    return numpy.stack((alpha / s, alpha * beta / (s * s * (s + 1))), axis=1)
+
+
+def beta_to_sl(betas, a=1/2, W=2):
+    """
+    Bulk BetaDistribution.to_sl_opinion
+    :param betas: array of shape (n, 2) of [mean, variance], or a BetaArray
+    :param a: base rate of the opinions, a number or an array of n base rates
+    :return: array of shape (n, 4) of [belief, disbelief, uncertainty, base rate]
+    """
+    alpha, beta = beta_parameters(betas).T
+    rx = numpy.maximum(0, alpha - a * W)
+    sx = numpy.maximum(0, beta - (1 - a) * W)
+    total = rx + sx + W
+    return numpy.stack((rx / total, sx / total, W / total, numpy.broadcast_to(a, rx.shape).astype(float)), axis=1)
+
+
+def moment_match(betas):
+    """
+    Bulk moment_matching
+    :param betas: array of shape (n, 2) of [mean, variance], or a BetaArray
+    :return: array of shape (n, 2) of [mean, variance]; the variance is nan for the means 0 and 1, on which
+    moment_matching divides by zero
+    """
+    m, v = _columns(betas, 2)
+    var = numpy.where(v == 0, 1e-10, v)
+    mean = numpy.minimum(1, numpy.maximum(0, m))
+    sx = ((mean * (1 - mean)) / var - 1)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.stack((mean, mean * (1 - mean) / (sx + 1)), axis=1)
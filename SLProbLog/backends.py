@@ -0,0 +1,213 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+
+from problog import get_evaluatable, system_info
+from problog.bdd_formula import BDD
+from problog.sdd_formula import SDD
+
+from SLProbLog.governor import fork_safe
+
+BACKENDS = ("sdd", "ddnnf", "bdd")
+
+
+def is_available(backend):
+    """
+    :param backend: one of BACKENDS
+    :return: whether the knowledge compiler for the backend is installed
+    """
+    if backend == "sdd":
+        return SDD.is_available()
+    if backend == "bdd":
+        return BDD.is_available()
+    if backend == "ddnnf":
+        return bool(system_info.get("dsharp", False) or system_info.get("c2d", False))
+    raise Exception("Unknown backend: %s" % backend)
+
+
+def circuit_size(formula):
+    """
+    Size of a compiled circuit: number of SDD elements for SDDs, number of nodes otherwise
+    """
+    if isinstance(formula, SDD):
+        return formula.get_manager().get_manager().size()
+    return len(formula)
+
+
+def compile_formula(backend, semiring, ground):
+    """
+    Compiles a ground program
+    :param backend: one of BACKENDS, or None to let ProbLog choose
+    :param semiring: semiring used for the evaluation
+    :param ground: ground program (LogicFormula)
+    :return: compiled formula, compilation time and circuit size
+    """
+    start = time.perf_counter()
+    formula = get_evaluatable(backend, semiring=semiring).create_from(ground)
+    return formula, time.perf_counter() - start, circuit_size(formula)
+
+
+def _trial_compile(backend, semiring, ground, results):
+    try:
+        formula, compile_time, size = compile_formula(backend, semiring, ground)
+        # a circuit the semiring cannot evaluate (e.g. the SL operators divide by zero on the x or not x nodes that
+        # smooth SDDs) must not win
+        formula.evaluate(semiring=semiring)
+        results.put(("ok", compile_time, size))
+    except Exception as e:
+        results.put(("error: %s" % repr(e), None, None))
+
+
+def trial(backend, semiring, ground, time_budget=None, poll_interval=0.1):
+    """
+    Compiles a ground program, and evaluates it with the semiring, in a child process, which is killed if it does not
+    finish within the time budget.
+    Where processes cannot be safely forked (see governor.fork_safe), since ground programs cannot be pickled for
+    another start method, the compilation runs in this process and the budget is checked afterwards.
+    The compiled circuit stays in the child, which only reports its statistics.
+    :param poll_interval: seconds between two checks that the child is still alive
+    :return: dictionary with status ("ok", "timeout", "unavailable" or an error), compile_time and circuit_size
+    """
+    if not is_available(backend):
+        return {"status": "unavailable", "compile_time": None, "circuit_size": None}
+
+    if not fork_safe():
+        results = queue.Queue()
+        _trial_compile(backend, semiring, ground, results)
+        status, compile_time, size = results.get()
+        if status == "ok" and time_budget is not None and compile_time > time_budget:
+            status = "timeout"
+        return {"status": status, "compile_time": compile_time, "circuit_size": size}
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    p = ctx.Process(target=_trial_compile, args=(backend, semiring, ground, results))
+    p.start()
+    start = time.perf_counter()
+    while True:
+        try:
+            status, compile_time, size = results.get(timeout=poll_interval)
+            break
+        except queue.Empty:
+            pass
+        if not p.is_alive():
+            # the child may have reported just before exiting
+            try:
+                status, compile_time, size = results.get(timeout=poll_interval)
+            except queue.Empty:
+                status, compile_time, size = "error: process died with exit code %s" % p.exitcode, None, None
+            break
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            p.terminate()
+            status, compile_time, size = "timeout", None, None
+            break
+    p.join()
+
+    return {"status": status, "compile_time": compile_time, "circuit_size": size}
+
+
+class BackendSelector:
+    """
+    Chooses the compilation backend for a model structure and a semiring by trial-compiling with every available
+    backend, and remembers the winner for them. Only backends whose circuit the semiring evaluates without error can
+    win.
+    The trials run in child processes, so that a backend exceeding the time budget can be killed, and their circuits
+    cannot be handed back: the first evaluation of a structure thus compiles it once per backend plus once more with
+    the winner, the following ones only once. A selector can be shared by several threads.
+    """
+
+    def __init__(self, backends=BACKENDS, time_budget=60, size_budget=None):
+        """
+        :param backends: backends to try
+        :param time_budget: seconds after which a trial compilation is abandoned
+        :param size_budget: maximum circuit size of an acceptable backend
+        """
+        self._backends = backends
+        self._time_budget = time_budget
+        self._size_budget = size_budget
+        self._choices = {}
+        self._lock = threading.Lock()
+
+    def select(self, key, semiring, ground):
+        """
+        :param key: structure of the model, see SLProbLog.parser.structure_key; the winner is remembered for the key
+        and the class of the semiring
+        :param semiring: semiring used for the evaluation
+        :param ground: ground program
+        :return: the winning backend and the statistics of all the trials
+        """
+        key = self._key(key, semiring)
+        with self._lock:
+            choice = self._choices.get(key)
+        if choice is None:
+            # trials of the same structure in several threads at once are harmless, the first winner is kept
+            stats = {}
+            for b in self._backends:
+                stats[b] = trial(b, semiring, ground, self._time_budget)
+                if stats[b]["status"] == "ok" and self._size_budget is not None \
+                        and stats[b]["circuit_size"] > self._size_budget:
+                    stats[b]["status"] = "too large"
+
+            candidates = [b for b in self._backends if stats[b]["status"] == "ok"]
+            if not candidates:
+                raise Exception("No backend could compile the model within the budgets: %s" % stats)
+
+            winner = min(candidates, key=lambda b: (stats[b]["compile_time"], stats[b]["circuit_size"]))
+            with self._lock:
+                choice = self._choices.setdefault(key, (winner, stats))
+
+        return choice
+
+    def record(self, key, semiring, choice):
+        """
+        Remembers a choice that select made on a copy of this selector, e.g. in the child process of a supervised
+        evaluation
+        :param choice: the value returned by select
+        """
+        with self._lock:
+            self._choices.setdefault(self._key(key, semiring), choice)
+
+    @staticmethod
+    def _key(key, semiring):
+        return key, type(semiring).__name__
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        with self._lock:
+            state["_choices"] = dict(self._choices)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def forget(self):
+        with self._lock:
+            self._choices.clear()
+
+
+default_selector = BackendSelector()
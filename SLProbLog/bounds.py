@@ -0,0 +1,118 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import heapq
+
+import numpy
+
+from SLProbLog.SLProbLog import BetaSemiring, SLSemiring
+from SLProbLog.anytime import Bounds
+from SLProbLog.circuit import ArraySemiring
+
+# margin between the float64 bounds and the expected values computed in mpmath
+SLACK = 1e-9
+
+
+class IntervalSemiring(ArraySemiring):
+    """
+    Interval arithmetic on the weighted model counts of a d-DNNF: values are arrays [lower, upper]. The weights are
+    non negative and the counts monotone in each of them, so evaluating with the lower and the upper weights bounds
+    every node; a conditional probability is bounded by dividing the lower count by the upper normalization and
+    vice versa.
+    """
+
+    def normalize(self, a, z):
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            return numpy.clip(numpy.nan_to_num(a / z[::-1], nan=0.0, posinf=1.0), 0.0, 1.0)
+
+
+def interval_weights(circuit, semiring):
+    """
+    Intervals of the probability of each leaf: [b, b + u] for an SL opinion (belief to plausibility), in which its
+    expected value b + u * a lies, and the mean itself for a Beta distribution.
+    :param circuit: Circuit whose weights are in the representation of semiring
+    :param semiring: SLSemiring or BetaSemiring
+    :return: ([lower, upper] of the positive weight, [lower, upper] of the negative weight) of each slot
+    """
+    def interval(w):
+        if isinstance(semiring, BetaSemiring):
+            m = float(semiring.parse(w).mean())
+            return numpy.array([m, m])
+        b, d, u, a = (float(x) for x in semiring.parse(w))
+        return numpy.array([b, b + u])
+
+    return [(interval(pos), interval(neg)) for pos, neg in circuit.weights]
+
+
+def query_bounds(circuit, semiring):
+    """
+    Cheap bounds, in float64, on the expected value of the result of each query under the SL or Beta operators: the
+    operators propagate expected values as ordinary probabilities do, except for the clamps of the Beta conditioning
+    and the vacuous opinion (of expected value 1/2) returned by the SL normalization when conditioning fails, which
+    are taken into account.
+    :param circuit: Circuit whose weights are in the representation of semiring
+    :param semiring: SLSemiring or BetaSemiring
+    :return: dictionary query -> Bounds(lower, upper)
+    """
+    intervals = IntervalSemiring()
+    literals = circuit.evidence_literals(intervals, interval_weights(circuit, semiring))
+    values = circuit.propagate(intervals, literals)
+    z = circuit.root_value(values, literals)
+
+    ret = {}
+    for name, ref in circuit.queries:
+        value = numpy.broadcast_to(circuit.query(intervals, ref, values, literals, z)[0], (2,))
+        lower, upper = float(value[0]) - SLACK, float(value[1]) + SLACK
+        if circuit.evidence:
+            if isinstance(semiring, SLSemiring):
+                lower, upper = min(lower, 0.5), max(upper, 0.5)
+            else:
+                lower = min(lower, 1 - 1e-6)
+        ret[name] = Bounds(max(0.0, lower), min(1.0, upper))
+    return ret
+
+
+def candidates(bounds, threshold=None, top_k=None):
+    """
+    :param bounds: dictionary query -> Bounds
+    :param threshold: keep the queries whose expected value may be at least threshold
+    :param top_k: keep the queries that may be among the k with the largest expected value
+    :return: set of the queries that cannot be excluded
+    """
+    keep = set(bounds)
+    if threshold is not None:
+        keep = {q for q in keep if bounds[q].upper >= threshold}
+    if top_k is not None and len(keep) > top_k:
+        # whatever the exact values, the k largest lower bounds are reached by at least k queries
+        kth = heapq.nlargest(top_k, (bounds[q].lower for q in keep))[-1]
+        keep = {q for q in keep if bounds[q].upper >= kth}
+    return keep
+
+
+def expected_value(v):
+    """
+    :param v: SL opinion [b, d, u, a] or BetaDistribution
+    :return: its expected value, b + u * a or the mean
+    """
+    if isinstance(v, list):
+        return v[0] + v[2] * v[3]
+    return v.mean()
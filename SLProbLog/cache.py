@@ -0,0 +1,144 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import mpmath
+
+from SLProbLog.parser import Annotation, scan_significant
+
+
+def canonical_key(program, mode=(), quantize=None):
+    """
+    Canonical hash of an inference request: the structure of the program (including its evidence and queries),
+    the values of its w(...)/b(...) labels and the mode of evaluation; whitespace and comments are ignored.
+    :param program: the program text
+    :param mode: hashable description of how the program is evaluated (e.g. SL vs Beta, sloutput)
+    :param quantize: if given, label arguments are rounded to multiples of quantize, so that near-identical
+    requests share the same key
+    :return: hexadecimal digest
+    """
+    h = hashlib.sha1(repr(mode).encode("utf-8"))
+    for item in scan_significant(program):
+        if isinstance(item, Annotation):
+            if quantize is None:
+                args = [mpmath.nstr(x, mpmath.mp.dps) for x in item.args]
+            else:
+                args = [str(int(mpmath.nint(x / quantize))) for x in item.args]
+            h.update(("\0%s(%s)\0" % (item.functor, ",".join(args))).encode("utf-8"))
+        else:
+            h.update(item.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Thread safe LRU cache of inference results, whose entries optionally expire after ttl seconds.
+    Results are copied in and out, so callers can modify them freely.
+    """
+
+    def __init__(self, maxsize=128, ttl=None, quantize=None, clock=time.monotonic):
+        """
+        :param maxsize: maximum number of results kept, the least recently used being evicted first
+        :param ttl: seconds after which a result expires, None for never
+        :param quantize: step to which label arguments are rounded when computing keys (see canonical_key)
+        :param clock: function returning the current time in seconds
+        """
+        if maxsize < 1:
+            raise Exception("The cache must hold at least one result")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.quantize = quantize
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, program, mode=()):
+        return canonical_key(program, mode, self.quantize)
+
+    def get(self, key):
+        """
+        :return: a copy of the cached result, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self._clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (self._clock(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        :param compute: function computing the result on a miss
+        :return: (result, whether it was a hit)
+        """
+        result = self.get(key)
+        if result is not None:
+            return result, True
+        result = compute()
+        self.put(key, result)
+        return result, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def metrics(self):
+        """
+        :return: dictionary with size, hits, misses, evictions, expirations and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "expirations": self.expirations,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
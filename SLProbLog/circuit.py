@@ -0,0 +1,779 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import mmap
+import os
+import struct
+from functools import cached_property
+
+import numpy
+from problog.constraint import ConstraintAD
+
+ATOM = 0
+CONJ = 1
+DISJ = 2
+
+_TYPES = {"atom": ATOM, "conj": CONJ, "disj": DISJ}
+
+# binary layout: header, then node_type (int8), child_ptr, child_index, leaf_slot (int64, little endian) and the JSON
+# metadata (queries, evidence, weights); every section starts at an offset, from the start of the buffer, multiple of 8
+_MAGIC = b"SLPLCIRC"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQ")
+# the field of the header after the version is 0, except in shared memory blocks where share records _tracker()
+_TRACKER = struct.Struct("<I")
+_TRACKER_OFFSET = 12
+_ARRAYS = (("node_type", "<i1"), ("child_ptr", "<i8"), ("child_index", "<i8"), ("leaf_slot", "<i8"))
+
+
+def _constant_key(value):
+    """
+    :return: key under which value compares equal to the same constant written differently, e.g. w(1,0,0,1) and
+    w(1.0, 0.0, 0.0, 1.0): for a label, its functor and the numbers of its arguments
+    """
+    if not isinstance(value, str):
+        return value
+    start, end = value.find("("), value.rfind(")")
+    if start < 0 or end < start:
+        return value
+    try:
+        return value[:start].strip(), tuple(float(x) for x in value[start + 1:end].split(","))
+    except ValueError:
+        return value
+
+
+def _exact_constants(semiring):
+    """
+    :return: whether one and zero of the semiring pass for the identities of times and plus, and zero for absorbing
+    """
+    one, zero = semiring.one(), semiring.zero()
+    return _constant_key(semiring.times(one, one)) == _constant_key(one) \
+        and _constant_key(semiring.plus(zero, zero)) == _constant_key(zero) \
+        and _constant_key(semiring.times(one, zero)) == _constant_key(zero)
+
+
+def _tracker():
+    """
+    :return: identity of the multiprocessing resource tracker of this process, which the processes started by
+    multiprocessing from it share, or 0 where shared memory is not tracked
+    """
+    if os.name != "posix":
+        return 0
+    from multiprocessing import resource_tracker
+
+    # the processes sharing the tracker write to the same pipe
+    return os.fstat(resource_tracker.getfd()).st_ino & 0xffffffff
+
+
+def _aligned(offset):
+    return (offset + 7) & ~7
+
+
+def _layout(nnodes, nchildren, nmetadata):
+    """
+    :return: list of (offset, length) of the arrays and of the metadata, and the total size
+    """
+    lengths = (nnodes, nnodes + 1, nchildren, nnodes)
+    sections = []
+    offset = _aligned(_HEADER.size)
+    for (name, dtype), length in zip(_ARRAYS, lengths):
+        sections.append((offset, length))
+        offset = _aligned(offset + length * numpy.dtype(dtype).itemsize)
+    sections.append((offset, nmetadata))
+    return sections, offset + nmetadata
+
+
+class ArraySemiring:
+    """
+    Probability arithmetic on numpy arrays, for evaluating a circuit on many weight assignments at once
+    """
+
+    def one(self):
+        return 1.0
+
+    def zero(self):
+        return 0.0
+
+    def plus(self, a, b):
+        return a + b
+
+    def times(self, a, b):
+        return a * b
+
+    def to_evidence(self, pos, neg, sign):
+        return (1.0, 0.0) if sign else (0.0, 1.0)
+
+    def normalize(self, a, z):
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            return a / z
+
+
+class Circuit:
+    """
+    Flat view of a compiled d-DNNF: nodes are numbered from 1 as in ProbLog, children always precede their parents,
+    and a literal is a signed node number (negative for negation).
+    For node k (stored at position k - 1):
+    - node_type[k - 1] is ATOM, CONJ or DISJ
+    - child_index[child_ptr[k - 1]:child_ptr[k]] are its children
+    - leaf_slot[k - 1] is, for atoms, the position of its (positive, negative) weights in the weights list, -1 otherwise
+    Queries and evidence are literals of atoms, as in the d-DNNFs compiled by ProbLog.
+    """
+
+    def __init__(self, node_type, child_ptr, child_index, leaf_slot, queries, evidence, weights=None):
+        """
+        :param queries: list of (name, literal); literal 0 is true, None is false
+        :param evidence: list of (name, literal)
+        :param weights: list of (positive, negative) weights of each slot, in the internal representation of a semiring
+        """
+        self.node_type = node_type
+        self.child_ptr = child_ptr
+        self.child_index = child_index
+        self.leaf_slot = leaf_slot
+        self.queries = queries
+        self.evidence = evidence
+        self.weights = weights
+        self.slot_node = numpy.flatnonzero(leaf_slot >= 0) + 1
+        self._parent_ptr = None
+        self._parent_index = None
+        self._buffer = None
+        self.peak_live = 0
+        self.evidence_evaluations = 0
+
+        parent_of = numpy.repeat(numpy.arange(1, len(node_type) + 1), numpy.diff(child_ptr))
+        if numpy.any(numpy.abs(child_index) >= parent_of):
+            raise Exception("Circuit nodes are not in topological order")
+        for name, ref in queries:
+            if ref and leaf_slot[abs(ref) - 1] < 0:
+                raise Exception("Query on a non-atom node: %s" % name)
+
+    # plain lists, indexed by node number, are much faster than numpy arrays for the scalar traversals; they are built
+    # on first use, so a circuit read from a buffer (from_buffer, load, attach) costs nothing until it is evaluated,
+    # but from its first evaluation on each process holds its own copy of the structure in these lists
+
+    @cached_property
+    def _types(self):
+        return [ATOM] + self.node_type.tolist()
+
+    @cached_property
+    def _slots(self):
+        return [-1] + self.leaf_slot.tolist()
+
+    @cached_property
+    def _children(self):
+        ptr = self.child_ptr.tolist()
+        index = self.child_index.tolist()
+        return [[]] + [index[ptr[k]:ptr[k + 1]] for k in range(len(self.node_type))]
+
+    @cached_property
+    def _order(self):
+        return self._reachable()
+
+    @cached_property
+    def _release(self):
+        """
+        For each node, the internal nodes whose last parent (in topological order) it is: their values are no longer
+        needed once it has been computed
+        """
+        last = {}
+        for k in self._order:
+            for c in self._children[k]:
+                if self._types[abs(c)] != ATOM:
+                    last[abs(c)] = k
+        release = {}
+        for c, k in last.items():
+            if c != self.root:
+                release.setdefault(k, []).append(c)
+        return release
+
+    @classmethod
+    def from_formula(cls, formula, semiring=None):
+        """
+        :param formula: d-DNNF compiled by ProbLog (e.g. get_evaluatable("ddnnf").create_from(...)); formulas with a
+        weight on True or with constraints other than annotated disjunctions, which ProbLog's evaluator would have to
+        apply to the root, are not supported
+        :param semiring: if given, the weights of the atoms are extracted in its internal representation
+        """
+        if formula.get_weights().get(0) is not None:
+            raise Exception("Formulas with a weight on True are not supported")
+        if any(not isinstance(c, ConstraintAD) for c in formula.constraints()):
+            raise Exception("Formulas with constraints other than annotated disjunctions are not supported")
+
+        size = len(formula)
+        node_type = numpy.empty(size, dtype=numpy.int8)
+        child_ptr = numpy.zeros(size + 1, dtype=numpy.int64)
+        leaf_slot = numpy.full(size, -1, dtype=numpy.int64)
+        children = []
+        slots = 0
+        for k in range(1, size + 1):
+            node = formula.get_node(k)
+            node_type[k - 1] = _TYPES[type(node).__name__]
+            if node_type[k - 1] == ATOM:
+                leaf_slot[k - 1] = slots
+                slots += 1
+            else:
+                children.extend(node.children)
+            child_ptr[k] = len(children)
+
+        queries = [(str(name), node) for name, node, label in formula.labeled()]
+
+        evidence = []
+        for name, node, value in formula.evidence_all():
+            if node == 0 or node is None:
+                if (node == 0) != (value > 0):
+                    raise Exception("Inconsistent evidence: %s" % name)
+            elif value != 0:
+                evidence.append((str(name), value * node))
+
+        weights = None
+        if semiring is not None:
+            extracted = formula.extract_weights(semiring)
+            if extracted.get(0) is not None:
+                raise Exception("Formulas with a weight on True are not supported")
+            one = semiring.one()
+            weights = [extracted.get(int(k), (one, one)) for k in numpy.flatnonzero(leaf_slot >= 0) + 1]
+
+        return cls(node_type, child_ptr, numpy.array(children, dtype=numpy.int64), leaf_slot, queries, evidence,
+                   weights)
+
+    def nbytes(self):
+        """
+        :return: size in bytes of the flat binary layout of the circuit (see to_buffer)
+        """
+        return _layout(len(self.node_type), len(self.child_index), len(self._metadata()))[1]
+
+    def _metadata(self):
+        return json.dumps({"queries": self.queries, "evidence": self.evidence, "weights": self.weights}).encode("utf-8")
+
+    def to_buffer(self, buffer=None):
+        """
+        Writes the circuit in a flat, position independent binary layout: a header followed by the node_type,
+        child_ptr, child_index and leaf_slot arrays and by the JSON encoded queries, evidence and weights (which must
+        therefore be numbers or strings, as with BetaSemiring or the probability semiring).
+        :param buffer: writable buffer of at least nbytes() bytes, e.g. a shared memory block or a mmap; if None a new
+        bytearray is allocated
+        :return: the buffer
+        """
+        metadata = self._metadata()
+        sections, size = _layout(len(self.node_type), len(self.child_index), len(metadata))
+        if buffer is None:
+            buffer = bytearray(size)
+        view = memoryview(buffer).cast("B")
+        if len(view) < size:
+            raise Exception("Buffer of %d bytes, %d required" % (len(view), size))
+
+        _HEADER.pack_into(view, 0, _MAGIC, _VERSION, 0, len(self.node_type), len(self.child_index), len(metadata))
+        for (name, dtype), (offset, length) in zip(_ARRAYS, sections):
+            numpy.frombuffer(view, dtype=dtype, count=length, offset=offset)[:] = getattr(self, name)
+        offset, length = sections[-1]
+        view[offset:offset + length] = metadata
+        return buffer
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """
+        Circuit whose arrays are views on a buffer written by to_buffer: reading it copies nothing but the metadata,
+        whereas evaluating it builds per-process lists of the structure (see _children).
+        :param buffer: any object supporting the buffer protocol (bytes, mmap, shared memory block)
+        """
+        view = memoryview(buffer).cast("B")
+        magic, version, _, nnodes, nchildren, nmetadata = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC:
+            raise Exception("Not a SLProbLog circuit")
+        if version != _VERSION:
+            raise Exception("Unsupported circuit version %d, expected %d" % (version, _VERSION))
+
+        sections, size = _layout(nnodes, nchildren, nmetadata)
+        if len(view) < size:
+            raise Exception("Truncated circuit: %d bytes, %d required" % (len(view), size))
+        arrays = [numpy.frombuffer(view, dtype=dtype, count=length, offset=offset)
+                  for (name, dtype), (offset, length) in zip(_ARRAYS, sections)]
+        offset, length = sections[-1]
+        metadata = json.loads(bytes(view[offset:offset + length]).decode("utf-8"))
+        weights = metadata["weights"]
+        if weights is not None:
+            weights = [tuple(w) for w in weights]
+
+        circuit = cls(*arrays, [tuple(q) for q in metadata["queries"]], [tuple(e) for e in metadata["evidence"]],
+                      weights)
+        circuit._buffer = buffer
+        return circuit
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            f.write(self.to_buffer())
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Memory maps a file written by save: processes loading the same file share the pages of its arrays. Call
+        close() to unmap it.
+        """
+        with open(filename, "rb") as f:
+            return cls.from_buffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def share(self, name=None):
+        """
+        Copies the circuit into a new multiprocessing.shared_memory block, to which workers attach with attach(name).
+        The caller owns the block and must close() and unlink() it when done.
+        :return: the SharedMemory block
+        """
+        from multiprocessing import shared_memory
+
+        block = shared_memory.SharedMemory(name=name, create=True, size=self.nbytes())
+        self.to_buffer(block.buf)
+        _TRACKER.pack_into(block.buf, _TRACKER_OFFSET, _tracker())
+        return block
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Circuit whose arrays view the shared memory block created by share. Call close() to detach from the block,
+        which the process that created it still has to unlink.
+        """
+        from multiprocessing import resource_tracker, shared_memory
+
+        try:
+            block = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching registers the block with the resource tracker of this process, which
+            # unlinks it once the processes using the tracker exit: unless that is the tracker of the process that
+            # created the block (e.g. in its pool workers), the registration is withdrawn
+            block = shared_memory.SharedMemory(name=name)
+            if _TRACKER.unpack_from(block.buf, _TRACKER_OFFSET)[0] != _tracker():
+                resource_tracker.unregister(block._name, "shared_memory")
+        circuit = cls.from_buffer(block.buf)
+        # the block must outlive the arrays viewing it
+        circuit._buffer = block
+        return circuit
+
+    def close(self):
+        """
+        Releases the buffer the circuit was read from (see from_buffer), closing the mmap of load or detaching from
+        the shared memory block of attach; the circuit can no longer be evaluated. Does nothing for other circuits.
+        """
+        buffer = self._buffer
+        if buffer is None:
+            return
+        # the views on the buffer must be gone before it can be closed
+        self.node_type = self.child_ptr = self.child_index = self.leaf_slot = None
+        self._parent_ptr = self._parent_index = None
+        for name in ("_types", "_slots", "_children", "_order", "_release"):
+            self.__dict__.pop(name, None)
+        self._buffer = None
+        if hasattr(buffer, "close"):
+            buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.node_type)
+
+    @property
+    def root(self):
+        return len(self.node_type)
+
+    def children(self, k):
+        return self.child_index[self.child_ptr[k - 1]:self.child_ptr[k]]
+
+    def parents(self, k):
+        if self._parent_ptr is None:
+            counts = numpy.zeros(len(self) + 1, dtype=numpy.int64)
+            numpy.add.at(counts, numpy.abs(self.child_index), 1)
+            self._parent_ptr = numpy.concatenate(([0], numpy.cumsum(counts[1:])))
+            parent_of = numpy.repeat(numpy.arange(1, len(self) + 1), numpy.diff(self.child_ptr))
+            self._parent_index = parent_of[numpy.argsort(numpy.abs(self.child_index), kind="stable")]
+        return self._parent_index[self._parent_ptr[k - 1]:self._parent_ptr[k]]
+
+    def _reachable(self):
+        seen = [False] * (len(self) + 1)
+        seen[self.root] = True
+        for k in range(self.root, 0, -1):
+            if seen[k]:
+                for c in self._children[k]:
+                    seen[abs(c)] = True
+        return [k for k in range(1, self.root + 1) if seen[k] and self._types[k] != ATOM]
+
+    def ancestors(self, k):
+        """
+        :return: internal nodes depending on node k, in topological order
+        """
+        seen = {k}
+        stack = [k]
+        while stack:
+            for p in self.parents(stack.pop()).tolist():
+                if p not in seen:
+                    seen.add(p)
+                    stack.append(p)
+        seen.discard(k)
+        return sorted(seen)
+
+    def _literal(self, ref, values, literals):
+        k = abs(ref)
+        s = self._slots[k]
+        if s >= 0:
+            return literals[s][ref < 0]
+        return values[k]
+
+    def _compute(self, semiring, k, values, literals):
+        if self._types[k] == CONJ:
+            p = semiring.one()
+            for c in self._children[k]:
+                p = semiring.times(p, self._literal(c, values, literals))
+        else:
+            p = semiring.zero()
+            for c in self._children[k]:
+                p = semiring.plus(p, self._literal(c, values, literals))
+        return p
+
+    def propagate(self, semiring, literals, nodes=None, values=None):
+        """
+        Computes the value of the internal nodes.
+        :param semiring: semiring (or ArraySemiring)
+        :param literals: (positive, negative) weight of each slot
+        :param nodes: nodes to (re)compute, in topological order; by default all the nodes reachable from the root
+        :param values: values of the nodes not recomputed
+        :return: dictionary node -> value
+        """
+        values = {} if values is None else dict(values)
+        for k in (self._order if nodes is None else nodes):
+            values[k] = self._compute(semiring, k, values, literals)
+        return values
+
+    def propagate_bounded(self, semiring, literals):
+        """
+        Computes the value of the root keeping alive only the values that some node still has to consume: each value
+        is freed as soon as its last parent has been computed.
+        :return: (root value, peak number of live values)
+        """
+        values = {}
+        peak = 0
+        release = self._release
+        for k in self._order:
+            values[k] = self._compute(semiring, k, values, literals)
+            peak = max(peak, len(values))
+            for c in release.get(k, ()):
+                del values[c]
+        return self.root_value(values, literals), peak
+
+    def evidence_literals(self, semiring, weights=None, evidence=()):
+        """
+        :param evidence: further evidence, list of (name, literal) as self.evidence
+        :return: weights of the slots with the evidence applied, as ProbLog does, by semiring.to_evidence
+        """
+        literals = list(self.weights if weights is None else weights)
+        observed = {}
+        for name, ref in list(self.evidence) + list(evidence):
+            if ref == 0:
+                # folded into the weights by simplify
+                continue
+            if observed.get(abs(ref), ref) != ref:
+                raise Exception("Inconsistent evidence: %s" % name)
+            if abs(ref) in observed:
+                continue
+            observed[abs(ref)] = ref
+            s = self._slots[abs(ref)]
+            if s < 0:
+                raise Exception("Evidence on a non-atom node: %s" % name)
+            pos, neg = literals[s]
+            literals[s] = semiring.to_evidence(pos, neg, ref > 0)
+        return literals
+
+    def root_value(self, values, literals):
+        return self._literal(self.root, values, literals)
+
+    def evaluate(self, semiring, weights=None, bounded=False):
+        """
+        Evaluates all the queries with the same semantics as ProbLog's d-DNNF evaluator, but recomputing for each
+        query only the nodes depending on it.
+        After the evaluation, peak_live is the largest number of node values held at the same time.
+        :param semiring: semiring (or ArraySemiring)
+        :param weights: (positive, negative) weight of each slot, by default the weights extracted at construction
+        :param bounded: trade time for memory: instead of keeping the value of every node, the circuit is evaluated
+        once per query (plus once for the evidence) freeing each value as soon as it has been consumed
+        :return: generator of (query name, value in the internal representation of the semiring)
+        """
+        literals = self.evidence_literals(semiring, weights)
+        if bounded:
+            z, self.peak_live = self.propagate_bounded(semiring, literals)
+            for name, ref in self.queries:
+                yield name, self._query_bounded(semiring, ref, literals, z)
+            return
+
+        values = self.propagate(semiring, literals)
+        self.peak_live = len(values)
+        z = self.root_value(values, literals)
+
+        for name, ref in self.queries:
+            yield name, self.query(semiring, ref, values, literals, z)[0]
+
+    def _query_bounded(self, semiring, ref, literals, z):
+        if ref == 0:
+            return semiring.one()
+        if ref is None:
+            return semiring.zero()
+
+        s = self._slots[abs(ref)]
+        if s < 0:
+            raise Exception("Query on a non-atom node: %d" % ref)
+        pos, neg = literals[s]
+        saved = literals[s]
+        literals[s] = (pos, semiring.zero()) if ref > 0 else (semiring.zero(), neg)
+        result, peak = self.propagate_bounded(semiring, literals)
+        self.peak_live = max(self.peak_live, peak)
+        literals[s] = saved
+
+        if self.evidence:
+            result = semiring.normalize(result, z)
+        return result
+
+    def query(self, semiring, ref, values, literals, z, normalize=None):
+        """
+        Evaluates one query given the values computed by propagate with the evidence literals.
+        :param ref: literal of the query, 0 for true and None for false
+        :param z: value of the root with the evidence
+        :param normalize: whether the value is normalized by z, by default if the circuit has evidence
+        :return: (value of the query, values of the nodes with the query literal set)
+        """
+        if normalize is None:
+            normalize = bool(self.evidence)
+        if ref == 0:
+            return semiring.one(), values
+        if ref is None:
+            return semiring.zero(), values
+
+        k = abs(ref)
+        s = self._slots[k]
+        if s < 0:
+            raise Exception("Query on a non-atom node: %d" % ref)
+        pos, neg = literals[s]
+        saved = literals[s]
+        literals[s] = (pos, semiring.zero()) if ref > 0 else (semiring.zero(), neg)
+        values = self.propagate(semiring, literals, self.ancestors(k), values)
+        result = self.root_value(values, literals)
+        literals[s] = saved
+
+        if normalize:
+            result = semiring.normalize(result, z)
+        return result, values
+
+    def conditional(self, semiring, requests, weights=None):
+        """
+        Evaluates each query given its own evidence, in addition to the evidence of the circuit, as ProbLog would on
+        the program with that evidence. The requests sharing the same evidence share a single propagation, and
+        hence a single evaluation of the weight of the evidence; their number is then in evidence_evaluations.
+        :param semiring: semiring (or ArraySemiring)
+        :param requests: list of (query literal, evidence), the evidence being a list of (name, literal) as
+        self.evidence; the literals of the evidence must be atoms
+        :param weights: (positive, negative) weight of each slot, by default the weights extracted at construction
+        :return: list of the value of each request, in the internal representation of the semiring
+        """
+        groups = {}
+        for i, (ref, evidence) in enumerate(requests):
+            groups.setdefault(frozenset(evidence), []).append(i)
+
+        res = [None] * len(requests)
+        for evidence, indices in groups.items():
+            literals = self.evidence_literals(semiring, weights, sorted(evidence))
+            values = self.propagate(semiring, literals)
+            z = self.root_value(values, literals)
+            normalize = bool(self.evidence) or bool(evidence)
+            for i in indices:
+                res[i] = self.query(semiring, requests[i][0], values, literals, z, normalize)[0]
+        self.evidence_evaluations = len(groups)
+        return res
+
+    def gradients(self, literals, values):
+        """
+        Reverse pass computing the derivatives of the value of the root with respect to the weights of every slot, for
+        ordinary probability arithmetic on numbers or numpy arrays (see ArraySemiring).
+        In a d-DNNF pos * d/dpos of slot s is the weight of the models in which the atom of s is true: all the
+        marginals are obtained with one forward (propagate) and one backward pass.
+        :param literals: (positive, negative) weight of each slot
+        :param values: values computed by propagate with the same literals
+        :return: list of [d/dpos, d/dneg] of each slot
+        """
+        grads = [[0.0, 0.0] for _ in literals]
+        adjoint = {}
+
+        def push(ref, g):
+            s = self._slots[abs(ref)]
+            if s >= 0:
+                grads[s][ref < 0] = grads[s][ref < 0] + g
+            else:
+                adjoint[abs(ref)] = adjoint.get(abs(ref), 0.0) + g
+
+        push(self.root, 1.0)
+        for k in reversed(self._order):
+            g = adjoint.pop(k, None)
+            if g is None:
+                continue
+            children = self._children[k]
+            if self._types[k] == DISJ:
+                for c in children:
+                    push(c, g)
+                continue
+            # the derivative with respect to a factor is the product of the other factors: prefix and suffix
+            # products avoid dividing by factors that may be zero
+            factors = [self._literal(c, values, literals) for c in children]
+            prefix = [1.0]
+            for f in factors[:-1]:
+                prefix.append(prefix[-1] * f)
+            suffix = 1.0
+            for i in range(len(children) - 1, -1, -1):
+                push(children[i], g * prefix[i] * suffix)
+                suffix = suffix * factors[i]
+        return grads
+
+    def simplify(self, semiring):
+        """
+        Constant folding for a given assignment of the weights: literals whose weight (with the evidence applied) is
+        the one or the zero of the semiring are propagated, so that conjunctions lose their one children and become
+        zero with a zero child, disjunctions lose their zero children, and nodes left with a single child are replaced
+        by it. Query atoms are kept, since each query changes the weight of its own atom; evidence atoms are folded
+        (their evidence becomes the literal 0) but still trigger the normalization of the queries.
+        Constants are recognised by numerical equality with one() and zero(), e.g. the (one, one) weights of the
+        atoms that the compiler introduces for derived atoms, or a fact labelled w(1,0,0,1).
+        Folding is exact only if one and zero are the identities of times and plus, as in the SLSemiring; the
+        BetaSemiring, whose one and zero carry a variance of 1e-9, changes the variance of every value it multiplies by
+        its one (including at the start of each conjunction), so a circuit of such a semiring is returned unchanged.
+        :param semiring: semiring whose one and zero are folded, e.g. SLSemiring
+        :return: (equivalent Circuit for these weights, dictionary with the number of nodes and edges before and
+        after)
+        """
+        if not _exact_constants(semiring):
+            return self, {"nodes": len(self), "edges": len(self.child_index), "simplified_nodes": len(self),
+                          "simplified_edges": len(self.child_index)}
+
+        ONE, ZERO = object(), object()
+        literals = self.evidence_literals(semiring)
+        one, zero = _constant_key(semiring.one()), _constant_key(semiring.zero())
+        protected = {abs(ref) for name, ref in self.queries if ref}
+
+        node_type = []
+        children = []
+        child_ptr = [0]
+        slots = []
+        weights = []
+        atom = {}
+        folded = [None] * (len(self) + 1)
+        empty_conj = []
+
+        def add(t, c=(), slot=-1):
+            node_type.append(t)
+            children.extend(c)
+            child_ptr.append(len(children))
+            slots.append(slot)
+            return len(node_type)
+
+        def add_atom(k):
+            if k not in atom:
+                atom[k] = add(ATOM, slot=len(weights))
+                weights.append(self.weights[self._slots[k]])
+            return atom[k]
+
+        def literal(ref):
+            k = abs(ref)
+            s = self._slots[k]
+            if s < 0:
+                return folded[k]
+            if k not in protected:
+                w = _constant_key(literals[s][ref < 0])
+                if type(w) == type(one) and w == one:
+                    return ONE
+                if type(w) == type(zero) and w == zero:
+                    return ZERO
+            return add_atom(k) if ref > 0 else -add_atom(k)
+
+        def constant_one():
+            # an empty conjunction, for a one child of a disjunction
+            if not empty_conj:
+                empty_conj.append(add(CONJ))
+            return empty_conj[0]
+
+        for k in sorted(protected):
+            add_atom(k)
+
+        for k in self._order:
+            values = [literal(c) for c in self._children[k]]
+            if self._types[k] == CONJ:
+                if any(v is ZERO for v in values):
+                    folded[k] = ZERO
+                    continue
+                values = [v for v in values if v is not ONE]
+                if not values:
+                    folded[k] = ONE
+                    continue
+            else:
+                values = [v for v in values if v is not ZERO]
+                if not values:
+                    folded[k] = ZERO
+                    continue
+                values = [constant_one() if v is ONE else v for v in values]
+            folded[k] = values[0] if len(values) == 1 else add(self._types[k], values)
+
+        # the root is the last node, and must not be an atom
+        root = literal(self.root)
+        if root is ONE:
+            add(CONJ)
+        elif root is ZERO:
+            add(DISJ)
+        elif node_type[abs(root) - 1] == ATOM or abs(root) != len(node_type):
+            add(CONJ, [root])
+
+        # nodes built before one of their parents was folded are dropped, keeping the query atoms
+        keep = [False] * (len(node_type) + 1)
+        keep[len(node_type)] = True
+        for k in atom.values():
+            keep[k] = True
+        for k in range(len(node_type), 0, -1):
+            if keep[k]:
+                for c in children[child_ptr[k - 1]:child_ptr[k]]:
+                    keep[abs(c)] = True
+        number = numpy.cumsum(keep).tolist()
+        compact_type, compact_children, compact_ptr, compact_slots = [], [], [0], []
+        for k in range(1, len(node_type) + 1):
+            if keep[k]:
+                compact_type.append(node_type[k - 1])
+                compact_children.extend(number[abs(c)] if c > 0 else -number[abs(c)]
+                                        for c in children[child_ptr[k - 1]:child_ptr[k]])
+                compact_ptr.append(len(compact_children))
+                compact_slots.append(slots[k - 1])
+        node_type, children, child_ptr, slots = compact_type, compact_children, compact_ptr, compact_slots
+        atom = {k: number[a] for k, a in atom.items()}
+
+        def mapped(ref):
+            return atom[abs(ref)] if ref > 0 else -atom[abs(ref)]
+
+        queries = [(name, mapped(ref) if ref else ref) for name, ref in self.queries]
+        evidence = [(name, mapped(ref) if abs(ref) in protected else 0) for name, ref in self.evidence]
+
+        circuit = Circuit(numpy.array(node_type, dtype=numpy.int8), numpy.array(child_ptr, dtype=numpy.int64),
+                          numpy.array(children, dtype=numpy.int64), numpy.array(slots, dtype=numpy.int64), queries,
+                          evidence, weights)
+        return circuit, {"nodes": len(self), "edges": len(self.child_index),
+                         "simplified_nodes": len(circuit), "simplified_edges": len(circuit.child_index)}
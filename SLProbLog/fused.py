@@ -0,0 +1,87 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from collections import namedtuple
+
+from problog.evaluator import Semiring
+from problog.logic import Term, Constant
+
+from SLProbLog.SLProbLog import SLSemiring, BetaSemiring, from_sl_opinion, moment_matching
+
+FusedResult = namedtuple("FusedResult", ["probability", "opinion", "beta"])
+
+
+def fused_label(probability, opinion):
+    """
+    :param probability: probability of the fact
+    :param opinion: SL opinion of the fact, as a w(b,d,u,a) string
+    :return: label f(probability, w(b,d,u,a)) to be evaluated by the FusedSemiring
+    """
+    return "f(%s,%s)" % (probability, opinion)
+
+
+class FusedSemiring(Semiring):
+    """
+    Product of the probability semiring, the SLSemiring and the BetaSemiring: values are tuples (probability, SL
+    opinion, Beta distribution) so that one traversal of the circuit computes all three.
+    Labels are f(probability, w(b,d,u,a)), the Beta distribution being derived from the opinion as in run_beta.
+    """
+
+    def __init__(self):
+        self._sl = SLSemiring()
+        self._beta = BetaSemiring()
+
+    def one(self):
+        return (1.0, self._sl.one(), self._beta.one())
+
+    def zero(self):
+        return (0.0, self._sl.zero(), self._beta.zero())
+
+    def is_one(self, value):
+        return value == self.one()
+
+    def plus(self, x, y):
+        return (x[0] + y[0], self._sl.plus(x[1], y[1]), self._beta.plus(x[2], y[2]))
+
+    def times(self, x, y):
+        return (x[0] * y[0], self._sl.times(x[1], y[1]), self._beta.times(x[2], y[2]))
+
+    def negate(self, x):
+        return (1.0 - x[0], self._sl.negate(x[1]), self._beta.negate(x[2]))
+
+    def value(self, a):
+        if a.functor != "f" or a.arity != 2:
+            raise Exception("Expected a label f(probability, w(b,d,u,a)), found %s" % a)
+        opinion = str(a.args[1])
+        # formatted as ProbLog formats the b(...) labels that run_beta obtains from the opinion
+        beta = from_sl_opinion(self._sl.parse(opinion))
+        beta = str(Term("b", Constant(float(beta.mean_str())), Constant(float(beta.variance_str()))))
+        return (float(a.args[0]), opinion, beta)
+
+    def normalize(self, x, z):
+        return (x[0] / z[0], self._sl.normalize(x[1], z[1]), self._beta.normalize(x[2], z[2]))
+
+    def result(self, x, formula=None):
+        return FusedResult(x[0], self._sl.parse(x[1]), moment_matching(self._beta.parse(x[2])))
+
+    def is_dsp(self):
+        return True
@@ -0,0 +1,261 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import multiprocessing
+import pickle
+import signal
+import threading
+import time
+import warnings
+
+import mpmath
+from problog.program import PrologString
+
+
+class ResourceBudgetExceeded(Exception):
+    """
+    An evaluation exceeded one of the limits of its Budget
+    """
+
+    resource = None
+
+    def __init__(self, limit, used=None):
+        if used is None:
+            Exception.__init__(self, "%s budget of %s exceeded" % (self.resource, limit))
+        else:
+            Exception.__init__(self, "%s budget of %s exceeded: %s" % (self.resource, limit, used))
+        self.limit = limit
+        self.used = used
+
+    def __reduce__(self):
+        return (type(self), (self.limit, self.used))
+
+
+class TimeBudgetExceeded(ResourceBudgetExceeded):
+    resource = "time"
+
+
+class MemoryBudgetExceeded(ResourceBudgetExceeded):
+    resource = "memory"
+
+
+class SizeBudgetExceeded(ResourceBudgetExceeded):
+    resource = "circuit size"
+
+
+class Cancelled(Exception):
+    """
+    The evaluation has been cancelled by the caller
+    """
+
+
+class Budget:
+    """
+    Limits of a single evaluation (grounding, compilation and evaluation); None means unlimited
+    """
+
+    __slots__ = ("time", "memory", "size")
+
+    def __init__(self, time=None, memory=None, size=None):
+        """
+        :param time: wall time in seconds
+        :param memory: bytes the evaluation may allocate on top of the memory already used by the process
+        :param size: size of the compiled circuit (see backends.circuit_size)
+        """
+        self.time = time
+        self.memory = memory
+        self.size = size
+
+    def __repr__(self):
+        return "Budget(time=%s, memory=%s, size=%s)" % (self.time, self.memory, self.size)
+
+
+def _limit_memory(memory):
+    import resource
+
+    current = 0
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        pass
+    hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+    limit = current + memory
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def fork_safe():
+    """
+    :return: whether child processes can be forked: forking copies only the calling thread, so that a child forked
+    while other threads hold locks (of the allocator, of logging, ...) may deadlock on them
+    """
+    return "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+
+
+def child_context():
+    """
+    :return: multiprocessing context for child processes: fork where fork_safe, otherwise forkserver or spawn, whose
+    children start from a fresh interpreter and receive their work pickled; None if neither is available
+    """
+    if fork_safe():
+        return multiprocessing.get_context("fork")
+    for method in ("forkserver", "spawn"):
+        if method in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context(method)
+    return None
+
+
+def _portable(e):
+    """
+    :return: the exception itself if it survives pickling, so that the caller can catch it by its type, otherwise an
+    Exception with its type and message
+    """
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return Exception("%s: %s" % (type(e).__name__, e))
+
+
+def _supervised(function, memory, conn):
+    if memory is not None:
+        _limit_memory(memory)
+    try:
+        message = ("ok", function())
+    except MemoryError:
+        message = ("error", MemoryBudgetExceeded(memory))
+    except Exception as e:
+        message = ("error", _portable(e))
+
+    try:
+        conn.send(message)
+    except MemoryError:
+        conn.send(("error", MemoryBudgetExceeded(memory)))
+    except Exception as e:
+        conn.send(("error", Exception("Result not picklable: %s: %s" % (type(e).__name__, e))))
+    conn.close()
+
+
+def _died(exitcode, memory):
+    """
+    :return: exception describing a child that exited without sending its result
+    """
+    if exitcode is not None and exitcode < 0:
+        try:
+            name = signal.Signals(-exitcode).name
+        except ValueError:
+            name = str(-exitcode)
+        return Exception("Evaluation process killed by signal %s" % name)
+    if exitcode == 1 and memory is not None:
+        # an uncaught exception outside of the evaluation, under a memory limit almost certainly a MemoryError
+        return MemoryBudgetExceeded(memory, "process exited with code 1")
+    return Exception("Evaluation process died with exit code %s" % exitcode)
+
+
+def supervise(function, budget, cancel=None, poll_interval=0.1):
+    """
+    Runs function in a child process enforcing the time and memory limits of the budget: the child is killed when
+    it runs out of time or is cancelled, and its address space is limited to the memory budget.
+    The child is forked when this process runs a single thread, and started by forkserver or spawn otherwise (see
+    child_context), in which case the function itself must be picklable (e.g. a module level function or a
+    functools.partial of one): any other thread, even one unrelated to the caller (e.g. started by a library), thus
+    rules out lambdas and closures, which only a forked child can run. Where no child can be started the function runs
+    in this process and the time limit is checked afterwards.
+    :param function: function without arguments, whose result must be picklable
+    :param budget: Budget
+    :param cancel: threading.Event which, when set, kills the child and raises Cancelled
+    :param poll_interval: seconds between two checks of cancel
+    :return: the result of function
+    """
+    start = time.perf_counter()
+    ctx = child_context()
+    if ctx is None:
+        res = function()
+        if budget.time is not None and time.perf_counter() - start > budget.time:
+            raise TimeBudgetExceeded(budget.time)
+        return res
+
+    if ctx.get_start_method() != "fork":
+        try:
+            pickle.dumps(function)
+        except Exception as e:
+            others = [t.name for t in threading.enumerate() if t is not threading.current_thread()]
+            raise Exception("Cannot fork the child while other threads are running (%s), and the function cannot be "
+                            "pickled for the %s start method: %s" % (", ".join(others), ctx.get_start_method(), e))
+
+    receiver, sender = ctx.Pipe(duplex=False)
+    p = ctx.Process(target=_supervised, args=(function, budget.memory, sender))
+    p.start()
+    sender.close()
+
+    try:
+        while not receiver.poll(poll_interval):
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            if budget.time is not None and time.perf_counter() - start > budget.time:
+                raise TimeBudgetExceeded(budget.time)
+
+        try:
+            status, res = receiver.recv()
+        except EOFError:
+            p.join()
+            raise _died(p.exitcode, budget.memory)
+    finally:
+        if p.is_alive():
+            p.terminate()
+        p.join()
+        receiver.close()
+
+    if status != "ok":
+        raise res
+    return res
+
+
+def ground_queries(program):
+    """
+    :return: the ground queries of the program that can be found without grounding it, and the non-ground ones
+    """
+    queries = [clause.args[0] for clause in PrologString(program) if clause.functor == "query" and clause.arity == 1]
+    return [str(q) for q in queries if q.is_ground()], [str(q) for q in queries if not q.is_ground()]
+
+
+def vacuous(program, mode, sloutput, error):
+    """
+    Fallback answering each ground query of the program with the vacuous opinion w(0,0,1,1/2), i.e. total
+    uncertainty, or with the corresponding Beta distribution. Non-ground queries cannot be answered without grounding
+    the program, and are left out with a warning.
+    :param program: the SLProbLog program
+    :param mode: "SL" or "beta"
+    :param sloutput: whether SL opinions are expected rather than Beta distributions
+    :param error: the ResourceBudgetExceeded that caused the fallback
+    :return: dictionary query -> result
+    """
+    from SLProbLog.SLProbLog import from_sl_opinion
+
+    ground, nonground = ground_queries(program)
+    if nonground:
+        warnings.warn("The vacuous fallback does not answer the non-ground queries %s" % ", ".join(nonground))
+
+    opinion = [mpmath.mpf(0), mpmath.mpf(0), mpmath.mpf(1), mpmath.mpf("0.5")]
+    return {q: list(opinion) if sloutput else from_sl_opinion(opinion) for q in sorted(ground)}
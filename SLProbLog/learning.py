@@ -0,0 +1,224 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from collections import namedtuple
+
+import mpmath
+import numpy
+from problog.logic import Term
+
+from SLProbLog.circuit import ArraySemiring, Circuit
+from SLProbLog.parser import Annotation, scan
+
+LearningResult = namedtuple("LearningResult", ["program", "opinions", "loglikelihood", "iterations", "discarded"])
+
+
+def parametrize(program):
+    """
+    Replaces the i-th label of the program by the placeholder lfi(i), so that every ground atom of the compiled
+    circuit can be traced back to the clause it comes from.
+    :param program: the program text
+    :return: (program with placeholders, list of the Annotation replaced)
+    """
+    annotations = []
+    out = []
+    for item in scan(program):
+        if isinstance(item, Annotation):
+            out.append("lfi(%d)" % len(annotations))
+            annotations.append(item)
+        else:
+            out.append(item)
+    return "".join(out), annotations
+
+
+def _probability(annotation):
+    if annotation.functor == "w":
+        return float(annotation.args[0] + annotation.args[2] * annotation.args[3])
+    return float(annotation.args[0])
+
+
+def _interpretation(example):
+    """
+    :param example: dictionary, or iterable of pairs, atom -> observed truth value
+    :return: dictionary with the atoms written as ProbLog does
+    """
+    return {str(Term.from_string(str(atom))): bool(value) for atom, value in dict(example).items()}
+
+
+class Learner:
+    """
+    Learning from (partial) interpretations: the labels of a program are estimated by expectation maximisation from a
+    set of examples, each assigning a truth value to some of the atoms.
+    The program is grounded and compiled once, into a d-DNNF where every observed atom is a variable: an example is
+    then just an assignment of the weights of those variables, and each iteration evaluates all the examples at once
+    on numpy arrays (see ArraySemiring), with one forward and one backward pass (Circuit.gradients) giving the
+    expected counts of every ground fact.
+    """
+
+    def __init__(self, program, examples, W=2, batch_size=10000):
+        """
+        :param program: SLProbLog program; its labels are the starting point of the estimation
+        :param examples: list of interpretations, each a dictionary (or iterable of pairs) atom -> True/False
+        :param W: non-informative prior weight used for turning the expected counts into opinions
+        :param batch_size: number of examples evaluated together, bounding the memory used by an iteration
+        """
+        from SLProbLog.SLProbLog import SLProbLog
+
+        self.W = W
+        self.batch_size = batch_size
+        self._program = program
+
+        parametrized, self.annotations = parametrize(program)
+        interpretations = [_interpretation(e) for e in examples]
+        atoms = sorted({a for i in interpretations for a in i})
+        if not interpretations:
+            raise Exception("No examples to learn from")
+
+        parametrized += "".join("\nquery(%s)." % a for a in atoms)
+        slproblog = SLProbLog(parametrized, backend="ddnnf")
+        formula = slproblog._compile_with("ddnnf", None, slproblog._ground(parametrized))
+        for c in formula.constraints():
+            if len(c.get_nodes()) > 1:
+                raise Exception("Annotated disjunctions cannot be learned")
+        self.circuit = Circuit.from_formula(formula)
+        self.stats = slproblog.stats
+
+        # parameter of each slot (-1 for atoms without a label, i.e. derived atoms) and slots of each parameter
+        self._parameter = numpy.full(len(self.circuit.slot_node), -1, dtype=numpy.int64)
+        for s, k in enumerate(self.circuit.slot_node.tolist()):
+            label = formula.get_node(k).probability
+            if isinstance(label, Term) and label.functor == "lfi":
+                self._parameter[s] = int(label.args[0])
+
+        # observations[e, j] is 1 (0) if atom j is true (false) in example e, -1 if it is not observed
+        self._observations = numpy.full((len(interpretations), len(atoms)), -1, dtype=numpy.int8)
+        for e, i in enumerate(interpretations):
+            for j, a in enumerate(atoms):
+                if a in i:
+                    self._observations[e, j] = i[a]
+        labeled = dict(self.circuit.queries)
+        self._atoms = [labeled[a] for a in atoms]
+
+        self.theta = numpy.array([_probability(a) for a in self.annotations], dtype=float)
+
+    def _literals(self, observations):
+        """
+        :return: weights of the slots for a batch of examples, and the mask of the examples that are not
+        contradicted by the program (i.e. observing a deterministic atom with the wrong value)
+        """
+        n = len(observations)
+        valid = numpy.ones(n, dtype=bool)
+        pos = [self.theta[i] if i >= 0 else 1.0 for i in self._parameter.tolist()]
+        neg = [1.0 - self.theta[i] if i >= 0 else 1.0 for i in self._parameter.tolist()]
+
+        for j, ref in enumerate(self._atoms):
+            observed = observations[:, j]
+            if ref == 0 or ref is None:
+                valid &= observed != (0 if ref == 0 else 1)
+                continue
+            s = self.circuit._slots[abs(ref)]
+            true, false = (observed == 1, observed == 0) if ref > 0 else (observed == 0, observed == 1)
+            pos[s] = pos[s] * ~false
+            neg[s] = neg[s] * ~true
+
+        return self.circuit.evidence_literals(ArraySemiring(), list(zip(pos, neg))), valid
+
+    def expected_counts(self):
+        """
+        Expectation step with the current parameters.
+        :return: (expected number of true groundings of each parameter, expected number of false groundings,
+        log-likelihood of the examples, number of examples with likelihood zero)
+        """
+        semiring = ArraySemiring()
+        true = numpy.zeros(len(self.annotations))
+        false = numpy.zeros(len(self.annotations))
+        loglikelihood = 0.0
+        discarded = 0
+
+        for start in range(0, len(self._observations), self.batch_size):
+            observations = self._observations[start:start + self.batch_size]
+            n = len(observations)
+            literals, valid = self._literals(observations)
+            values = self.circuit.propagate(semiring, literals)
+            z = numpy.broadcast_to(self.circuit.root_value(values, literals), (n,))
+            valid = valid & (z > 0)
+            discarded += n - int(numpy.count_nonzero(valid))
+            if not valid.any():
+                continue
+            loglikelihood += float(numpy.sum(numpy.log(z[valid])))
+
+            grads = self.circuit.gradients(literals, values)
+            for s, i in enumerate(self._parameter.tolist()):
+                if i < 0:
+                    continue
+                (pos, neg), (dpos, dneg) = literals[s], grads[s]
+                true[i] += numpy.sum(numpy.broadcast_to(pos * dpos, (n,))[valid] / z[valid])
+                false[i] += numpy.sum(numpy.broadcast_to(neg * dneg, (n,))[valid] / z[valid])
+
+        return true, false, loglikelihood, discarded
+
+    def run(self, max_iterations=100, tolerance=1e-6):
+        """
+        Iterates expectation maximisation until the log-likelihood improves by less than the tolerance.
+        :return: LearningResult with the program labelled with the learned opinions (w(...) labels stay w(...),
+        b(...) labels become the corresponding Beta distributions), the opinions (belief, disbelief, uncertainty,
+        base) of each label, the final log-likelihood, the number of iterations and the number of examples
+        discarded because impossible
+        """
+        previous = None
+        iterations = 0
+        while True:
+            true, false, loglikelihood, discarded = self.expected_counts()
+            iterations += 1
+            total = true + false
+            self.theta = numpy.where(total > 0, true / numpy.where(total > 0, total, 1), self.theta)
+            if iterations >= max_iterations or (previous is not None and loglikelihood - previous < tolerance):
+                break
+            previous = loglikelihood
+
+        opinions = [None if n == 0 else (mpmath.mpf(r) / (n + self.W), mpmath.mpf(s) / (n + self.W),
+                                         mpmath.mpf(self.W) / (n + self.W), mpmath.mpf("1/2"))
+                    for r, s, n in zip(true.tolist(), false.tolist(), total.tolist())]
+        return LearningResult(self._label(opinions), opinions, loglikelihood, iterations, discarded)
+
+    def _label(self, opinions):
+        """
+        :return: the program with the labels replaced by the learned opinions; labels whose clauses do not occur in
+        the ground program are kept
+        """
+        from SLProbLog.SLProbLog import from_sl_opinion
+
+        out = []
+        i = 0
+        for item in scan(self._program):
+            if not isinstance(item, Annotation):
+                out.append(item)
+                continue
+            o = opinions[i]
+            i += 1
+            if o is None:
+                out.append(item.text)
+            elif item.functor == "w":
+                out.append("w(%s)" % ",".join(mpmath.nstr(x, mpmath.mp.dps) for x in o))
+            else:
+                out.append(repr(from_sl_opinion(o, self.W)))
+        return "".join(out)
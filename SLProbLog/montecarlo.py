@@ -0,0 +1,95 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import numpy
+
+from SLProbLog.SLProbLog import BetaDistribution, BetaSemiring
+from SLProbLog.circuit import ArraySemiring
+
+
+class MonteCarloResult:
+    """
+    Empirical distribution of the probability of a query
+    """
+
+    __slots__ = ("mean", "variance", "quantiles", "samples")
+
+    def __init__(self, values, quantiles):
+        values = values[~numpy.isnan(values)]
+        self.samples = len(values)
+        self.mean = float(numpy.mean(values)) if self.samples else float("nan")
+        self.variance = float(numpy.var(values, ddof=1)) if self.samples > 1 else 0.0
+        self.quantiles = dict(zip(quantiles, numpy.quantile(values, quantiles).tolist())) if self.samples else {}
+
+    def to_beta(self):
+        return BetaDistribution(self.mean, self.variance)
+
+    def __repr__(self):
+        return "mc(%s,%s)" % (self.mean, self.variance)
+
+
+def _constant(semiring, w):
+    """
+    :return: the probability of a weight whose mean is 0 or 1, which only a degenerate Beta distribution has, or None
+    """
+    mean = float(semiring.parse(w).mean())
+    return mean if mean in (0.0, 1.0) else None
+
+
+def sample_weights(circuit, samples, rng):
+    """
+    Draws the probabilities of the leaves of a circuit whose weights are Beta distributions
+    :param circuit: Circuit built with the BetaSemiring
+    :param samples: number of draws
+    :param rng: numpy random Generator
+    :return: list of (positive, negative) weights of each slot, as arrays of the given size (or 0.0 and 1.0 for
+    deterministic weights, recognised by their mean however they are written, e.g. b(1.0, 1e-9))
+    """
+    semiring = BetaSemiring()
+    weights = []
+    for pos, neg in circuit.weights:
+        p = _constant(semiring, pos)
+        if p is None:
+            b = semiring.parse(pos)
+            p = rng.beta(float(b.alpha()), float(b.beta()), samples)
+        q = _constant(semiring, neg)
+        weights.append((p, 1.0 - p if q is None else q))
+    return weights
+
+
+def run_montecarlo(circuit, samples=1000, quantiles=(0.05, 0.5, 0.95), seed=None):
+    """
+    Propagates the uncertainty of the leaves by sampling: each leaf probability is drawn from its Beta distribution
+    and the circuit is evaluated with ordinary probability arithmetic on all the draws at once.
+    :param circuit: Circuit built with the BetaSemiring
+    :param samples: number of draws
+    :param quantiles: quantiles to be reported
+    :param seed: seed of the random generator
+    :return: dictionary query -> MonteCarloResult
+    """
+    rng = numpy.random.default_rng(seed)
+    weights = sample_weights(circuit, samples, rng)
+
+    ret = {}
+    for name, value in circuit.evaluate(ArraySemiring(), weights):
+        ret[name] = MonteCarloResult(numpy.broadcast_to(numpy.asarray(value, dtype=float), (samples,)), quantiles)
+    return ret
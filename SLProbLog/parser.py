@@ -0,0 +1,309 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hashlib
+import re
+from collections import namedtuple
+
+import mpmath
+
+Token = namedtuple("Token", ["kind", "text", "line", "column"])
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<comment>%[^\n]*)
+  | (?P<block>/\*.*?\*/)
+  | (?P<quoted>'(?:[^'\\\n]|\\.|'')*')
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<annotation>::)
+  | (?P<neck>:-)
+  | (?P<open>[(\[{])
+  | (?P<close>[)\]}])
+  | (?P<semicolon>;)
+  | (?P<end>\.(?=\s|%|$))
+  | (?P<newline>\n)
+  | (?P<space>[ \t\r\f\v]+)
+  | (?P<text>(?:[^%'"():;\[\]{}.\s/]|\.(?=\d))+|.)
+""", re.VERBOSE | re.DOTALL)
+
+_LABEL_RE = re.compile(r"^([a-z]\w*)\s*\((.*)\)$", re.DOTALL)
+
+_ARITIES = {"w": 4, "b": 2}
+
+_LAYOUT = ("comment", "block", "newline", "space")
+
+# the only tokens that can contain a newline
+_MULTILINE = ("newline", "block")
+
+
+class Annotation:
+    """
+    A label of a program: its functor and text, and its arguments as mpf, parsed from the text only when first read
+    """
+
+    __slots__ = ("functor", "text", "line", "column", "_args")
+
+    def __init__(self, functor, text, line, column):
+        self.functor = functor
+        self.text = text
+        self.line = line
+        self.column = column
+        self._args = None
+
+    @property
+    def args(self):
+        if self._args is None:
+            m = _LABEL_RE.match(self.text)
+            try:
+                self._args = [mpmath.mpf(x.strip()) for x in m.group(2).split(",")]
+            except ValueError:
+                raise SLProbLogSyntaxError("Non numeric argument in label %s" % self.text, self.line, self.column)
+        return self._args
+
+    def __repr__(self):
+        return "Annotation(%s, line %d, column %d)" % (self.text, self.line, self.column)
+
+
+class SLProbLogSyntaxError(Exception):
+    """
+    Error in a SLProbLog program, located by line and column (both starting from 1)
+    """
+
+    def __init__(self, message, line, column):
+        Exception.__init__(self, "%s at line %d, column %d" % (message, line, column))
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __reduce__(self):
+        return (type(self), (self.message, self.line, self.column))
+
+
+def tokenize(program):
+    """
+    Splits a SLProbLog program into tokens in a single pass.
+    :param program: the program text
+    :return: generator of Token(kind, text, line, column)
+    """
+    line = 1
+    line_start = 0
+    for m in _TOKEN_RE.finditer(program):
+        kind = m.lastgroup
+        text = m.group()
+        pos = m.start()
+
+        if kind == "text" and len(text) == 1:
+            if text in ("'", '"'):
+                raise SLProbLogSyntaxError("Unterminated quoted atom", line, pos - line_start + 1)
+            if program.startswith("/*", pos):
+                raise SLProbLogSyntaxError("Unterminated block comment", line, pos - line_start + 1)
+
+        yield Token(kind, text, line, pos - line_start + 1)
+
+        if kind in _MULTILINE:
+            newlines = text.count("\n")
+            if newlines:
+                line += newlines
+                line_start = pos + text.rfind("\n") + 1
+
+
+def parse_label(text, line=1, column=1):
+    """
+    Parses a w(b,d,u,a) or b(mean,variance) label.
+    :param text: the label, e.g. "w(0.3,0.5,0.2,0.5)"
+    :param line: line of the label, used for errors
+    :param column: column of the label, used for errors
+    :return: Annotation with the functor; its arguments are only parsed, and checked to be numbers, when read
+    """
+    text = text.strip()
+    m = _LABEL_RE.match(text)
+    if not m or m.group(1) not in _ARITIES:
+        raise SLProbLogSyntaxError("Unknown label %s, expected w(b,d,u,a) or b(mean,variance)" % text, line, column)
+
+    functor = m.group(1)
+    if m.group(2).count(",") + 1 != _ARITIES[functor]:
+        raise SLProbLogSyntaxError("Label %s requires %d arguments" % (functor, _ARITIES[functor]), line, column)
+
+    return Annotation(functor, text, line, column)
+
+
+def scan(program):
+    """
+    Single pass over the program separating labels from the rest of the text.
+    Labels are recognised only in the head of a clause (i.e. before :-) and outside of any term, thus
+    multi-line clauses, comments, quoted atoms and :: inside terms are handled.
+    :param program: the program text
+    :return: generator of either strings (text to be copied verbatim) or Annotation
+    """
+    depth = 0
+    in_head = True
+    segment = []
+    last = None
+
+    for tok in tokenize(program):
+        last = tok
+        if tok.kind == "open":
+            depth += 1
+        elif tok.kind == "close":
+            depth -= 1
+            if depth < 0:
+                raise SLProbLogSyntaxError("Unbalanced parenthesis", tok.line, tok.column)
+
+        if depth > 0:
+            if tok.kind == "end":
+                raise SLProbLogSyntaxError("Unbalanced parenthesis", tok.line, tok.column)
+            if in_head:
+                segment.append(tok)
+            else:
+                yield tok.text
+            continue
+
+        if not in_head:
+            yield tok.text
+            in_head = tok.kind == "end"
+            continue
+
+        if tok.kind == "annotation":
+            lead = 0
+            while lead < len(segment) and segment[lead].kind in _LAYOUT:
+                lead += 1
+            for t in segment[:lead]:
+                yield t.text
+            if lead == len(segment):
+                raise SLProbLogSyntaxError("Missing label", tok.line, tok.column)
+
+            yield parse_label("".join(t.text for t in segment[lead:]), segment[lead].line, segment[lead].column)
+            yield tok.text
+            segment = []
+        elif tok.kind in ("semicolon", "neck", "end"):
+            for t in segment:
+                yield t.text
+            yield tok.text
+            segment = []
+            in_head = tok.kind != "neck"
+        else:
+            segment.append(tok)
+
+    if depth > 0:
+        raise SLProbLogSyntaxError("Unbalanced parenthesis", last.line, last.column)
+
+    for t in segment:
+        if t.kind not in _LAYOUT:
+            raise SLProbLogSyntaxError("Clause not terminated by a full stop", t.line, t.column)
+        yield t.text
+
+
+_WORD = re.compile(r"\w")
+_SYMBOL = re.compile(r"[-+*/\\^<>=~:.?@#&$]")
+
+
+def _kind(c):
+    return "word" if _WORD.match(c) else "symbol" if _SYMBOL.match(c) else None
+
+
+def scan_significant(program):
+    """
+    scan without layout: whitespace and comments are dropped, and a single space is kept only where they separated
+    two tokens that would otherwise run together (e.g. two words, or two operators), so that programs differing only
+    in their layout give the same items.
+    :param program: the program text
+    :return: generator of either strings or Annotation, as scan
+    """
+    previous = None
+    separated = False
+    for item in scan(program):
+        if isinstance(item, Annotation):
+            previous = None
+            separated = False
+            yield item
+            continue
+        if item.isspace() or item.startswith("%") or item.startswith("/*"):
+            separated = True
+            continue
+        if separated and previous is not None and _kind(previous[-1]) is not None \
+                and _kind(previous[-1]) == _kind(item[0]):
+            yield " "
+        previous = item
+        separated = False
+        yield item
+
+
+def iter_annotations(program):
+    """
+    :param program: the program text
+    :return: generator of all the Annotation in the program, in order
+    """
+    for item in scan(program):
+        if isinstance(item, Annotation):
+            yield item
+
+
+def convert_labels(program, to_sl=False, to_beta=False):
+    """
+    Converts all the labels of a program either to SL opinions or to Beta distributions in a single linear pass.
+    Identical labels are converted only once, and only the arguments of the labels converted are parsed.
+    :param program: the program text
+    :param to_sl: convert b(...) labels into w(...) labels
+    :param to_beta: convert w(...) labels into b(...) labels
+    :return: the converted program, the program itself if no label is converted
+    """
+    from SLProbLog.SLProbLog import BetaDistribution, from_sl_opinion
+
+    if to_sl and to_beta:
+        raise Exception("Cannot convert both to SL and to Beta")
+
+    converted = {}
+    changed = False
+    out = []
+    for item in scan(program):
+        if not isinstance(item, Annotation):
+            out.append(item)
+            continue
+
+        if item.text not in converted:
+            if to_sl and item.functor == "b":
+                wb = BetaDistribution(item.args[0], item.args[1]).to_sl_opinion()
+                converted[item.text] = "w(%s,%s,%s,%s)" % (mpmath.nstr(wb[0]),
+                                                           mpmath.nstr(wb[1]),
+                                                           mpmath.nstr(wb[2]),
+                                                           mpmath.nstr(wb[3]))
+            elif to_beta and item.functor == "w":
+                converted[item.text] = repr(from_sl_opinion(item.args))
+            else:
+                converted[item.text] = item.text
+        changed = changed or converted[item.text] != item.text
+        out.append(converted[item.text])
+
+    return "".join(out) if changed else program
+
+
+def structure_key(program):
+    """
+    Hash of the structure of a program, i.e. of the program with all the labels removed: programs that differ only
+    in their w(...)/b(...) labels share the same key.
+    :param program: the program text
+    :return: hexadecimal digest
+    """
+    h = hashlib.sha1()
+    for item in scan(program):
+        h.update(b"?" if isinstance(item, Annotation) else item.encode("utf-8"))
+    return h.hexdigest()
@@ -0,0 +1,116 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from SLProbLog.SLProbLog import SLProbLog
+
+MODES = ("SL", "beta")
+
+
+def infer(program, mode="beta", **options):
+    """
+    Evaluates a program from scratch; runs in the worker processes of an InferencePool.
+    :param program: SLProbLog program
+    :param mode: "SL" for run_SL, "beta" for run_beta
+    :param options: keyword arguments of SLProbLog (sloutput, backend, low_memory, ...)
+    :return: (results, stats)
+    """
+    if mode not in MODES:
+        raise Exception("Unknown mode: %s" % mode)
+    p = SLProbLog(program, **options)
+    res = p.run_SL() if mode == "SL" else p.run_beta()
+    return res, p.stats
+
+
+class InferencePool:
+    """
+    Asynchronous inference: grounding, compilation and evaluation run in a pool of worker processes, so that an
+    asyncio service can use every core without blocking its event loop.
+    At most max_pending requests are submitted to the pool at the same time, the others wait in run (backpressure).
+    Cancelling a request that has not started yet removes it from the pool; a request already running in a worker
+    cannot be interrupted, and keeps its place among the pending ones until it finishes (use the budget option for
+    bounding it).
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, mp_context=None):
+        """
+        :param max_workers: number of worker processes, by default the number of cores
+        :param max_pending: maximum number of requests submitted to the pool, by default twice the number of workers
+        :param mp_context: multiprocessing context of the workers, by default forkserver (or spawn where it is not
+        available): an asyncio service runs several threads, and forking it could deadlock the workers on a lock held
+        by another thread. The workers themselves are single-threaded, so the budget option can fork them safely.
+        """
+        if mp_context is None:
+            methods = multiprocessing.get_all_start_methods()
+            mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.max_workers
+        self._executor = ProcessPoolExecutor(self.max_workers, mp_context=mp_context)
+        self._semaphore = None
+
+    async def run(self, program, mode="beta", **options):
+        """
+        :param program: SLProbLog program
+        :param mode: "SL" for run_SL, "beta" for run_beta
+        :param options: keyword arguments of SLProbLog, which must be picklable (e.g. no cache or cancel event)
+        :return: (results, stats) as computed by infer
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+
+        await self._semaphore.acquire()
+        try:
+            future = self._executor.submit(infer, program, mode, **options)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # the slot is given back when the worker is done, not when the caller stops waiting
+        future.add_done_callback(lambda f: self._release(loop))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def _release(self, loop):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._semaphore.release)
+
+    async def run_SL(self, program, **options):
+        return (await self.run(program, "SL", **options))[0]
+
+    async def run_beta(self, program, **options):
+        return (await self.run(program, "beta", **options))[0]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
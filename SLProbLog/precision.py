@@ -0,0 +1,298 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import mpmath
+
+from SLProbLog.SLProbLog import SLSemiring, BetaSemiring, BetaDistribution, EPSILON
+
+DPS = 50
+THRESHOLD = 1e-8
+
+_SL_ONE = (1.0, 0.0, 0.0, 1.0)
+_SL_ZERO = (0.0, 1.0, 0.0, 0.0)
+_SL_VACUOUS = (0.0, 0.0, 1.0, 0.5)
+
+
+class IllConditioned(Exception):
+    """
+    Raised by the float64 operations when their result cannot be trusted
+    """
+
+
+def _small(x, scale, threshold):
+    """
+    :return: whether x, computed from quantities of magnitude scale, lost (almost) all its significant digits
+    """
+    return abs(x) <= threshold * abs(scale)
+
+
+def _text(functor, value):
+    return "%s(%s)" % (functor, ",".join(str(x) if hasattr(x, "_mpf_") else repr(x) for x in value))
+
+
+class _AdaptiveSemiring:
+    """
+    Values are tuples of floats, computed in float64, or tuples of mpf once an operation has been escalated: an
+    operation is escalated, i.e. recomputed in mpmath with dps digits by the exact semiring, when its float64 version
+    raises IllConditioned or when one of its operands has already been escalated, so that everything depending on an
+    ill-conditioned operation is computed in mpmath while the rest of the circuit stays in float64.
+    """
+
+    _functor = None
+
+    def __init__(self, exact, dps=DPS, threshold=THRESHOLD):
+        """
+        :param exact: class of the string based semiring used for escalated operations
+        :param dps: decimal digits of the escalated operations, computed in a private mpmath context so that the
+        global precision is never changed
+        :param threshold: relative size under which a denominator or the result of a subtraction is ill-conditioned
+        """
+        self._context = mpmath.MPContext()
+        self._context.dps = dps
+        self._exact = exact(self._context)
+        self.dps = dps
+        self.threshold = threshold
+        self.escalations = 0
+
+    def is_escalated(self, value):
+        return hasattr(value[0], "_mpf_")
+
+    def _escalate(self, operation, *values):
+        if not any(self.is_escalated(v) for v in values):
+            self.escalations += 1
+        res = getattr(self._exact, operation)(*[_text(self._functor, v) for v in values])
+        return self._tuple(self._exact.parse(res))
+
+    def _apply(self, operation, *values):
+        if not any(self.is_escalated(v) for v in values):
+            try:
+                return getattr(self, "_" + operation)(*values)
+            except (IllConditioned, ZeroDivisionError):
+                pass
+        return self._escalate(operation, *values)
+
+    def plus(self, x, y):
+        return self._apply("plus", x, y)
+
+    def times(self, x, y):
+        return self._apply("times", x, y)
+
+    def negate(self, x):
+        return self._apply("negate", x)
+
+    def normalize(self, x, z):
+        return self._apply("normalize", x, z)
+
+    def value(self, a):
+        return self._tuple_float(self._exact.parse(self._exact.value(a)))
+
+    def is_dsp(self):
+        return True
+
+
+class AdaptiveSLSemiring(_AdaptiveSemiring, SLSemiring):
+    """
+    SLSemiring computing in float64, with escalation to mpmath of ill-conditioned operations: times when 1 - a1 * a2
+    is close to 0, plus when the sum of the base rates is, normalize when a2, 1 - d2, the expectation of z or 1 - a are.
+    """
+
+    _functor = "w"
+
+    def __init__(self, dps=DPS, threshold=THRESHOLD):
+        _AdaptiveSemiring.__init__(self, SLSemiring, dps, threshold)
+
+    def _tuple(self, w):
+        return tuple(w)
+
+    def _tuple_float(self, w):
+        return tuple(float(x) for x in w)
+
+    def parse(self, w):
+        return [mpmath.mpf(x) for x in w]
+
+    def one(self):
+        return _SL_ONE
+
+    def zero(self):
+        return _SL_ZERO
+
+    def _plus(self, x, y):
+        b1, d1, u1, a1 = x
+        b2, d2, u2, a2 = y
+
+        if x == _SL_ZERO:
+            return y
+        if y == _SL_ZERO:
+            return x
+
+        s = a1 + a2
+        if _small(s, 1.0, self.threshold):
+            raise IllConditioned()
+        d = max(0.0, (a1 * (d1 - b2) + a2 * (d2 - b1)) / s)
+        return (min(b1 + b2, 1.0), d, (a1 * u1 + a2 * u2) / s, min(s, 1.0))
+
+    def _times(self, x, y):
+        b1, d1, u1, a1 = x
+        b2, d2, u2, a2 = y
+
+        if x == _SL_ONE:
+            return y
+        if y == _SL_ONE:
+            return x
+
+        den = 1 - a1 * a2
+        if _small(den, 1.0, self.threshold):
+            raise IllConditioned()
+
+        b = b1 * b2 + ((1 - a1) * a2 * b1 * u2 + a1 * (1 - a2) * u1 * b2) / den
+        u = u1 * u2 + ((1 - a2) * b1 * u2 + (1 - a1) * u1 * b2) / den
+        d = min(1, d1 + d2 - d1 * d2)
+        return (b, d, u, a1 * a2)
+
+    def _negate(self, x):
+        b1, d1, u1, a1 = x
+        return (d1, b1, u1, 1 - a1)
+
+    def _normalize(self, x, z):
+        # as in SLSemiring, only the one() object itself is left untouched
+        if z is _SL_ONE:
+            return x
+
+        b1, d1, u1, a1 = x
+        b2, d2, u2, a2 = z
+        e1 = b1 + u1 * a1
+        e2 = b2 + u2 * a2
+
+        if not ((a1 <= a2) and (d1 >= d2) and (b1 * (1 - a1) * a2 * (1 - d2) >= a1 * (1 - a2) * (1 - d1) * b2) and
+                (u1 * (1 - a1) * (1 - d2) >= u2 * (1 - a2) * (1 - d1)) and a2 != 0):
+            return _SL_VACUOUS
+
+        if _small(a2, 1.0, self.threshold):
+            raise IllConditioned()
+        a = a1 / a2
+        if e1 == 0:
+            return (0.0, 1.0, 0.0, a)
+        if a == 1:
+            return (1.0, 0.0, 0.0, a)
+
+        if _small(1 - a, 1.0, self.threshold) or _small(1 - d2, 1.0, self.threshold) or \
+                _small(e2, 1.0, self.threshold):
+            raise IllConditioned()
+        e = e1 / e2
+        d = min(max(0, (d1 - d2) / (1 - d2)), 1)
+        u = min(max(0, (1 - d - e) / (1 - a)), 1)
+        b = min(max(0, (1 - d - u)), 1)
+        return (b, d, u, a)
+
+
+class AdaptiveBetaSemiring(_AdaptiveSemiring, BetaSemiring):
+    """
+    BetaSemiring computing in float64, with escalation to mpmath of ill-conditioned operations: conditioning when the
+    mean of z, muneg = mean(z) - mean(x), varneg = var(z) - var(x) or the variance before clamping are close to 0.
+    """
+
+    _functor = "b"
+
+    def __init__(self, dps=DPS, threshold=THRESHOLD):
+        _AdaptiveSemiring.__init__(self, BetaSemiring, dps, threshold)
+
+    def _tuple(self, b):
+        return (b.mean(), b.variance())
+
+    def _tuple_float(self, b):
+        return (float(b.mean()), float(b.variance()))
+
+    def parse(self, w):
+        return BetaDistribution(mpmath.mpf(w[0]), mpmath.mpf(w[1]))
+
+    def one(self):
+        return (1.0, 0.000000001)
+
+    def zero(self):
+        return (0.0, 0.000000001)
+
+    @staticmethod
+    def _clamp(mean, var):
+        return min(var, mean ** 2 * (1.0 - mean) / (1.0 + mean), (1.0 - mean) ** 2 * mean / (2 - mean))
+
+    def _plus(self, x, y):
+        mean = x[0] + y[0]
+        return (mean, self._clamp(mean, x[1] + y[1]))
+
+    def _times(self, x, y):
+        mean = x[0] * y[0]
+        return (mean, self._clamp(mean, x[1] * y[1] + x[1] * y[0] ** 2 + y[1] * x[0] ** 2))
+
+    def _negate(self, x):
+        if not 0 <= x[0] <= 1:
+            raise Exception("Error with negation: [%f, %f]", (x[0], x[1]))
+        return (1.0 - x[0], x[1])
+
+    def _normalize(self, x, z):
+        if abs(z[0] - 1) <= EPSILON:
+            return x
+
+        m1, v1 = x
+        mz, vz = z
+        if _small(mz, 1.0, self.threshold):
+            raise IllConditioned()
+        mean = min(1.0 - 1e-6, m1 / mz)
+
+        muneg = mz - m1
+        varneg = vz - v1
+        if _small(muneg, mz, self.threshold) or _small(varneg, vz, self.threshold):
+            raise IllConditioned()
+
+        pv = self._times(x, (muneg, varneg))[1]
+
+        if m1 <= 0:
+            m1 = 1e-10
+        if muneg <= 0:
+            muneg = 1e-10
+
+        t1 = v1 / (m1 ** 2)
+        t2 = varneg / (muneg ** 2)
+        t3 = 2 * (pv / (m1 * muneg))
+        if _small(t1 + t2 - t3, t1 + t2 + t3, self.threshold):
+            raise IllConditioned()
+
+        var = mean ** 2 * (1.0 - mean) ** 2 * (t1 + t2 - t3)
+        return (mean, self._clamp(mean, var))
+
+
+def evaluate(circuit, semiring, weights=None):
+    """
+    Evaluates all the queries of a circuit with an adaptive semiring.
+    :return: (list of (query name, value), number of nodes whose value has been escalated to mpmath)
+    """
+    literals = circuit.evidence_literals(semiring, weights)
+    values = circuit.propagate(semiring, literals)
+    escalated = {k for k, v in values.items() if semiring.is_escalated(v)}
+    z = circuit.root_value(values, literals)
+
+    results = []
+    for name, ref in circuit.queries:
+        result, query_values = circuit.query(semiring, ref, values, literals, z)
+        if query_values is not values:
+            escalated.update(k for k, v in query_values.items() if semiring.is_escalated(v))
+        results.append((name, result))
+    return results, len(escalated)
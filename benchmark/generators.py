@@ -0,0 +1,122 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import random
+from string import Template
+from experiment.experimental_setting import Graph
+
+
+def _opinion(rng, nsamples=10):
+    """
+    Random SL opinion derived, as in DistProbLog, from nsamples observations of a random probability
+    """
+    p = rng.uniform(0, 1)
+    rcount = sum(1 for _ in range(nsamples) if rng.uniform(0, 1) < p)
+    scount = nsamples - rcount
+    return "w(%s,%s,%s,0.5)" % (rcount / (nsamples + 2), scount / (nsamples + 2), 2 / (nsamples + 2))
+
+
+def friends_and_smokers(npersons, density=0.3, seed=0):
+    """
+    Friends and smokers program over npersons persons: each person is friend with the next one, and any two persons
+    are friends with probability density
+    :param npersons: number of persons
+    :param density: probability of a friendship between any two persons
+    :param seed: seed of the random generator
+    :return: SLProbLog program
+    """
+    rng = random.Random(seed)
+
+    ret = "%s::stress(X) :- person(X).\n" % _opinion(rng)
+    ret += "%s::influences(X,Y) :- person(X), person(Y).\n\n" % _opinion(rng)
+    ret += "smokes(X) :- stress(X).\n"
+    ret += "smokes(X) :- friend(X,Y), influences(Y,X), smokes(Y).\n\n"
+    ret += "%s::asthma(X) :- smokes(X).\n\n" % _opinion(rng)
+
+    for i in range(npersons):
+        ret += "person(%d).\n" % i
+
+    for i in range(npersons):
+        for j in range(npersons):
+            if i != j and (j == (i + 1) % npersons or rng.uniform(0, 1) < density):
+                ret += "friend(%d,%d).\n" % (i, j)
+
+    ret += "\nevidence(smokes(0),true).\n"
+    for i in range(1, npersons):
+        ret += "query(smokes(%d)).\n" % i
+    for i in range(npersons):
+        ret += "query(asthma(%d)).\n" % i
+
+    return ret
+
+
+def random_network(nnodes, max_indegree=2, seed=0, encoding="table"):
+    """
+    Random DAG Bayesian network, built through Graph, with nnodes nodes each with at most max_indegree parents
+    :param nnodes: number of nodes
+    :param max_indegree: maximum number of parents of a node
+    :param seed: seed of the random generator
+    :param encoding: encoding of the CPTs, see Graph.set_encoding
+    :return: SLProbLog program
+    """
+    rng = random.Random(seed)
+
+    net = Graph()
+    for j in range(1, nnodes):
+        for i in rng.sample(range(j), rng.randint(1, min(max_indegree, j))):
+            net.add_edge([str(i), str(j)])
+
+    problogstring = net.get_problog_string(encoding)
+
+    substitutions = {}
+    for n, p in net.semanticsprobs.items():
+        for k in (p if isinstance(p, list) else [p]):
+            substitutions[k] = _opinion(rng)
+    for n, e in net.semanticsevidences.items():
+        substitutions[e] = "true" if rng.uniform(0, 1) < 0.5 else "false"
+
+    return Template(problogstring).safe_substitute(substitutions)
+
+
+def chain(length, seed=0):
+    """
+    Chain c0 -> c1 -> ... of the given length, with a query on the last element
+    :param length: number of elements of the chain
+    :param seed: seed of the random generator
+    :return: SLProbLog program
+    """
+    rng = random.Random(seed)
+
+    ret = "%s::c0.\n" % _opinion(rng)
+    for i in range(1, length):
+        ret += "%s::c%d :- c%d.\n" % (_opinion(rng), i, i - 1)
+        ret += "%s::c%d :- \\+c%d.\n" % (_opinion(rng), i, i - 1)
+    ret += "query(c%d).\n" % (length - 1)
+
+    return ret
+
+
+GENERATORS = {
+    "smokers": friends_and_smokers,
+    "network": random_network,
+    "chain": chain,
+}
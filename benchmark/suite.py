@@ -0,0 +1,169 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import problog.version
+from SLProbLog.SLProbLog import SLProbLog, SLSemiring, BetaSemiring
+from SLProbLog.backends import BACKENDS
+from benchmark.generators import GENERATORS
+
+
+def _timed(f, *args):
+    start = time.perf_counter()
+    res = f(*args)
+    return res, time.perf_counter() - start
+
+
+def measure(program, sl=True, backend=None):
+    """
+    Times the phases of run_SL (sl=True) or run_beta (sl=False) on a program and measures the peak memory of the
+    whole run. Memory is traced in a separate run as tracing slows down the computation.
+    :param program: SLProbLog program
+    :param sl: whether to use SL operators or Beta-based operators
+    :param backend: knowledge compilation backend, see SLProbLog; by default ddnnf for the SL operators
+    :return: dictionary of measures (seconds and bytes)
+    """
+    if sl and backend is None:
+        # the SL operators divide by zero on the x or not x nodes that smooth SDDs, as in SLProbLog.anytime
+        backend = "ddnnf"
+    p = SLProbLog(program, True, backend=backend)
+    if sl:
+        semiring = SLSemiring()
+        converted, t_convert = _timed(p._convert_input, True, False)
+    else:
+        semiring = BetaSemiring()
+        converted, t_convert = _timed(p._convert_input, False, True)
+
+    ground, t_ground = _timed(p._ground, converted)
+    formula, t_compile = _timed(p._compile, semiring, ground)
+    res, t_evaluate = _timed(p._evaluate, semiring, formula)
+
+    tracemalloc.start()
+    p.run_SL() if sl else p.run_beta()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"convert": t_convert,
+            "ground": t_ground,
+            "compile": t_compile,
+            "evaluate": t_evaluate,
+            "total": t_convert + t_ground + t_compile + t_evaluate,
+            "ground_size": len(ground),
+            "backend": p.stats["backend"],
+            "circuit_size": p.stats["circuit_size"],
+            "queries": len(res),
+            "peak_memory": peak}
+
+
+def run_suite(workloads, sizes, repeat=1, seed=0, modes=("SL", "beta"), backend=None, keep_going=False):
+    """
+    Runs the benchmarks
+    :param workloads: names of the generators in GENERATORS
+    :param sizes: sizes passed to the generators
+    :param repeat: how many times each measure is repeated
+    :param seed: seed passed to the generators
+    :param modes: "SL" for run_SL and/or "beta" for run_beta
+    :param backend: knowledge compilation backend, see SLProbLog
+    :param keep_going: record the failed runs with an "error" entry instead of raising their exception
+    :return: list of records, one per workload, size, mode and repetition
+    """
+    records = []
+    for w in workloads:
+        for n in sizes:
+            program = GENERATORS[w](n, seed=seed)
+            for mode in modes:
+                for r in range(repeat):
+                    record = {"workload": w, "size": n, "mode": mode, "repetition": r, "seed": seed}
+                    try:
+                        record.update(measure(program, mode == "SL", backend))
+                        sys.stderr.write("%s %d %s: %.3fs\n" % (w, n, mode, record["total"]))
+                    except Exception as e:
+                        if not keep_going:
+                            raise
+                        record["error"] = repr(e)
+                        sys.stderr.write("%s %d %s: %s\n" % (w, n, mode, record["error"]))
+                    records.append(record)
+    return records
+
+
+def compare(old, new):
+    """
+    Prints the ratio between the total times of two result files, matching workload, size and mode
+    :param old: results loaded from a previous run
+    :param new: results of this run
+    """
+    def totals(results):
+        ret = {}
+        for r in results["results"]:
+            if "total" in r:
+                ret.setdefault((r["workload"], r["size"], r["mode"]), []).append(r["total"])
+        return {k: min(v) for k, v in ret.items()}
+
+    before = totals(old)
+    after = totals(new)
+    for k in sorted(set(before) & set(after)):
+        print("%-10s %6d %-5s %10.4fs %10.4fs %8.2fx" % (k[0], k[1], k[2], before[k], after[k], before[k] / after[k]))
+
+
+def environment():
+    return {"date": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "problog": problog.version.version,
+            "platform": platform.platform()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--workloads", nargs="+", default=sorted(GENERATORS), choices=sorted(GENERATORS))
+    parser.add_argument("-n", "--sizes", nargs="+", type=int, default=[2, 4, 8])
+    parser.add_argument("-r", "--repeat", type=int, default=1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-m", "--modes", nargs="+", default=["SL", "beta"], choices=["SL", "beta"])
+    parser.add_argument("-k", "--backend", choices=("auto",) + BACKENDS)
+    parser.add_argument("-o", "--output", help="JSON file where to write the results", default="benchmark.json")
+    parser.add_argument("-c", "--compare", help="JSON file of a previous run to compare with")
+    parser.add_argument("--keep-going", action="store_true",
+                        help="Record failed runs in the results instead of stopping; the exit status is still 1")
+
+    args = parser.parse_args()
+
+    results = {"environment": environment(),
+               "results": run_suite(args.workloads, args.sizes, args.repeat, args.seed, args.modes, args.backend,
+                                    args.keep_going)}
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+    failed = [r for r in results["results"] if "error" in r]
+    if failed:
+        sys.exit("%d runs failed" % len(failed))
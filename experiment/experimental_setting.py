@@ -22,11 +22,14 @@ THE SOFTWARE.
 
 import sys
 from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.fused import fused_label
+from experiment.sampling import draws as draw_sequence
 from itertools import product
 import numpy.random
 import pickle
 import datetime
 import math
+from statistics import NormalDist
 from string import Formatter,Template
 from problog import get_evaluatable
 from problog.program import PrologString
@@ -64,6 +67,40 @@ class Node:
     def __repr__(self):
         return "n" + self._name
 
+ENCODINGS = ("table", "noisy-or", "noisy-and", "tree")
+
+
+def _literal(node, value):
+    return ("" if value else "\\+") + node.get_problog_name()
+
+
+def _tree_rules(rows, nparents):
+    """
+    Merges the rows of a CPT with the same label into the leaves of a decision tree over the parents
+    :param rows: dictionary from tuples of parent values to labels
+    :param nparents: number of parents
+    :return: list of (conditions, label), conditions being lists of (parent index, value)
+    """
+    def split(assignments, conditions):
+        labels = set(rows[a] for a in assignments)
+        if len(labels) == 1:
+            return [(conditions, labels.pop())]
+
+        used = set(i for i, v in conditions)
+        best = None
+        for i in range(nparents):
+            if i not in used:
+                cost = len(set(rows[a] for a in assignments if not a[i])) + \
+                       len(set(rows[a] for a in assignments if a[i]))
+                if best is None or cost < best[0]:
+                    best = (cost, i)
+        i = best[1]
+        return split([a for a in assignments if not a[i]], conditions + [(i, False)]) + \
+               split([a for a in assignments if a[i]], conditions + [(i, True)])
+
+    return split(list(product((False, True), repeat=nparents)), [])
+
+
 class Graph:
     """
     Data structure to represent a Bayesian network
@@ -71,6 +108,7 @@ class Graph:
 
     def __init__(self):
         self._nodes = {}
+        self._encodings = {}
 
     def storeFilename(self, fn):
         self.filename = fn
@@ -89,10 +127,80 @@ class Graph:
         self._nodes[edge[1]].add_parent(self._nodes[edge[0]])
         self._nodes[edge[0]].add_children(self._nodes[edge[1]])
 
+    def set_encoding(self, name, encoding, rows=None):
+        """
+        Chooses how the CPT of a node is written in the ProbLog program:
+        - "table": one clause, and one parameter, per row (2^k for k parents)
+        - "noisy-or": a leak parameter plus one per parent, the node being caused independently by each true parent
+        - "noisy-and": a leak parameter plus one per parent, the node holding only if every parent is true and passes
+        on its influence
+        - "tree": rows with the same label share the same parameter, and are merged into the leaves of a decision tree
+        :param name: name of the node
+        :param encoding: one of ENCODINGS
+        :param rows: for "tree", dictionary from the tuples of parent values (in the order of get_parents()) to labels;
+        if None every row has its own label, as with "table", and the tree is complete
+        """
+        if encoding not in ENCODINGS:
+            raise Exception("Unknown encoding: %s" % encoding)
+        if encoding == "tree" and rows is not None:
+            if set(rows) != set(product((False, True), repeat=len(self._nodes[name].get_parents()))):
+                raise Exception("The tree encoding of %s requires a label for each row of its CPT" % name)
+        self._encodings[name] = (encoding, rows)
+
     def __repr__(self):
         return str(self.__dict__)
 
-    def get_problog_string(self):
+    def _cpt(self, node, encoding, rows, p_index):
+        """
+        :return: the clauses of the CPT of a node with parents, its parameters and the next free parameter index
+        """
+        parents = node.get_parents()
+        name = node.get_problog_name()
+        ret = ""
+        params = []
+
+        if encoding == "table":
+            for values in product((False, True), repeat=len(parents)):
+                params.append("p" + str(p_index + len(params)))
+                ret += "${%s}::%s :- %s.\n" % (params[-1], name,
+                                                 ", ".join(_literal(p, v) for p, v in zip(parents, values)))
+
+        elif encoding == "noisy-or":
+            params.append("p" + str(p_index))
+            ret += "${%s}::%s.\n" % (params[-1], name)
+            for p in parents:
+                params.append("p" + str(p_index + len(params)))
+                ret += "${%s}::%s :- %s.\n" % (params[-1], name, p.get_problog_name())
+
+        elif encoding == "noisy-and":
+            params.append("p" + str(p_index))
+            links = ["%s_and%d" % (name, i) for i in range(len(parents))]
+            for p, link in zip(parents, links):
+                params.append("p" + str(p_index + len(params)))
+                ret += "${%s}::%s :- %s.\n" % (params[-1], link, p.get_problog_name())
+            ret += "${%s}::%s :- %s.\n" % (params[0], name, ", ".join(links))
+
+        else:
+            if rows is None:
+                rows = {values: values for values in product((False, True), repeat=len(parents))}
+            labels = {}
+            for values in product((False, True), repeat=len(parents)):
+                if rows[values] not in labels:
+                    labels[rows[values]] = "p" + str(p_index + len(labels))
+            params = list(labels.values())
+            for conditions, label in _tree_rules(rows, len(parents)):
+                if conditions:
+                    ret += "${%s}::%s :- %s.\n" % (labels[label], name,
+                                                     ", ".join(_literal(parents[i], v) for i, v in conditions))
+                else:
+                    ret += "${%s}::%s.\n" % (labels[label], name)
+
+        return ret, params, p_index + len(params)
+
+    def get_problog_string(self, encoding="table"):
+        """
+        :param encoding: encoding of the CPTs of the nodes for which set_encoding has not been called
+        """
         ret = ""
         end_loc = []
         query_loc = []
@@ -112,19 +220,10 @@ class Graph:
                 self.semanticsprobs[self._nodes[n]] = "p"+str(p_index)
                 p_index += 1
             else:
-                self.semanticsprobs[self._nodes[n]] = []
-                for parents in product((False, True), repeat=len(self._nodes[n].get_parents())):
-                    ret += "${p" + str(p_index) + "}::" + str(self._nodes[n].get_problog_name()) + " :- "
-                    self.semanticsprobs[self._nodes[n]].append("p"+str(p_index))
-                    p_index += 1
-                    for i in range(len(parents)):
-                        if not parents[i]:
-                            ret += "\+"
-                        ret += str(self._nodes[n].get_parents()[i].get_problog_name())
-
-                        if i < len(parents) - 1:
-                            ret += ", "
-                    ret += ".\n"
+                node_encoding, rows = self._encodings.get(n, (encoding, None))
+                clauses, self.semanticsprobs[self._nodes[n]], p_index = self._cpt(self._nodes[n], node_encoding,
+                                                                                  rows, p_index)
+                ret += clauses
 
         evidencenum = 0
         for n in end_loc:
@@ -147,18 +246,23 @@ class ProbProblog:
 
     In addition, it servers as wrapper for ProbLog (function run)
     """
-    def __init__(self, problogstring, network = None):
+    def __init__(self, problogstring, network = None, draws = None):
+        """
+        :param draws: uniforms in [0, 1) used, in order, for the parameters of the template instead of numpy.random
+        (see experiment.sampling)
+        """
         self.network = network
         self.problogstring = problogstring
         self.keys = [ele[1] for ele in Formatter().parse(self.problogstring) if ele[1]]
 
         self.probabilities = {}
         self.evidences = {}
-        for k in self.keys:
+        for i, k in enumerate(self.keys):
+            u = numpy.random.uniform(0, 1) if draws is None else draws[i]
             if "e" in k:
-                self.evidences[k] = ("true" if numpy.random.uniform(0, 1) < 0.5 else "false")
+                self.evidences[k] = ("true" if u < 0.5 else "false")
             else:
-                self.probabilities[k] = numpy.random.uniform(0, 1)
+                self.probabilities[k] = u
 
     def getProbabilities(self):
         return self.probabilities
@@ -193,6 +297,9 @@ class Opinion():
     """
     Utility function to store a 4-tuple representing a SL opinion and outputting it
     """
+
+    __slots__ = ("_belief", "_disbelief", "_uncertainty", "_base")
+
     def getBelief(self):
         return mpmath.nstr(self._belief, mpmath.mp.dps)
 
@@ -224,16 +331,21 @@ class DistProbLog:
     Given a ProbProblog object, this class samples the randomly chosen probabilities ntrain times in order to then
     derive beta distributions
     """
-    def __init__(self, bnet, ntrain=10):
+    def __init__(self, bnet, ntrain=10, draws=None):
+        """
+        :param draws: if given, array whose j-th row holds (at least ntrain) uniforms used for sampling the j-th
+        probability instead of numpy.random
+        """
         self.bn = bnet
 
         self.samples = {}
         self.opinions = {}
-        for p in bnet.getProbabilities():
+        for j, p in enumerate(bnet.getProbabilities()):
             self.samples[p] = []
 
             for i in range(ntrain):
-                self.samples[p].append(1 if numpy.random.uniform(0, 1) < bnet.getProbabilities()[p] else 0)
+                u = numpy.random.uniform(0, 1) if draws is None else draws[j][i]
+                self.samples[p].append(1 if u < bnet.getProbabilities()[p] else 0)
 
             rcount = sum(self.samples[p])
             scount = ntrain - rcount
@@ -252,6 +364,21 @@ class DistProbLog:
         substitutions.update(self.bn.evidences)
         return Template(self.bn.problogstring).safe_substitute(substitutions)
 
+    def get_fused_program(self):
+        """
+        Substitute the various probabilities signposts with f(probability, w(b,d,u,a)) labels carrying both the
+        real probability and the SL opinion, to be evaluated by SLProbLog.run_fused
+        """
+        substitutions = {}
+        for k in self.opinions:
+            substitutions[k] = fused_label(self.bn.getProbabilities()[k],
+                                           "w(%s,%s,%s,%s)" % (self.opinions[k].getBelief(),
+                                                               self.opinions[k].getDisbelief(),
+                                                               self.opinions[k].getUncertainty(),
+                                                               self.opinions[k].getBase()))
+        substitutions.update(self.bn.evidences)
+        return Template(self.bn.problogstring).safe_substitute(substitutions)
+
 
 class Experiment():
     """
@@ -288,7 +415,12 @@ class Experiment():
 
         self._is_this_a_bn = None
 
-    def setup(self, name, content, Nmonte = 10, Nnetworks = 100, sampleBeta = [10], bn=True):
+        self._backend = None
+        self._runs = None
+        self._halfwidths = None
+
+    def setup(self, name, content, Nmonte = 10, Nnetworks = 100, sampleBeta = [10], bn=True, encoding="table",
+              backend = None):
         """
         Storage of attributes
         :param name: name of this experiment: anything
@@ -297,12 +429,15 @@ class Experiment():
         :param Nnetworks: how many networks we want to generate
         :param sampleBeta: how many samples to use for create SL opinions
         :param bn: is this a Bayesian network?
+        :param encoding: encoding of the CPTs of the Bayesian network, one of ENCODINGS
+        :param backend: knowledge compilation backend of SLProbLog, None to let ProbLog choose
         :return:
         """
 
         self._Nmonte = Nmonte
         self._Nnetworks = Nnetworks
         self._sampleBeta = sampleBeta
+        self._backend = backend
 
         self._name = name
         self._problogstring = None
@@ -317,7 +452,7 @@ class Experiment():
                 for line in f:
                     self.net.add_edge(line.rstrip('\n').split(" "))
             self.net.storeFilename(content)
-            self._problogstring = self.net.get_problog_string()
+            self._problogstring = self.net.get_problog_string(encoding)
         else:
             if not isinstance(content,str):
                 raise Exception("Todo")
@@ -344,21 +479,32 @@ class Experiment():
             raise Exception("wrong length")
 
         for i in range(len(one)):
-            for k, x in one[i].items():
-                w = two[i][k]
+            r, n = self._squared_errors(one[i], two[i])
+            res += r
+            items += n
+        return math.sqrt(float(res) / float(items))
 
-                p = None
-                if isinstance(x, list):
-                    p = self._expected_value(x)
-                else:
-                    p = x
+    def _squared_errors(self, one, two):
+        """
+        :return: sum of the squared distances between the values of the two dictionaries, and number of values
+        """
+        res = 0
+        items = 0
+        for k, x in one.items():
+            w = two[k]
 
-                if isinstance(w, list):
-                    res += (p - float(self._expected_value(w))) ** 2
-                else:
-                    res += (p - float(w)) ** 2
-                items += 1
-        return math.sqrt(float(res) / float(items))
+            p = None
+            if isinstance(x, list):
+                p = self._expected_value(x)
+            else:
+                p = x
+
+            if isinstance(w, list):
+                res += (p - float(self._expected_value(w))) ** 2
+            else:
+                res += (p - float(w)) ** 2
+            items += 1
+        return res, items
 
     def _expected_error(self, listw):
         """
@@ -373,9 +519,27 @@ class Experiment():
 
         return math.sqrt(float(res) / float(items))
 
-    def run(self):
+    def run(self, fused = False, precision = None, draws = "random", confidence = 0.95, min_runs = 10, seed = None,
+            store = True, start = 0):
         """
         Run the experiment with the given setup
+        :param fused: compute the real probabilities, the SL and the Beta results with a single evaluation of each
+        program (SLProbLog.run_fused) instead of three separate ones
+        :param precision: if given, stop as soon as (after at least min_runs runs) the confidence intervals of both
+        the RMSE reported by analise are narrower than +/- precision; at most Nmonte * Nnetworks runs are made. The
+        intervals treat the runs as independent, which the runs of a quasi-random sequence are not: their error
+        usually shrinks faster than the interval, which is then conservative, but without guarantee
+        :param draws: how the parameters of each run and the training samples of DistProbLog are drawn, one of
+        experiment.sampling.DRAWS: "random" for independent numpy.random draws, "crn" for seeded independent draws
+        common to all the sampleBeta sizes of a run, "halton" or "sobol" for quasi-random parameters (the training
+        samples, nprobabilities * max(sampleBeta) uniforms per run, far too many dimensions for a quasi-random
+        sequence, are then seeded independent draws; all are common to the sampleBeta sizes)
+        :param confidence: confidence level of the intervals
+        :param min_runs: number of runs before stopping can be considered
+        :param seed: seed of the draws
+        :param store: save the experiment in a pickle file named after it and the current time
+        :param start: index of the first run within a longer experiment of the same seed, whose draws are skipped (see
+        experiment.sampling.draws)
         """
         self._vec_real = []
         self._vec_sl = []
@@ -385,25 +549,84 @@ class Experiment():
 
         Nruns = self._Nmonte * self._Nnetworks
 
+        nkeys = len([ele[1] for ele in Formatter().parse(self._problogstring) if ele[1]])
+        nprobabilities = len(ProbProblog(self._problogstring, draws=[0.5] * nkeys).getProbabilities())
+        ntrain = max(self._sampleBeta)
+        sequence = draw_sequence(draws, nkeys + nprobabilities * ntrain, seed, start, quasi_dim=nkeys)
+
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        errors = {"sl": [], "sl_beta": []}
+        self._halfwidths = None
+
         for i in range(Nruns):
 
             sys.stdout.write("\r%d%%" % int(i/Nruns*100))
             sys.stdout.flush()
 
+            point = None if sequence is None else sequence.next()
+            train = None if point is None else point[nkeys:].reshape(nprobabilities, ntrain)
+
             b = None
             if b is None or i % self._Nmonte:
-                b = ProbProblog(self._problogstring, self.net)
+                b = ProbProblog(self._problogstring, self.net, None if point is None else point[:nkeys])
                 self.bns.append(b)
 
-            self._vec_real.append(b.run())
+            if fused:
+                self._run_fused(b, train)
+            else:
+                self._vec_real.append(b.run())
+
+                for samples in self._sampleBeta:
+                    sb = DistProbLog(b, samples, train)
+                    self._vec_sl.append(SLProbLog(sb.get_program(), True, backend=self._backend).run_SL())
+                    self._vec_sl_beta.append(SLProbLog(sb.get_program(), True, backend=self._backend).run_beta())
+
+            if precision is None:
+                continue
+
+            nsamples = len(self._sampleBeta)
+            for name, vec in (("sl", self._vec_sl), ("sl_beta", self._vec_sl_beta)):
+                res, items = 0, 0
+                for predicted in vec[-nsamples:]:
+                    r, n = self._squared_errors(self._vec_real[-1], predicted)
+                    res += r
+                    items += n
+                errors[name].append(float(res) / items)
+
+            if i + 1 >= min_runs:
+                self._halfwidths = {name: self._halfwidth(e, z) for name, e in errors.items()}
+                if max(self._halfwidths.values()) <= precision:
+                    break
+
+        self._runs = len(self._vec_real)
+        print("")
+        if store:
+            self._store()
 
-            for samples in self._sampleBeta:
-                sb = DistProbLog(b, samples)
-                self._vec_sl.append(SLProbLog(sb.get_program(), True).run_SL())
-                self._vec_sl_beta.append(SLProbLog(sb.get_program(), True).run_beta())
+    def _halfwidth(self, errors, z):
+        """
+        Half width of the confidence interval of the RMSE, from the mean squared errors of the runs: the interval of
+        their mean, sqrt(MSE) being propagated by the delta method
+        """
+        mse = numpy.mean(errors)
+        if mse == 0:
+            return 0.0
+        return float(z * numpy.std(errors, ddof=1) / math.sqrt(len(errors)) / (2 * math.sqrt(mse)))
 
-        print("")
-        self._store()
+    def _run_fused(self, b, train = None):
+        """
+        One run of the experiment on the network b using SLProbLog.run_fused
+        :param train: draws of the training samples, see DistProbLog
+        """
+        real = None
+        for samples in self._sampleBeta:
+            sb = DistProbLog(b, samples, train)
+            res = SLProbLog(sb.get_fused_program(), True, backend=self._backend).run_fused()
+            if real is None:
+                real = {k: v.probability for k, v in res.items()}
+                self._vec_real.append(real)
+            self._vec_sl.append({k: v.opinion for k, v in res.items()})
+            self._vec_sl_beta.append({k: v.beta.to_sl_opinion() for k, v in res.items()})
 
 
     def _store(self):
@@ -440,4 +663,8 @@ class Experiment():
         strpred += "\\\\"
 
         print(strreal)
-        print(strpred)
\ No newline at end of file
+        print(strpred)
+
+        if getattr(self, "_halfwidths", None) is not None:
+            print("%% %d runs, RMSE confidence half widths: %s" % (self._runs, ", ".join(
+                "%s %.4f" % (k, v) for k, v in sorted(self._halfwidths.items()))))
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import warnings
+
+import numpy
+
+DRAWS = ("random", "crn", "halton", "sobol")
+
+
+def _primes(n):
+    """
+    :return: the first n prime numbers
+    """
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+class IndependentDraws:
+    """
+    Independent uniform points: the plain Monte Carlo draws, but from a seeded generator and shared by all the
+    configurations compared within a run (common random numbers)
+    """
+
+    def __init__(self, dim, seed=None, start=0):
+        self.dim = dim
+        self._rng = numpy.random.default_rng(seed)
+        if start:
+            self._rng.uniform(size=(start, dim))
+
+    def next(self):
+        return self._rng.uniform(size=self.dim)
+
+
+class HaltonDraws:
+    """
+    Halton sequence (radical inverses in the first dim prime bases) randomly shifted modulo 1, so that every point is
+    uniformly distributed while the sequence fills the unit cube far more evenly than independent points.
+    Only for a few tens of dimensions: as long as the number of points is not well above the base of a coordinate,
+    that coordinate is a linear ramp, and consecutive points are strongly correlated.
+    """
+
+    def __init__(self, dim, seed=None, start=0):
+        self.dim = dim
+        self._bases = numpy.array(_primes(dim), dtype=float)
+        self._shift = numpy.random.default_rng(seed).uniform(size=dim)
+        self._index = start
+
+    def next(self):
+        self._index += 1
+        point = numpy.zeros(self.dim)
+        scale = numpy.ones(self.dim)
+        index = numpy.full(self.dim, float(self._index))
+        while numpy.any(index > 0):
+            scale /= self._bases
+            digit = numpy.mod(index, self._bases)
+            point += digit * scale
+            index = numpy.floor(index / self._bases)
+        return numpy.mod(point + self._shift, 1.0)
+
+
+class MixedDraws:
+    """
+    Points whose first coordinates come from a quasi-random sequence and the others from independent draws
+    """
+
+    def __init__(self, quasi, independent):
+        self.dim = quasi.dim + independent.dim
+        self._quasi = quasi
+        self._independent = independent
+
+    def next(self):
+        return numpy.concatenate((self._quasi.next(), self._independent.next()))
+
+
+class SobolDraws:
+    """
+    Scrambled Sobol' sequence; requires scipy
+    """
+
+    def __init__(self, dim, seed=None):
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise Exception("Sobol' draws require scipy, use halton draws instead")
+        self.dim = dim
+        self._engine = qmc.Sobol(dim, scramble=True, seed=seed)
+
+    def next(self):
+        with warnings.catch_warnings():
+            # the points are consumed one at a time, whatever the number of runs
+            warnings.simplefilter("ignore")
+            return self._engine.random(1)[0]
+
+
+def draws(kind, dim, seed=None, start=0, quasi_dim=None):
+    """
+    :param kind: one of DRAWS; "random" keeps the independent numpy.random draws of each object, and returns None
+    :param dim: number of uniforms in each point
+    :param start: number of points skipped, so that the sequence of the same seed can be split in consecutive parts
+    (not supported by "sobol")
+    :param quasi_dim: with "halton" and "sobol", number of leading coordinates taken from the quasi-random sequence,
+    the others being independent draws; by default all of them
+    :return: object whose next() returns the next point, as an array of dim uniforms in [0, 1)
+    """
+    if kind == "random":
+        return None
+    if kind in ("halton", "sobol") and quasi_dim is not None and quasi_dim < dim:
+        independent = IndependentDraws(dim - quasi_dim, None if seed is None else numpy.random.SeedSequence([seed, 1]),
+                                       start)
+        return MixedDraws(draws(kind, quasi_dim, seed, start), independent)
+    if kind == "crn":
+        return IndependentDraws(dim, seed, start)
+    if kind == "halton":
+        return HaltonDraws(dim, seed, start)
+    if kind == "sobol":
+        if start:
+            raise Exception("Sobol' points cannot be split in parts, use halton draws instead")
+        return SobolDraws(dim, seed)
+    raise Exception("Unknown draws: %s, expected one of %s" % (kind, DRAWS))
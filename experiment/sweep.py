@@ -0,0 +1,254 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import time
+
+import numpy.random
+
+from experiment.experimental_setting import Experiment
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    name TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    config TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result BLOB,
+    PRIMARY KEY (name, shard)
+)
+"""
+
+
+def shard_seed(seed, shard):
+    """
+    :return: the seed of a shard, depending only on the seed of the sweep and on the index of the shard
+    """
+    return int(numpy.random.SeedSequence([seed, shard]).generate_state(1)[0])
+
+
+def run_shard(config, start, stop, seed):
+    """
+    Run the runs [start, stop) of an experiment
+    :param config: arguments of Experiment.setup and of Experiment.run, see SweepQueue.submit
+    :param seed: seed of the shard: the draws of the runs depend only on it and on start
+    :return: dictionary with the real probabilities and the SL and Beta results of each run
+    """
+    e = Experiment()
+    e.setup(config["name"], config["content"], 1, stop - start, config["sampleBeta"], config["bn"],
+            config["encoding"], config["backend"])
+    if config["draws"] == "random":
+        numpy.random.seed(seed)
+    e.run(config["fused"], draws=config["draws"], seed=seed, store=False, start=start)
+    return {"real": e._vec_real, "sl": e._vec_sl, "sl_beta": e._vec_sl_beta}
+
+
+class _Transaction:
+    """
+    Context manager running the statements on a connection in a single immediate transaction, so that claims made
+    concurrently by several workers are serialised, and closing the connection
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def __enter__(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        return self._db
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self._db.close()
+        return False
+
+
+class SweepQueue:
+    """
+    Work queue of the shards of experiment sweeps, stored in a SQLite file: any number of worker processes, on this
+    host or on others sharing the directory of the file, can claim, run and commit shards. The file system must
+    support the locks of SQLite (local disks do, some network file systems do not).
+
+    Shards are deterministic, their runs depending only on the seed of the sweep and on their index, so that running
+    a shard twice (e.g. after its worker crashed) commits the same results, and committing it again is a no-op.
+    With crn and halton draws every shard continues the sequence of the seed of the sweep from its first run, so that
+    the merged shards are the runs of the whole experiment; with random draws each shard has its own seed.
+    """
+
+    def __init__(self, path, lease=3600):
+        """
+        :param path: SQLite file of the queue, created if needed
+        :param lease: seconds after which a shard claimed and not committed can be claimed again
+        """
+        self.path = path
+        self.lease = lease
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.execute("PRAGMA busy_timeout = 60000")
+        return _Transaction(db)
+
+    def submit(self, name, content, Nmonte=10, Nnetworks=100, sampleBeta=[10], bn=True, encoding="table",
+               backend=None, fused=False, draws="crn", seed=0, shard_size=10):
+        """
+        Split the Nmonte * Nnetworks runs of an experiment in shards of shard_size runs and put them on the queue.
+        Submitting the same experiment again adds nothing.
+        :param name: name of the experiment, unique in the queue; the other parameters are those of Experiment.setup
+        and Experiment.run. With bn, content is the name of the network file, which must be readable by the workers
+        :param seed: seed of the sweep, shared by the shards or, with random draws, from which the seed of every shard
+        is derived
+        :param shard_size: number of runs in each shard
+        :return: number of shards of the experiment
+        """
+        if draws == "sobol":
+            raise Exception("Sobol' points cannot be split in independent shards, use halton draws instead")
+        config = json.dumps({"name": name, "content": content, "sampleBeta": list(sampleBeta), "bn": bn,
+                             "encoding": encoding, "backend": backend, "fused": fused, "draws": draws})
+        nruns = Nmonte * Nnetworks
+        shards = [(name, i, start, min(start + shard_size, nruns), shard_seed(seed, i) if draws == "random" else seed,
+                   config)
+                  for i, start in enumerate(range(0, nruns, shard_size))]
+        with self._connect() as db:
+            db.executemany("INSERT OR IGNORE INTO shards (name, shard, start, stop, seed, config) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", shards)
+        return len(shards)
+
+    def claim(self, worker):
+        """
+        :param worker: name of the worker claiming the shard
+        :return: (name, shard, start, stop, seed, config) of a pending shard, or of one whose lease expired, now
+        claimed by the worker; None if there is none
+        """
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT name, shard, start, stop, seed, config FROM shards "
+                             "WHERE state = 'pending' OR (state = 'claimed' AND claimed < ?) "
+                             "ORDER BY name, shard LIMIT 1", (now - self.lease,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE shards SET state = 'claimed', worker = ?, claimed = ?, attempts = attempts + 1 "
+                       "WHERE name = ? AND shard = ?", (worker, now, row[0], row[1]))
+        return row[:5] + (json.loads(row[5]),)
+
+    def commit(self, name, shard, result):
+        """
+        Store the results of a shard, unless they already were
+        :return: True if the results were stored
+        """
+        with self._connect() as db:
+            cursor = db.execute("UPDATE shards SET state = 'done', result = ? "
+                                "WHERE name = ? AND shard = ? AND state != 'done'",
+                                (pickle.dumps(result), name, shard))
+            return cursor.rowcount == 1
+
+    def work(self, worker=None, limit=None):
+        """
+        Claim, run and commit shards until the queue is empty
+        :param worker: name of the worker, by default host name and process id
+        :param limit: maximum number of shards to run
+        :return: number of shards run
+        """
+        if worker is None:
+            worker = "%s-%d" % (socket.gethostname(), os.getpid())
+        done = 0
+        while limit is None or done < limit:
+            claimed = self.claim(worker)
+            if claimed is None:
+                break
+            name, shard, start, stop, seed, config = claimed
+            self.commit(name, shard, run_shard(config, start, stop, seed))
+            done += 1
+        return done
+
+    def status(self):
+        """
+        :return: dictionary of the experiments in the queue, with the number of their shards in each state
+        """
+        res = {}
+        with self._connect() as db:
+            for name, state, count in db.execute("SELECT name, state, COUNT(*) FROM shards GROUP BY name, state"):
+                res.setdefault(name, {"pending": 0, "claimed": 0, "done": 0})[state] = count
+        return res
+
+    def merge(self, name):
+        """
+        Combine the results of the shards of an experiment, in the order of the shards
+        :return: Experiment, ready for analise; except with random draws, the same as if it had been run at once with
+        the seed of the sweep
+        """
+        with self._connect() as db:
+            rows = db.execute("SELECT state, stop, config, result FROM shards WHERE name = ? ORDER BY shard",
+                              (name,)).fetchall()
+        if not rows:
+            raise Exception("Unknown experiment: %s" % name)
+        missing = len([row for row in rows if row[0] != "done"])
+        if missing:
+            raise Exception("%d shards of %s are not done" % (missing, name))
+
+        config = json.loads(rows[0][2])
+        e = Experiment()
+        e.setup(name, config["content"], 1, rows[-1][1], config["sampleBeta"], config["bn"], config["encoding"],
+                config["backend"])
+        e._vec_real, e._vec_sl, e._vec_sl_beta = [], [], []
+        for row in rows:
+            result = pickle.loads(row[3])
+            e._vec_real.extend(result["real"])
+            e._vec_sl.extend(result["sl"])
+            e._vec_sl_beta.extend(result["sl_beta"])
+        e._runs = rows[-1][1]
+        return e
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("queue", help="SQLite file of the queue")
+    parser.add_argument("command", choices=("work", "status", "merge"))
+    parser.add_argument("name", nargs="?", help="With merge, name of the experiment to analyse")
+    parser.add_argument("--lease", type=float, default=3600,
+                        help="Seconds after which a claimed shard can be claimed again")
+    parser.add_argument("--limit", type=int, help="With work, maximum number of shards to run")
+
+    args = parser.parse_args()
+    queue = SweepQueue(args.queue, args.lease)
+    if args.command == "work":
+        print("%d shards run" % queue.work(limit=args.limit))
+    elif args.command == "status":
+        for name, states in sorted(queue.status().items()):
+            print("%-30s %s" % (name, " ".join("%s %d" % (k, v) for k, v in sorted(states.items()))))
+    else:
+        if args.name is None:
+            parser.error("merge requires the name of the experiment")
+        queue.merge(args.name).analise()
@@ -21,10 +21,14 @@ THE SOFTWARE.
 """
 
 import argparse
+import json
+import sys
 import mpmath
 from SLProbLog.SLProbLog import BetaDistribution
 
 from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.backends import BACKENDS
+from SLProbLog.governor import Budget, vacuous
 
 def outprint(res):
     for k,v in res.items():
@@ -39,21 +43,94 @@ def outprint(res):
             raise Exception("Unclear data: %s" % (repr(v)))
 
 
+def jsonprint(k, v, evidence=None):
+    if isinstance(v, list):
+        record = {"query": k, "opinion": [float(x) for x in v]}
+    elif isinstance(v, BetaDistribution):
+        record = {"query": k, "mean": float(v.mean()), "variance": float(v.variance())}
+    else:
+        raise Exception("Unclear data: %s" % (repr(v)))
+    if evidence is not None:
+        record["evidence"] = evidence
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("file", help="Input file")
     parser.add_argument("-slop", "--subjective-logic-operators", help="Use SL Operators instead of Beta-based", action="store_true")
     parser.add_argument("-slout", "--subjective-logic-output", help="Output as Subjective Logic Opinions",
                         action="store_true")
+    parser.add_argument("-k", "--backend", help="Knowledge compilation backend", choices=("auto",) + BACKENDS)
+    parser.add_argument("--low-memory", help="Free intermediate values as soon as they are consumed",
+                        action="store_true")
+    parser.add_argument("--simplify", action="store_true",
+                        help="Fold the deterministic weights out of the circuit before evaluating it, with the same "
+                             "results (SL operators only, Beta circuits are evaluated as compiled)")
+    parser.add_argument("--adaptive-precision", metavar="DPS", type=int,
+                        help="Compute in float64, escalating ill-conditioned operations to mpmath with DPS digits")
+    parser.add_argument("--time-budget", metavar="SECONDS", type=float, help="Wall time budget of the evaluation")
+    parser.add_argument("--memory-budget", metavar="MB", type=int, help="Memory budget of the evaluation")
+    parser.add_argument("--size-budget", metavar="SIZE", type=int, help="Maximum size of the compiled circuit")
+    parser.add_argument("--vacuous-fallback", help="Answer vacuous opinions instead of failing when over budget",
+                        action="store_true")
+    parser.add_argument("--stream", help="Print each result as a JSON line as soon as it is computed",
+                        action="store_true")
+    parser.add_argument("--sort", help="With --stream, print the queries in the order of their names",
+                        action="store_true")
+    parser.add_argument("--threshold", type=float, help="Only print the queries with at least this expected value")
+    parser.add_argument("--top-k", metavar="K", type=int, help="Only print the K queries with the largest expected value")
+    parser.add_argument("--conditional", metavar="REQUESTS",
+                        help="JSON file listing {\"query\": atom, \"evidence\": {atom: true/false}} requests, each "
+                             "answered as a JSON line given its own evidence, on a single compiled circuit")
+    parser.add_argument("--stats", help="Print compilation statistics on stderr", action="store_true")
 
 
     args = parser.parse_args()
+    if args.sort and not args.stream:
+        parser.error("--sort requires --stream")
+    if args.stream and (args.threshold is not None or args.top_k is not None):
+        parser.error("--stream cannot be combined with --threshold or --top-k")
+    if args.stream and (args.adaptive_precision is not None or args.time_budget is not None
+                        or args.memory_budget is not None or args.size_budget is not None):
+        parser.error("--stream cannot be combined with --adaptive-precision or the budgets")
+    if args.conditional is not None and (args.stream or args.threshold is not None or args.top_k is not None):
+        parser.error("--conditional cannot be combined with --stream, --threshold or --top-k")
+    if args.conditional is not None and (args.time_budget is not None or args.memory_budget is not None
+                                         or args.size_budget is not None or args.vacuous_fallback
+                                         or args.adaptive_precision is not None or args.low_memory):
+        # run_conditional evaluates a single circuit in this process, ignoring them
+        parser.error("--conditional cannot be combined with the budgets, --vacuous-fallback, --adaptive-precision or "
+                     "--low-memory")
 
     p = ""
     with open(args.file, 'r') as f:
         p = f.read()
 
-    if args.subjective_logic_operators:
-        outprint(SLProbLog(p, args.subjective_logic_output).run_SL())
+    budget = None
+    if args.time_budget is not None or args.memory_budget is not None or args.size_budget is not None:
+        budget = Budget(args.time_budget, None if args.memory_budget is None else args.memory_budget * 2 ** 20,
+                        args.size_budget)
+
+    slproblog = SLProbLog(p, args.subjective_logic_output, backend=args.backend, low_memory=args.low_memory,
+                          adaptive_precision=args.adaptive_precision, budget=budget,
+                          fallback=vacuous if args.vacuous_fallback else None, simplify=args.simplify)
+    if args.conditional is not None:
+        with open(args.conditional, 'r') as f:
+            requests = [(r["query"], r.get("evidence", {})) for r in json.load(f)]
+        results = slproblog.run_conditional(requests, args.subjective_logic_operators)
+        for (k, e), v in zip(requests, results):
+            jsonprint(k, v, e)
+    elif args.stream:
+        results = slproblog.iter_SL(args.sort) if args.subjective_logic_operators else slproblog.iter_beta(args.sort)
+        for k, v in results:
+            jsonprint(k, v)
+    elif args.subjective_logic_operators:
+        outprint(slproblog.run_SL(args.threshold, args.top_k))
     else:
-        outprint(SLProbLog(p, args.subjective_logic_output).run_beta())
\ No newline at end of file
+        outprint(slproblog.run_beta(args.threshold, args.top_k))
+
+    if args.stats:
+        for k, v in slproblog.stats.items():
+            sys.stderr.write("%s: %s\n" % (k, v))
\ No newline at end of file
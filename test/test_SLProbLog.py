@@ -20,8 +20,9 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import os
 from unittest import TestCase
-from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.SLProbLog import SLProbLog, SLSemiring
 import mpmath
 
 
@@ -42,4 +43,39 @@ query(asthma(bill)).
         p = SLProbLog(self.smallprogram)
         r = p.run_SL()
 
-        self.assertTrue(mpmath.almosteq(r['asthma(bill)'].mean(), 0.6, 0.001))
\ No newline at end of file
+        self.assertTrue(mpmath.almosteq(r['asthma(bill)'].mean(), 0.6, 0.001))
+
+    def test_iter_beta(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            program = f.read()
+        p = SLProbLog(program)
+        streamed = list(p.iter_beta(sort=True))
+        self.assertEqual([k for k, v in streamed], sorted(k for k, v in streamed))
+        self.assertEqual(str(dict(streamed)), str(p.run_beta()))
+
+    def test_iter_SL(self):
+        p = SLProbLog(self.smallprogram, sloutput=True, low_memory=True)
+        streamed = dict(p.iter_SL())
+        expected = p.run_SL()
+        for k in expected:
+            for a, b in zip(streamed[k], expected[k]):
+                self.assertTrue(mpmath.almosteq(a, b, 1e-12))
+        self.assertIn("peak_live_values", p.stats)
+
+    def test_sl_identities(self):
+        s = SLSemiring()
+        x = "w(0.2,0.5,0.3,0.5)"
+        self.assertEqual(s.times(s.one(), x), x)
+        self.assertEqual(s.times(x, s.one()), x)
+        self.assertEqual(s.plus(s.zero(), x), x)
+        self.assertEqual(s.plus(x, s.zero()), x)
+        # the general formulas divide 0 by 0 here
+        self.assertEqual(s.times(s.one(), s.one()), s.one())
+        self.assertEqual(s.plus(s.zero(), s.zero()), s.zero())
+
+        # wherever the general formulas are defined they tend to the identity, so short-circuiting changes nothing
+        near_one = "w(1.0,0.0,0.0,%s)" % (1 - 1e-12)
+        near_zero = "w(0.0,1.0,0.0,%s)" % 1e-12
+        for y, z in ((s.times(near_one, x), x), (s.plus(near_zero, x), x)):
+            for a, b in zip(s.parse(y), s.parse(z)):
+                self.assertTrue(mpmath.almosteq(a, b, 1e-9))
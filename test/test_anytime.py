@@ -0,0 +1,65 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+import os
+
+from SLProbLog.SLProbLog import SLProbLog
+
+
+class TestAnytime(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.program = f.read()
+
+    def test_beta_bounds(self):
+        exact = SLProbLog(self.program).run_beta()
+        inference = SLProbLog(self.program).anytime()
+        width = {k: 1 for k in exact}
+        while not inference.exact:
+            self.assertTrue(inference.step())
+            for k, b in inference.bounds().items():
+                self.assertTrue(b.lower.mean() <= exact[k].mean() + 1e-12)
+                self.assertTrue(exact[k].mean() <= b.upper.mean() + 1e-12)
+                self.assertTrue(b.upper.mean() - b.lower.mean() <= width[k] + 1e-12)
+                width[k] = b.upper.mean() - b.lower.mean()
+        for k, b in inference.bounds().items():
+            self.assertEqual(repr(b.lower), repr(exact[k]))
+
+    def test_sl(self):
+        p = SLProbLog(self.program, True)
+        res = p.run_anytime(60, sl=True)
+        self.assertTrue(p.stats["anytime_exact"])
+        exact = SLProbLog(self.program, True, backend="ddnnf").run_SL()
+        for x, y in zip(res["smokes(1)"].lower, exact["smokes(1)"]):
+            self.assertAlmostEqual(float(x), float(y), 10)
+        for b in res.values():
+            self.assertEqual(b.lower, b.upper)
+
+    def test_background(self):
+        inference = SLProbLog(self.program).anytime()
+        self.assertEqual(inference.bounds()["smokes(1)"].upper.mean(), 1)
+        inference.start(60)
+        res = inference.join()
+        self.assertTrue(inference.exact)
+        self.assertEqual(repr(res["smokes(1)"].lower), repr(res["smokes(1)"].upper))
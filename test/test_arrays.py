@@ -0,0 +1,96 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import pickle
+import sys
+from unittest import TestCase
+from SLProbLog.SLProbLog import BetaDistribution, from_sl_opinion, moment_matching
+from SLProbLog.arrays import _ValueArray, BetaArray, OpinionArray, sl_to_beta, beta_to_sl, beta_parameters, \
+    from_beta_parameters, moment_match
+import mpmath
+import numpy
+
+
+class TestArrays(TestCase):
+
+    def setUp(self):
+        self.betas = [BetaDistribution(i / 100, i / 10000) for i in range(1, 50)]
+        self.opinions = [[mpmath.mpf(0.1), mpmath.mpf(0.2), mpmath.mpf(0.7), mpmath.mpf(0.5)]] * 40
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.betas[0], "__dict__"))
+        self.assertFalse(hasattr(BetaArray(), "__dict__"))
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            _ValueArray()
+
+    def test_pickle(self):
+        b = pickle.loads(pickle.dumps(self.betas[3]))
+        self.assertEqual(repr(b), repr(self.betas[3]))
+
+    def test_beta_array(self):
+        a = BetaArray.from_values(self.betas)
+        self.assertEqual(len(a), len(self.betas))
+        self.assertEqual([repr(b) for b in a], [repr(b) for b in self.betas])
+        self.assertEqual(a.means[4], 0.05)
+        self.assertEqual(a.nbytes, 16 * len(self.betas))
+        self.assertTrue(a.nbytes < sum(sys.getsizeof(b) for b in self.betas))
+
+    def test_opinion_array(self):
+        a = OpinionArray()
+        a.extend(self.opinions)
+        a[0] = [0.3, 0.3, 0.4, 0.5]
+        self.assertEqual(len(a), 40)
+        self.assertEqual(a[-1], self.opinions[-1])
+        self.assertEqual(a.beliefs[0], 0.3)
+        self.assertEqual(a.uncertainties[1], 0.7)
+
+    def test_bulk_conversions(self):
+        rng = numpy.random.default_rng(0)
+        opinions = rng.dirichlet((1, 1, 1), 500)
+        opinions = numpy.column_stack((opinions, rng.uniform(0, 1, 500)))
+        # the clamped corners
+        opinions[:4] = [[1, 0, 0, 0.5], [0, 1, 0, 0.3], [0, 0, 1, 0.5], [0.5, 0.5, 1e-120, 0.5]]
+
+        betas = sl_to_beta(opinions)
+        for o, b in zip(opinions.tolist(), betas.tolist()):
+            s = from_sl_opinion([mpmath.mpf(x) for x in o])
+            self.assertEqual(b, [float(s.mean()), float(s.variance())])
+
+        betas[:3] = [[0.5, 0], [0.2, 1e-120], [1, 0.01]]
+        for b, o, m, p in zip(betas.tolist(), beta_to_sl(betas).tolist(), moment_match(betas).tolist(),
+                              beta_parameters(BetaArray.from_array(betas)).tolist()):
+            s = BetaDistribution(b[0], b[1])
+            self.assertEqual(o, [float(x) for x in s.to_sl_opinion()])
+            if b[0] == 1:
+                self.assertTrue(numpy.isnan(m[1]))
+            else:
+                mm = moment_matching(s)
+                self.assertEqual(m, [float(mm.mean()), float(mm.variance())])
+            self.assertEqual(p, [float(s.alpha()), float(s.beta())])
+
+    def test_from_array(self):
+        a = OpinionArray.from_array(numpy.array([[0.1, 0.2, 0.7, 0.5], [0.3, 0.3, 0.4, 0.5]]))
+        self.assertEqual(len(a), 2)
+        self.assertEqual(a[1], [0.3, 0.3, 0.4, 0.5])
+        numpy.testing.assert_allclose(from_beta_parameters(beta_parameters(sl_to_beta(a))), sl_to_beta(a))
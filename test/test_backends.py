@@ -0,0 +1,105 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import threading
+from unittest import TestCase
+from SLProbLog.SLProbLog import SLProbLog
+from problog.formula import LogicFormula
+from SLProbLog.backends import BackendSelector, is_available, trial
+from benchmark.generators import chain
+
+
+class _Dying(LogicFormula):
+    """
+    Ground program killing the process compiling it, as an out-of-memory kill would
+    """
+
+    dying = False
+
+    def get_node(self, key):
+        if self.dying:
+            os._exit(9)
+        return LogicFormula.get_node(self, key)
+
+
+class TestBackends(TestCase):
+
+    def setUp(self):
+        self.program = """
+b(0.6, 0.0002)::asthma(X) :- smokes(X).
+b(0.3, 0.01)::smokes(bill).
+query(asthma(bill)).
+"""
+
+    def test_same_results(self):
+        results = [str(SLProbLog(self.program, backend=b).run_beta()) for b in ("sdd", "ddnnf") if is_available(b)]
+        self.assertTrue(len(results) > 0)
+        self.assertEqual(len(set(results)), 1)
+
+    def test_auto(self):
+        selector = BackendSelector()
+        p = SLProbLog(self.program, backend="auto", selector=selector)
+        p.run_beta()
+        self.assertEqual(p.stats["backends"][p.stats["backend"]]["status"], "ok")
+
+        q = SLProbLog(self.program.replace("0.3, 0.01", "0.4, 0.02"), backend="auto", selector=selector)
+        q.run_beta()
+        self.assertEqual(p.stats["backend"], q.stats["backend"])
+        self.assertEqual(len(selector._choices), 1)
+
+    def test_auto_sl(self):
+        # the SL operators cannot evaluate the SDD of a chain, which must not be selected whatever its compile time
+        selector = BackendSelector()
+        p = SLProbLog(chain(2), backend="auto", selector=selector)
+        self.assertEqual(str(p.run_SL()), str(SLProbLog(chain(2), backend="ddnnf").run_SL()))
+        if is_available("sdd"):
+            self.assertTrue(p.stats["backends"]["sdd"]["status"].startswith("error: ZeroDivisionError"))
+        p.run_beta()
+        self.assertEqual(len(selector._choices), 2)
+
+    def test_size_budget(self):
+        selector = BackendSelector(size_budget=0)
+        with self.assertRaises(Exception):
+            SLProbLog(self.program, backend="auto", selector=selector).run_beta()
+
+    def test_unknown(self):
+        with self.assertRaises(Exception):
+            SLProbLog(self.program, backend="nope")
+
+    def test_child_death(self):
+        ground = _Dying()
+        ground.add_query("a", ground.add_atom(1, 0.5))
+        ground.dying = True
+        res = trial("ddnnf", None, ground)
+        self.assertEqual(res["status"], "error: process died with exit code 9")
+
+    def test_threads(self):
+        selector = BackendSelector(backends=("ddnnf",))
+        programs = [self.program.replace("0.3, 0.01", "0.%d, 0.01" % i) for i in range(1, 5)]
+        threads = [threading.Thread(target=SLProbLog(p, backend="auto", selector=selector).run_beta)
+                   for p in programs]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(selector._choices), 1)
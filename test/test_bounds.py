@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+from unittest import TestCase
+
+from SLProbLog.SLProbLog import SLProbLog, SLSemiring, BetaSemiring
+from SLProbLog.bounds import candidates, expected_value, query_bounds
+from SLProbLog.anytime import Bounds
+
+
+class TestBounds(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.program = f.read()
+        self.slprogram = """
+w(0.5,0.3,0.2,0.5)::a.
+w(0.1,0.8,0.1,0.4)::b.
+w(0.6,0.2,0.2,0.5)::c :- a.
+w(0.3,0.3,0.4,0.5)::c :- b.
+w(0.7,0.1,0.2,0.5)::d :- c, \\+a.
+query(a). query(b). query(c). query(d).
+"""
+
+    def _contained(self, program, semiring, to_sl):
+        p = SLProbLog(program, True, backend="ddnnf")
+        circuit = p._circuit(semiring, p._convert_input(to_sl=to_sl, to_beta=not to_sl))
+        bounds = query_bounds(circuit, semiring)
+        for name, v in circuit.evaluate(semiring):
+            e = float(expected_value(p._parse_value(semiring, v)))
+            self.assertTrue(bounds[name].lower <= e <= bounds[name].upper, name)
+
+    def test_contained(self):
+        self._contained(self.program, BetaSemiring(), False)
+        self._contained(self.slprogram, SLSemiring(), True)
+
+    def test_candidates(self):
+        bounds = {"a": Bounds(0.1, 0.2), "b": Bounds(0.3, 0.6), "c": Bounds(0.5, 0.7), "d": Bounds(0.15, 0.35)}
+        self.assertEqual(candidates(bounds, threshold=0.4), {"b", "c"})
+        self.assertEqual(candidates(bounds, top_k=1), {"b", "c"})
+        self.assertEqual(candidates(bounds, top_k=2), {"b", "c", "d"})
+
+    def test_threshold(self):
+        full = SLProbLog(self.program).run_beta()
+        p = SLProbLog(self.program)
+        res = p.run_beta(threshold=0.3)
+        self.assertEqual(str(res), str({k: v for k, v in full.items() if v.mean() >= 0.3}))
+        self.assertEqual(p.stats["pruned_queries"], 3)
+
+    def test_top_k(self):
+        p = SLProbLog(self.slprogram, True, backend="ddnnf")
+        full = p.run_SL()
+        res = p.run_SL(top_k=2)
+        expected = sorted(full, key=lambda k: -expected_value(full[k]))[:2]
+        self.assertEqual(list(res), expected)
+        self.assertTrue(p.stats["pruned_queries"] > 0)
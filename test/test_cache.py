@@ -0,0 +1,94 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+
+from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.cache import ResultCache, canonical_key
+
+
+class TestCache(TestCase):
+
+    def setUp(self):
+        self.program = """
+w(0.2,0.5,0.3,0.5)::stress.
+w(0.3,0.5,0.2,0.5)::smokes :- stress.
+evidence(smokes, true).
+query(stress).
+"""
+        self.near = self.program.replace("w(0.2,0.5,0.3,0.5)", "w(0.2000001,0.4999999,0.3,0.5)")
+
+    def test_key(self):
+        self.assertEqual(canonical_key(self.program, "SL"), canonical_key(self.program.replace("0.2,", "0.20,"), "SL"))
+        self.assertNotEqual(canonical_key(self.program, "SL"), canonical_key(self.program, "beta"))
+        self.assertNotEqual(canonical_key(self.program), canonical_key(self.near))
+        self.assertNotEqual(canonical_key(self.program), canonical_key(self.program.replace("true", "false")))
+        self.assertEqual(canonical_key(self.program, quantize=1e-3), canonical_key(self.near, quantize=1e-3))
+
+    def test_layout(self):
+        program = "w(0.2,0.3,0.5,0.5)::a. query(a)."
+        for other in ("w(0.2,0.3,0.5,0.5)::a.  query(a). % c\n", "w(0.2,0.3,0.5,0.5) :: a.\n/* c */ query( a ).",
+                      "w(0.2,0.3,0.5,0.5)::a.\nquery(a)."):
+            self.assertEqual(canonical_key(program), canonical_key(other))
+        self.assertNotEqual(canonical_key("a :- b, c d."), canonical_key("a :- b, cd."))
+
+    def test_hit(self):
+        cache = ResultCache()
+        first = SLProbLog(self.program, True, cache=cache)
+        res = first.run_SL()
+        self.assertEqual(first.stats["cache"], "miss")
+
+        second = SLProbLog(self.program, True, cache=cache)
+        self.assertEqual(second.run_SL(), res)
+        self.assertEqual(second.stats["cache"], "hit")
+        self.assertFalse("backend" in second.stats)
+
+        SLProbLog(self.program, True, cache=cache).run_beta()
+        self.assertEqual(cache.metrics()["hits"], 1)
+        self.assertEqual(cache.metrics()["misses"], 2)
+
+    def test_copies(self):
+        cache = ResultCache()
+        res = SLProbLog(self.program, True, cache=cache).run_SL()
+        res["stress"][0] = 2
+        self.assertNotEqual(SLProbLog(self.program, True, cache=cache).run_SL()["stress"][0], 2)
+
+    def test_lru(self):
+        cache = ResultCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.metrics()["evictions"], 1)
+
+    def test_ttl(self):
+        now = [0]
+        cache = ResultCache(ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+        now[0] = 5
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 20
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.metrics()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,165 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+from problog import get_evaluatable
+from problog.constraint import TrueConstraint
+from problog.evaluator import SemiringProbability
+from problog.program import PrologString
+from SLProbLog.SLProbLog import SLProbLog, BetaSemiring, SLSemiring
+from SLProbLog.circuit import Circuit
+import os
+
+
+class TestCircuit(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.program = f.read()
+
+    def _check(self, semiring, program):
+        p = SLProbLog(program)
+        formula = get_evaluatable("ddnnf", semiring=semiring).create_from(p._ground(program))
+        expected = {str(k): v for k, v in formula.evaluate(semiring=semiring).items()}
+        self.assertEqual(dict(Circuit.from_formula(formula, semiring).evaluate(semiring)), expected)
+
+    def test_same_as_problog_beta(self):
+        self._check(BetaSemiring(), SLProbLog(self.program)._convert_input(to_beta=True))
+
+    def test_structure(self):
+        p = SLProbLog(self.program)
+        c = p._circuit(BetaSemiring(), p._convert_input(to_beta=True))
+        self.assertEqual(len(c.child_ptr), len(c) + 1)
+        self.assertEqual(len(c.weights), len(c.slot_node))
+        for k in c.ancestors(int(c.slot_node[0])):
+            self.assertTrue(k > c.slot_node[0])
+
+    def test_bounded(self):
+        p = SLProbLog(self.program)
+        semiring = BetaSemiring()
+        c = p._circuit(semiring, p._convert_input(to_beta=True))
+        expected = dict(c.evaluate(semiring))
+        full = c.peak_live
+        self.assertEqual(dict(c.evaluate(semiring, bounded=True)), expected)
+        self.assertTrue(0 < c.peak_live < full)
+
+    def test_low_memory(self):
+        p = SLProbLog(self.program, True, backend="ddnnf", low_memory=True)
+        self.assertEqual(p.run_SL(), SLProbLog(self.program, True, backend="ddnnf").run_SL())
+        self.assertTrue(p.stats["peak_live_values"] > 0)
+
+    def test_same_as_problog_sl(self):
+        self._check(SLSemiring(), SLProbLog(self.program)._convert_input(to_sl=True))
+
+    def test_simplify(self):
+        p = SLProbLog(self.program)
+        semiring = SLSemiring()
+        c = p._circuit(semiring, p._convert_input(to_sl=True))
+        simplified, report = c.simplify(semiring)
+        self.assertEqual(report["nodes"], len(c))
+        self.assertTrue(report["simplified_nodes"] < report["nodes"])
+        self.assertTrue(report["simplified_edges"] < report["edges"])
+        self.assertEqual(dict(simplified.evaluate(semiring)), dict(c.evaluate(semiring)))
+
+    def test_simplify_beta(self):
+        # the one of the BetaSemiring is not exact, folding it would change the variances
+        p = SLProbLog(self.program, simplify=True)
+        res = p.run_beta()
+        expected = SLProbLog(self.program, backend="ddnnf").run_beta()
+        self.assertEqual(p.stats["simplification"]["simplified_nodes"], p.stats["simplification"]["nodes"])
+        self.assertEqual(str(res), str(expected))
+
+    def test_simplify_constants(self):
+        semiring = SLSemiring()
+        p = SLProbLog("w(0.3,0.5,0.2,0.5)::a. w(0.5,0.2,0.3,0.5)::b. c :- a. c :- b. evidence(c, true). "
+                      "evidence(a, false). query(b).")
+        c = p._circuit(semiring, p._convert_input(to_sl=True))
+        simplified, report = c.simplify(semiring)
+        self.assertEqual(simplified.evidence[-1], ("a", 0))
+        self.assertEqual(dict(simplified.evaluate(semiring)), dict(c.evaluate(semiring)))
+
+    def test_simplify_labels(self):
+        # labels as written in the program, e.g. w(1,0,0,1), differ in spacing from one() and zero()
+        semiring = SLSemiring()
+        p = SLProbLog("w(1,0,0,1)::a. w(0.4,0.3,0.3,0.5)::b. c :- a, b. d :- \\+a. d :- b. query(c). query(d).")
+        c = p._circuit(semiring, p._convert_input(to_sl=True))
+        simplified, report = c.simplify(semiring)
+        self.assertTrue(report["simplified_nodes"] < report["nodes"])
+        self.assertEqual(dict(simplified.evaluate(semiring)), dict(c.evaluate(semiring)))
+
+    def test_conditional(self):
+        program = """
+0.3::stress(X) :- person(X).
+0.4::smokes(X) :- stress(X).
+0.2::smokes(X) :- person(X).
+0.5::asthma(X) :- smokes(X).
+person(1). person(2).
+evidence(stress(2), false).
+"""
+        requests = [("stress(1)", [("smokes(1)", True)]), ("asthma(1)", [("smokes(1)", True)]),
+                    ("stress(1)", [("asthma(1)", False), ("smokes(2)", False)]), ("smokes(2)", [])]
+        queries = "".join("query(%s).\n" % a for a in ("stress(1)", "smokes(1)", "asthma(1)", "smokes(2)"))
+        semiring = SemiringProbability()
+        formula = get_evaluatable("ddnnf").create_from(PrologString(program + queries))
+        c = Circuit.from_formula(formula, semiring)
+        labeled = dict(c.queries)
+
+        res = c.conditional(semiring, [(labeled[q], [(a, labeled[a] if v else -labeled[a]) for a, v in e])
+                                       for q, e in requests])
+        self.assertEqual(c.evidence_evaluations, 3)
+        for (q, e), v in zip(requests, res):
+            evidence = "".join("evidence(%s, %s).\n" % (a, str(v).lower()) for a, v in e)
+            expected = get_evaluatable("ddnnf").create_from(PrologString(program + evidence + "query(%s)." % q))
+            self.assertAlmostEqual(v, list(expected.evaluate().values())[0], 12)
+
+        with self.assertRaises(Exception):
+            c.conditional(semiring, [(labeled["smokes(2)"], [("stress(2)", labeled["stress(2)"])])])
+
+    def test_run_conditional(self):
+        program = self.program
+        requests = [(q, {"stress(4)": v}) for q in ("smokes(1)", "asthma(3)") for v in (True, False)]
+        p = SLProbLog(program, simplify=True)
+        res = p.run_conditional(requests)
+        self.assertEqual(p.stats["evidence_evaluations"], 2)
+        for (q, e), v in zip(requests, res):
+            evidence = "".join("evidence(%s, %s).\n" % (a, str(v).lower()) for a, v in e.items())
+            expected = SLProbLog(program + "\n" + evidence, backend="ddnnf").run_beta()[q]
+            self.assertAlmostEqual(float(v.mean()), float(expected.mean()), 8)
+            self.assertAlmostEqual(float(v.variance()), float(expected.variance()), 8)
+
+    def test_unsupported(self):
+        program = "0.3::a. 0.4::b. c :- a, b. query(c)."
+        c = Circuit.from_formula(get_evaluatable("ddnnf").create_from(PrologString(program)))
+        with self.assertRaises(Exception):
+            Circuit(c.node_type, c.child_ptr, c.child_index, c.leaf_slot, [("c", len(c))], [])
+
+        formula = get_evaluatable("ddnnf").create_from(PrologString(program))
+        formula.add_constraint(TrueConstraint(1))
+        with self.assertRaises(Exception):
+            Circuit.from_formula(formula)
+
+        formula = get_evaluatable("ddnnf").create_from(PrologString(program))
+        weights = formula.get_weights()
+        weights[0] = 0.5
+        formula.set_weights(weights)
+        with self.assertRaises(Exception):
+            Circuit.from_formula(formula)
@@ -0,0 +1,60 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+class TestCli(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.requests = os.path.join(self.directory.name, "requests.json")
+        with open(self.requests, "w") as f:
+            json.dump([{"query": "smokes(1)", "evidence": {"stress(4)": True}}, {"query": "asthma(3)"}], f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _run(self, *options):
+        return subprocess.run([sys.executable, "slproblog.py", os.path.join("examples", "friends_and_smokers.slpl")]
+                              + list(options), cwd=ROOT, capture_output=True, text=True, timeout=300)
+
+    def test_conditional(self):
+        res = self._run("--conditional", self.requests)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        lines = [json.loads(line) for line in res.stdout.splitlines()]
+        self.assertEqual([r["query"] for r in lines], ["smokes(1)", "asthma(3)"])
+        self.assertEqual(lines[0]["evidence"], {"stress(4)": True})
+
+    def test_conditional_ignored_options(self):
+        for options in (["--time-budget", "10"], ["--memory-budget", "500"], ["--size-budget", "1000"],
+                        ["--vacuous-fallback"], ["--adaptive-precision", "30"], ["--low-memory"]):
+            res = self._run("--conditional", self.requests, *options)
+            self.assertEqual(res.returncode, 2, options)
+            self.assertIn("--conditional cannot be combined", res.stderr)
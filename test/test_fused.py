@@ -0,0 +1,62 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+from problog import get_evaluatable
+from problog.program import PrologString
+from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.fused import fused_label
+
+
+class TestFused(TestCase):
+
+    def setUp(self):
+        self.program = """
+%s::stress.
+%s::smokes :- stress.
+%s::smokes.
+evidence(smokes, true).
+query(stress).
+query(smokes).
+"""
+        self.labels = [(0.3, "w(0.2,0.5,0.3,0.5)"), (0.4, "w(0.3,0.5,0.2,0.5)"), (0.2, "w(0.1,0.6,0.3,0.5)")]
+
+    def _program(self, label):
+        return self.program % tuple(label(p, w) for p, w in self.labels)
+
+    def test_probability(self):
+        fused = SLProbLog(self._program(fused_label)).run_fused()
+        real = get_evaluatable().create_from(PrologString(self._program(lambda p, w: p))).evaluate()
+        for k, v in real.items():
+            self.assertAlmostEqual(fused[str(k)].probability, v, 12)
+
+    def test_sl(self):
+        fused = SLProbLog(self._program(fused_label)).run_fused()
+        sl = SLProbLog(self._program(lambda p, w: w), True).run_SL()
+        for k in sl:
+            self.assertEqual(fused[k].opinion, sl[k])
+
+    def test_beta(self):
+        fused = SLProbLog(self._program(fused_label)).run_fused()
+        beta = SLProbLog(self._program(lambda p, w: w)).run_beta()
+        for k in beta:
+            self.assertEqual(repr(fused[k].beta), repr(beta[k]))
@@ -0,0 +1,49 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+from SLProbLog.SLProbLog import SLProbLog
+from benchmark.generators import friends_and_smokers, random_network, chain
+from benchmark.suite import run_suite
+
+
+class TestGenerators(TestCase):
+
+    def test_smokers(self):
+        r = SLProbLog(friends_and_smokers(3, seed=1)).run_beta()
+        self.assertEqual(len(r), 5)
+
+    def test_network(self):
+        self.assertEqual(random_network(6, 2, seed=1), random_network(6, 2, seed=1))
+        self.assertTrue(len(SLProbLog(random_network(6, 2, seed=1)).run_beta()) > 0)
+
+    def test_chain(self):
+        r = SLProbLog(chain(4)).run_beta()
+        self.assertEqual(list(r), ["c3"])
+
+    def test_suite_chain(self):
+        records = run_suite(["chain"], [2], modes=("SL", "beta"))
+        self.assertEqual([r["backend"] for r in records if r["mode"] == "SL"], ["ddnnf"])
+        self.assertFalse(any("error" in r for r in records))
+        with self.assertRaises(ZeroDivisionError):
+            run_suite(["chain"], [2], modes=("SL",), backend="sdd")
+        self.assertTrue("error" in run_suite(["chain"], [2], modes=("SL",), backend="sdd", keep_going=True)[0])
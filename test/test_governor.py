@@ -0,0 +1,124 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+import functools
+import os
+import signal
+import threading
+import time
+import warnings
+
+from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.backends import BackendSelector
+from SLProbLog.parser import SLProbLogSyntaxError
+from SLProbLog.governor import Budget, supervise, vacuous, Cancelled, TimeBudgetExceeded, MemoryBudgetExceeded, \
+    SizeBudgetExceeded
+
+
+class TestGovernor(TestCase):
+
+    def setUp(self):
+        self.program = """
+w(0.2,0.5,0.3,0.5)::stress.
+w(0.3,0.5,0.2,0.5)::smokes :- stress.
+evidence(smokes, true).
+query(stress).
+"""
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.large = f.read()
+
+    def test_within_budget(self):
+        p = SLProbLog(self.program, True, budget=Budget(time=60, memory=2 ** 30, size=1000))
+        self.assertEqual(p.run_SL(), SLProbLog(self.program, True).run_SL())
+        self.assertTrue("compile_time" in p.stats)
+
+    def test_time(self):
+        start = time.perf_counter()
+        with self.assertRaises(TimeBudgetExceeded):
+            supervise(lambda: time.sleep(30), Budget(time=0.5))
+        self.assertTrue(time.perf_counter() - start < 10)
+
+    def test_memory(self):
+        with self.assertRaises(MemoryBudgetExceeded):
+            supervise(lambda: len(bytearray(2 ** 31)), Budget(memory=2 ** 26))
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        with self.assertRaises(Cancelled):
+            # the timer thread is running: the function is pickled for a forkserver or spawned child
+            supervise(functools.partial(time.sleep, 30), Budget(), cancel)
+
+    def test_error(self):
+        with self.assertRaises(ZeroDivisionError):
+            supervise(lambda: 1 / 0, Budget())
+        with self.assertRaises(SLProbLogSyntaxError):
+            SLProbLog("w(0.2,0.5)::a. query(a).", budget=Budget(time=60)).run_SL()
+
+    def test_killed(self):
+        for memory in (None, 2 ** 30):
+            with self.assertRaisesRegex(Exception, "killed by signal SIGKILL") as raised:
+                supervise(lambda: os.kill(os.getpid(), signal.SIGKILL), Budget(memory=memory))
+            self.assertNotIsInstance(raised.exception, MemoryBudgetExceeded)
+
+    def test_size(self):
+        with self.assertRaises(SizeBudgetExceeded):
+            SLProbLog(self.large, budget=Budget(size=10)).run_beta()
+
+    def test_fallback(self):
+        p = SLProbLog(self.large, True, budget=Budget(size=10), fallback=vacuous)
+        res = p.run_SL()
+        self.assertEqual(res["smokes(1)"], [0, 0, 1, 0.5])
+        self.assertEqual(len(res), 7)
+        self.assertTrue("fallback" in p.stats)
+
+    def test_fallback_nonground(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            res = vacuous(self.program + "query(p(X)).\n", "SL", True, None)
+        self.assertEqual(list(res), ["stress"])
+        self.assertIn("p(X)", str(caught[0].message))
+
+    def test_auto_selection(self):
+        selector = BackendSelector(backends=("ddnnf",))
+        p = SLProbLog(self.program, True, backend="auto", selector=selector, budget=Budget(time=60))
+        expected = p.run_SL()
+        self.assertEqual(len(selector._choices), 1)
+        # no backend is left to try, the selection made in the first child must be used
+        selector._backends = ()
+        self.assertEqual(p.run_SL(), expected)
+        self.assertEqual(p.stats["backend"], "ddnnf")
+
+    def test_threads(self):
+        results = []
+
+        def work():
+            with self.assertRaisesRegex(Exception, "other threads are running .*MainThread"):
+                supervise(lambda: 1, Budget())
+            p = SLProbLog(self.program, True, budget=Budget(time=60, size=1000))
+            results.append(p.run_SL())
+
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+        self.assertEqual(results, [SLProbLog(self.program, True).run_SL()])
@@ -0,0 +1,112 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+from itertools import product
+from string import Template
+
+from problog import get_evaluatable
+from problog.program import PrologString
+
+from experiment.experimental_setting import Graph
+
+
+class TestGraph(TestCase):
+
+    def setUp(self):
+        self.net = Graph()
+        for parent in ("1", "2", "3"):
+            self.net.add_edge([parent, "4"])
+        self.net.add_edge(["4", "5"])
+        # n5 (whose CPT rows are all 0.5) is evidence and must not depend on n4
+        self.net.set_encoding("5", "table")
+        self.leak = 0.9
+        self.weights = [0.3, 0.6, 0.8]
+
+    def _cpt(self, program, values4):
+        """
+        :param values4: parameters of the CPT of n4
+        :return: dictionary from the values of the parents of n4 to the probability of n4
+        """
+        nodes = self.net.getNodes()
+        params = {}
+        for n, p in self.net.semanticsprobs.items():
+            for i, k in enumerate(p if isinstance(p, list) else [p]):
+                params[k] = values4[i] if n is nodes["4"] else 0.5
+
+        cpt = {}
+        for values in product((False, True), repeat=3):
+            evidence = dict(params)
+            for n, e in self.net.semanticsevidences.items():
+                evidence[e] = "true" if n is nodes["5"] or values[int(n.get_name()) - 1] else "false"
+            res = get_evaluatable().create_from(PrologString(Template(program).substitute(evidence))).evaluate()
+            cpt[values] = [v for k, v in res.items() if str(k) == "n4"][0]
+        return cpt
+
+    def _check(self, cpt, expected):
+        for values in expected:
+            self.assertAlmostEqual(cpt[values], expected[values], 10)
+
+    def test_table(self):
+        self.assertEqual(self.net.get_problog_string().count("::n4 :-"), 8)
+
+    def test_noisy_or(self):
+        program = self.net.get_problog_string("noisy-or")
+        self.assertEqual(program.count("::n4"), 4)
+
+        expected = {}
+        for values in product((False, True), repeat=3):
+            q = 1 - self.leak
+            for w, v in zip(self.weights, values):
+                q *= (1 - w) if v else 1
+            expected[values] = 1 - q
+        self._check(self._cpt(program, [self.leak] + self.weights), expected)
+
+    def test_noisy_and(self):
+        program = self.net.get_problog_string("noisy-and")
+        expected = {values: 0 for values in product((False, True), repeat=3)}
+        expected[(True, True, True)] = self.leak * self.weights[0] * self.weights[1] * self.weights[2]
+        self._check(self._cpt(program, [self.leak] + self.weights), expected)
+
+    def test_tree(self):
+        rows = {values: ("a" if values[1] else ("b" if values[0] else "a")) for values in
+                product((False, True), repeat=3)}
+        self.net.set_encoding("4", "tree", rows)
+        program = self.net.get_problog_string()
+        self.assertEqual(program.count("::n4"), 3)
+        self.assertEqual(len(self.net.semanticsprobs[self.net.getNodes()["4"]]), 2)
+
+        expected = {values: 0.7 if rows[values] == "a" else 0.2 for values in rows}
+        self._check(self._cpt(program, [0.7, 0.2]), expected)
+
+    def test_tree_default(self):
+        program = self.net.get_problog_string("tree")
+        self.assertEqual(program.count("::n4 :-"), 8)
+        values4 = [0.1 * (i + 1) for i in range(8)]
+        expected = {values: values4[i] for i, values in enumerate(product((False, True), repeat=3))}
+        self._check(self._cpt(program, values4), expected)
+
+    def test_invalid(self):
+        with self.assertRaises(Exception):
+            self.net.set_encoding("4", "tree", {(True, True, True): "a"})
+        with self.assertRaises(Exception):
+            self.net.set_encoding("4", "noisy-xor")
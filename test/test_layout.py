@@ -0,0 +1,116 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+from multiprocessing import Pool
+import os
+import subprocess
+import sys
+import tempfile
+
+from SLProbLog.SLProbLog import SLProbLog, BetaSemiring
+from SLProbLog.circuit import Circuit
+from SLProbLog.montecarlo import run_montecarlo
+
+
+def _worker_mean(name):
+    with Circuit.attach(name) as circuit:
+        return {k: v.mean for k, v in run_montecarlo(circuit, 100, seed=0).items()}
+
+
+class TestLayout(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.circuit = SLProbLog(f.read()).export_circuit()
+
+    def _same(self, other):
+        for name in ("node_type", "child_ptr", "child_index", "leaf_slot"):
+            self.assertEqual(getattr(other, name).tolist(), getattr(self.circuit, name).tolist())
+        semiring = BetaSemiring()
+        self.assertEqual(dict(other.evaluate(semiring)), dict(self.circuit.evaluate(semiring)))
+
+    def test_buffer(self):
+        buffer = self.circuit.to_buffer()
+        self.assertEqual(len(buffer), self.circuit.nbytes())
+        self._same(Circuit.from_buffer(bytes(buffer)))
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "circuit.bin")
+            self.circuit.save(filename)
+            loaded = Circuit.load(filename)
+            self._same(loaded)
+            self.assertFalse(loaded.child_index.flags.writeable)
+            loaded.close()
+            self.assertIsNone(loaded.child_index)
+
+    def test_shared_memory(self):
+        block = self.circuit.share()
+        try:
+            expected = _worker_mean(block.name)
+            with Pool(2) as pool:
+                for result in pool.map(_worker_mean, [block.name] * 2):
+                    self.assertEqual(result, expected)
+        finally:
+            block.close()
+            block.unlink()
+
+    def test_close(self):
+        block = self.circuit.share()
+        try:
+            circuit = Circuit.attach(block.name)
+            self._same(circuit)
+            circuit.close()
+            # detached: the block has no other user in this process
+            self.assertTrue(circuit._buffer is None)
+        finally:
+            block.close()
+            block.unlink()
+
+    def test_independent_process(self):
+        # a process that multiprocessing did not start from this one has its own resource tracker, which must not
+        # unlink the block when that process exits
+        block = self.circuit.share()
+        try:
+            script = "from SLProbLog.circuit import Circuit\n" \
+                     "with Circuit.attach(%r) as c:\n    print(len(c))\n" % block.name
+            root = os.path.join(os.path.dirname(__file__), "..")
+            child = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True,
+                                   timeout=60)
+            self.assertEqual(child.stdout.strip(), str(len(self.circuit)))
+            self.assertFalse("leaked" in child.stderr, child.stderr)
+            with Circuit.attach(block.name) as circuit:
+                self._same(circuit)
+        finally:
+            block.close()
+            block.unlink()
+
+    def test_not_a_circuit(self):
+        with self.assertRaises(Exception):
+            Circuit.from_buffer(bytes(64))
+
+    def test_version(self):
+        buffer = self.circuit.to_buffer()
+        buffer[8] += 1
+        with self.assertRaisesRegex(Exception, "version 2, expected 1"):
+            Circuit.from_buffer(bytes(buffer))
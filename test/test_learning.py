@@ -0,0 +1,89 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import random
+from unittest import TestCase
+
+import numpy
+
+from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.circuit import ArraySemiring
+from SLProbLog.learning import Learner, parametrize
+from SLProbLog.parser import iter_annotations
+
+
+class TestLearning(TestCase):
+
+    def setUp(self):
+        self.program = """
+w(0.2,0.2,0.6,0.5)::stress(X) :- person(X).
+b(0.5,0.05)::smokes(X) :- stress(X).
+person(1). person(2).
+"""
+        rng = random.Random(0)
+        self.examples = []
+        for _ in range(1000):
+            e = {}
+            for x in (1, 2):
+                stress = rng.random() < 0.3
+                e["smokes(%d)" % x] = stress and rng.random() < 0.8
+                if rng.random() < 0.5:
+                    e["stress(%d)" % x] = stress
+            self.examples.append(e)
+
+    def test_parametrize(self):
+        program, annotations = parametrize(self.program)
+        self.assertIn("lfi(0)::stress(X)", program)
+        self.assertIn("lfi(1)::smokes(X)", program)
+        self.assertEqual([a.functor for a in annotations], ["w", "b"])
+
+    def test_gradients(self):
+        learner = Learner(self.program, self.examples[:50])
+        circuit = learner.circuit
+        semiring = ArraySemiring()
+        literals, _ = learner._literals(learner._observations)
+        values = circuit.propagate(semiring, literals)
+        z = circuit.root_value(values, literals)
+        grads = circuit.gradients(literals, values)
+        for s, k in enumerate(circuit.slot_node.tolist()):
+            pos = literals[s][0]
+            expected = circuit.query(semiring, k, values, list(literals), z)[0]
+            numpy.testing.assert_allclose(numpy.broadcast_to(pos * grads[s][0], (50,)), expected)
+
+    def test_recovers_parameters(self):
+        result = SLProbLog(self.program).learn(self.examples, batch_size=300)
+        self.assertEqual(result.discarded, 0)
+        stress, smokes = result.opinions
+        self.assertAlmostEqual(float(stress[0] + stress[2] * stress[3]), 0.3, 1)
+        self.assertAlmostEqual(float(smokes[0] + smokes[2] * smokes[3]), 0.8, 1)
+        self.assertEqual([a.functor for a in iter_annotations(result.program)], ["w", "b"])
+
+    def test_batches(self):
+        a = Learner(self.program, self.examples, batch_size=1000).expected_counts()
+        b = Learner(self.program, self.examples, batch_size=7).expected_counts()
+        numpy.testing.assert_allclose(a[0], b[0])
+        numpy.testing.assert_allclose(a[2], b[2])
+
+    def test_impossible_example(self):
+        examples = [{"person(1)": False}, {"smokes(1)": True}]
+        result = Learner(self.program, examples).run(max_iterations=1)
+        self.assertEqual(result.discarded, 1)
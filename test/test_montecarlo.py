@@ -0,0 +1,68 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+import numpy
+from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.montecarlo import sample_weights
+
+
+class TestMonteCarlo(TestCase):
+
+    def setUp(self):
+        self.smallprogram = """
+b(0.6, 0.0002)::asthma(X) :- smokes(X).
+smokes(bill).
+query(asthma(bill)).
+"""
+        self.evidenceprogram = """
+b(0.3, 0.01)::stress.
+b(0.4, 0.01)::smokes :- stress.
+b(0.2, 0.01)::smokes.
+evidence(smokes, true).
+query(stress).
+"""
+
+    def test_moments(self):
+        r = SLProbLog(self.smallprogram).run_montecarlo(20000, seed=0)["asthma(bill)"]
+        self.assertAlmostEqual(r.mean, 0.6, 2)
+        self.assertAlmostEqual(r.variance, 0.0002, 4)
+        self.assertTrue(r.quantiles[0.05] < 0.6 < r.quantiles[0.95])
+
+    def test_evidence(self):
+        p = SLProbLog(self.evidenceprogram)
+        mc = p.run_montecarlo(20000, seed=0)["stress"]
+        beta = p.run_beta()["stress"]
+        self.assertAlmostEqual(mc.mean, float(beta.mean()), 1)
+
+    def test_seed(self):
+        p = SLProbLog(self.evidenceprogram)
+        self.assertEqual(p.run_montecarlo(100, seed=3)["stress"].mean, p.run_montecarlo(100, seed=3)["stress"].mean)
+
+    def test_constants(self):
+        # constants spelled differently from BetaSemiring.one(), directly or converted from an opinion
+        for label in ("b(1.0, 1e-9)", "w(1.0,0,0,0.5)"):
+            circuit = SLProbLog(self.smallprogram.replace("smokes(bill).", "%s::smokes(bill)." % label)).export_circuit()
+            weights = sample_weights(circuit, 10, numpy.random.default_rng(0))
+            constants = [w for w in weights if isinstance(w[0], float)]
+            self.assertEqual(len(constants), len(weights) - 1)
+            self.assertTrue((1.0, 0.0) in constants)
@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+from SLProbLog.parser import convert_labels, iter_annotations, SLProbLogSyntaxError
+
+
+class TestParser(TestCase):
+
+    def setUp(self):
+        self.program = """% w(0.1,0.1,0.8,0.5)::ignored.
+b(0.6, 0.0002)::asthma(X) :-
+    smokes(X).
+/* b(0.1,0.1)::ignored. */
+w(0.3,0.5,0.2,0.5)::stress(X) :- person(X), X \\= 'a::b'.
+smokes(bill).
+query(asthma(bill)).
+"""
+
+    def test_annotations(self):
+        annotations = list(iter_annotations(self.program))
+        self.assertEqual([a.functor for a in annotations], ["b", "w"])
+        self.assertEqual((annotations[0].line, annotations[0].column), (2, 1))
+        self.assertEqual((annotations[1].line, annotations[1].column), (5, 1))
+
+    def test_to_sl(self):
+        converted = convert_labels(self.program, to_sl=True)
+        self.assertTrue("w(0.599166,0.399166,0.00166806,0.5)::asthma(X) :-\n    smokes(X)." in converted)
+        self.assertTrue("% w(0.1,0.1,0.8,0.5)::ignored." in converted)
+        self.assertTrue("w(0.3,0.5,0.2,0.5)::stress(X) :- person(X), X \\= 'a::b'." in converted)
+
+    def test_to_beta(self):
+        converted = convert_labels(self.program, to_beta=True)
+        self.assertTrue("b(0.6, 0.0002)::asthma(X)" in converted)
+        self.assertTrue("/* b(0.1,0.1)::ignored. */" in converted)
+        self.assertFalse("w(0.3,0.5,0.2,0.5)" in converted)
+
+    def test_annotated_disjunction(self):
+        converted = convert_labels("b(0.6,0.0002)::a; b(0.3,0.0001)::b.", to_sl=True)
+        self.assertEqual(converted.count("w("), 2)
+
+    def test_error_position(self):
+        with self.assertRaises(SLProbLogSyntaxError) as cm:
+            convert_labels("a.\n  w(0.1,0.2)::b.", to_beta=True)
+        self.assertEqual((cm.exception.line, cm.exception.column), (2, 3))
+
+    def test_unknown_label(self):
+        with self.assertRaises(SLProbLogSyntaxError):
+            convert_labels("0.3::a.", to_sl=True)
+
+    def test_unterminated(self):
+        with self.assertRaises(SLProbLogSyntaxError):
+            convert_labels("b(0.6,0.0002)::a :- (b", to_sl=True)
+
+    def test_pass_through(self):
+        program = "w(0.3,0.5,0.2,0.5)::a.\nw(1,0,0,0.5)::b :- a.\nquery(b).\n"
+        self.assertIs(convert_labels(program, to_sl=True), program)
+        # the arguments are only parsed when read
+        annotation = list(iter_annotations("w(0.3,x,0.2,0.5)::a."))[0]
+        with self.assertRaises(SLProbLogSyntaxError):
+            annotation.args
+        self.assertEqual(list(iter_annotations(program))[1].args, [1, 0, 0, 0.5])
@@ -0,0 +1,99 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import asyncio
+import os
+import threading
+from unittest import TestCase
+
+from SLProbLog.SLProbLog import SLProbLog, BetaDistribution
+from SLProbLog.pool import InferencePool
+
+
+class TestPool(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.program = f.read()
+        self.illconditioned = """
+w(0.1,0.1,0.8,1e-11)::x.
+w(0.06,0.61,0.33,0.5)::y.
+q :- x.
+q :- y.
+query(q).
+"""
+
+    def test_conditioning_does_not_mutate(self):
+        x = BetaDistribution(0, 0.001)
+        x.conditioning(BetaDistribution(0.5, 0.01))
+        self.assertEqual(x.mean(), 0)
+
+    def test_threads(self):
+        def run(program, adaptive):
+            return str(SLProbLog(program, True, backend="ddnnf", adaptive_precision=adaptive).run_SL())
+
+        jobs = [(self.program, None), (self.illconditioned, 50)] * 4
+        expected = [run(*j) for j in jobs]
+        results = [None] * len(jobs)
+
+        def work(i):
+            results[i] = run(*jobs[i])
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(len(jobs))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, expected)
+
+    def test_async(self):
+        async def main():
+            async with InferencePool(max_workers=2, max_pending=2) as pool:
+                return await asyncio.gather(*[pool.run_beta(self.program) for _ in range(4)])
+
+        expected = str(SLProbLog(self.program).run_beta())
+        for res in asyncio.run(main()):
+            self.assertEqual(str(res), expected)
+
+    def test_cancel(self):
+        async def main():
+            async with InferencePool(max_workers=1, max_pending=1) as pool:
+                first = asyncio.ensure_future(pool.run(self.program, "SL", sloutput=True))
+                second = asyncio.ensure_future(pool.run(self.program))
+                await asyncio.sleep(0)
+                second.cancel()
+                res, stats = await first
+                with self.assertRaises(asyncio.CancelledError):
+                    await second
+                return res, stats
+
+        res, stats = asyncio.run(main())
+        self.assertEqual(len(res["smokes(1)"]), 4)
+        self.assertIn("compile_time", stats)
+
+    def test_unknown_mode(self):
+        async def main():
+            async with InferencePool(max_workers=1) as pool:
+                await pool.run(self.program, "exact")
+
+        with self.assertRaises(Exception):
+            asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from unittest import TestCase
+import os
+
+import mpmath
+
+from SLProbLog.SLProbLog import SLProbLog
+from SLProbLog.precision import AdaptiveSLSemiring
+
+
+class TestPrecision(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "examples", "friends_and_smokers.slpl")) as f:
+            self.program = f.read()
+        self.illconditioned = """
+w(0.2,0.1,0.7,0.99999999999)::a.
+w(0.3,0.1,0.6,0.99999999999)::b.
+q :- a, b.
+query(q).
+"""
+
+    def _close(self, one, two):
+        self.assertEqual(one.keys(), two.keys())
+        for k in one:
+            for x, y in zip(one[k], two[k]):
+                self.assertAlmostEqual(float(x), float(y), 10)
+
+    def test_same_as_mpmath(self):
+        for run in ("run_SL", "run_beta"):
+            p = SLProbLog(self.program, True, backend="ddnnf", adaptive_precision=30)
+            self._close(getattr(p, run)(), getattr(SLProbLog(self.program, True, backend="ddnnf"), run)())
+            self.assertEqual(p.stats["escalated_nodes"], 0)
+
+    def test_escalation(self):
+        p = SLProbLog(self.illconditioned, True, backend="ddnnf", adaptive_precision=50)
+        b = p.run_SL()["q"][0]
+        self.assertTrue(p.stats["escalated_nodes"] > 0)
+
+        with mpmath.workdps(50):
+            a = 1 - mpmath.mpf("1e-11")
+            expected = mpmath.mpf("0.06") + mpmath.mpf("0.33") * a / (1 + a)
+        self.assertTrue(abs(b - expected) < 1e-14)
+
+    def test_float_operations(self):
+        s = AdaptiveSLSemiring()
+        x = s.value("w(0.2,0.5,0.3,0.5)")
+        self.assertEqual(s.times(x, s.one()), x)
+        self.assertEqual(s.plus(s.zero(), x), x)
+        self.assertFalse(s.is_escalated(s.times(x, x)))
+        self.assertEqual(s.escalations, 0)
+
+    def test_low_memory(self):
+        with self.assertRaises(Exception):
+            SLProbLog(self.program, low_memory=True, adaptive_precision=30)
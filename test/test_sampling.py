@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+from experiment.experimental_setting import DistProbLog, Experiment, ProbProblog
+from experiment.sampling import HaltonDraws, draws
+
+TEMPLATE = """
+${p1}::stress.
+${p2}::smokes.
+asthma :- stress, smokes.
+query(asthma).
+query(stress).
+"""
+
+
+class TestSampling(TestCase):
+
+    def setUp(self):
+        self.template = TEMPLATE
+
+    def test_halton(self):
+        sequence = HaltonDraws(3, seed=0)
+        points = numpy.array([sequence.next() for _ in range(512)])
+        self.assertTrue(numpy.all((points >= 0) & (points < 1)))
+        # the product of independent uniforms has expectation 1/4
+        self.assertAlmostEqual(numpy.mean(points[:, 0] * points[:, 2]), 0.25, 2)
+        self.assertTrue(abs(numpy.mean(points[:, 1]) - 0.5) < 0.005)
+
+    def test_seed(self):
+        for kind in ("crn", "halton"):
+            a, b = draws(kind, 4, seed=3), draws(kind, 4, seed=3)
+            self.assertEqual(a.next().tolist(), b.next().tolist())
+        self.assertIsNone(draws("random", 4))
+        with self.assertRaises(Exception):
+            draws("latin", 4)
+
+    def test_start(self):
+        for kind in ("crn", "halton"):
+            a, b = draws(kind, 4, seed=3), draws(kind, 4, seed=3, start=2)
+            a.next()
+            a.next()
+            self.assertEqual(a.next().tolist(), b.next().tolist())
+        with self.assertRaises(Exception):
+            draws("sobol", 4, start=2)
+
+    def test_quasi_dim(self):
+        mixed = draws("halton", 30, seed=3, quasi_dim=2)
+        halton = HaltonDraws(2, seed=3)
+        points = numpy.array([mixed.next() for _ in range(64)])
+        self.assertEqual(points.shape, (64, 30))
+        self.assertEqual(points[1, :2].tolist(), [halton.next().tolist() for _ in range(2)][1])
+        # the other coordinates are independent draws, not ramps
+        self.assertTrue(abs(numpy.corrcoef(points[:-1, 20], points[1:, 20])[0, 1]) < 0.5)
+
+    def test_draws(self):
+        b = ProbProblog(self.template, draws=[0.2, 0.7])
+        self.assertEqual(b.getProbabilities(), {"p1": 0.2, "p2": 0.7})
+        sb = DistProbLog(b, 3, draws=[[0.1, 0.3, 0.5], [0.1, 0.9, 0.5]])
+        self.assertEqual(sb.samples, {"p1": [1, 0, 0], "p2": [1, 0, 1]})
+
+    def _experiment(self, directory):
+        e = Experiment()
+        e.setup(os.path.join(directory, "test"), self.template, Nmonte=1, Nnetworks=40, sampleBeta=[5, 10], bn=False,
+                backend="ddnnf")
+        return e
+
+    def test_early_stopping(self):
+        with tempfile.TemporaryDirectory() as directory:
+            e = self._experiment(directory)
+            e.run(precision=0.5, draws="halton", min_runs=4, seed=1)
+            self.assertEqual(e._runs, 4)
+            self.assertEqual(len(e._vec_real), 4)
+            self.assertEqual(len(e._vec_sl), 8)
+            self.assertTrue(max(e._halfwidths.values()) <= 0.5)
+
+    def test_no_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            e = self._experiment(directory)
+            e.setup(os.path.join(directory, "test"), self.template, Nmonte=1, Nnetworks=0, sampleBeta=[5], bn=False,
+                    backend="ddnnf")
+            e.run(draws="halton", seed=1, store=False)
+            self.assertEqual(e._runs, 0)
+
+    def test_all_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            e = self._experiment(directory)
+            e.setup(os.path.join(directory, "test"), self.template, Nmonte=1, Nnetworks=3, sampleBeta=[5], bn=False,
+                    backend="ddnnf")
+            e.run(draws="crn", fused=True, seed=1)
+            self.assertEqual(e._runs, 3)
+            self.assertEqual(len(e._vec_sl_beta), 3)
+            self.assertIsNone(e._halfwidths)
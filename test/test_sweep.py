@@ -0,0 +1,105 @@
+"""
+Copyright (c) 2018 Federico Cerutti <CeruttiF@cardiff.ac.uk>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+from unittest import TestCase
+
+from experiment.experimental_setting import Experiment
+from experiment.sweep import SweepQueue
+from test.test_sampling import TEMPLATE
+
+
+def _work(path):
+    return SweepQueue(path).work()
+
+
+class TestSweep(TestCase):
+
+    def setUp(self):
+        self.template = TEMPLATE
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "queue.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _submit(self, queue, **options):
+        return queue.submit("sweep", self.template, Nmonte=1, Nnetworks=7, sampleBeta=[5], bn=False,
+                            backend="ddnnf", shard_size=3, seed=2, **options)
+
+    def test_submit(self):
+        queue = SweepQueue(self.path)
+        self.assertEqual(self._submit(queue), 3)
+        self.assertEqual(self._submit(queue), 3)
+        self.assertEqual(queue.status(), {"sweep": {"pending": 3, "claimed": 0, "done": 0}})
+        with self.assertRaises(Exception):
+            queue.merge("sweep")
+
+    def test_deterministic(self):
+        queue = SweepQueue(self.path)
+        self._submit(queue)
+        self.assertEqual(queue.work(limit=1), 1)
+        self.assertEqual(queue.work(), 2)
+        self.assertEqual(queue.status(), {"sweep": {"pending": 0, "claimed": 0, "done": 3}})
+        merged = queue.merge("sweep")
+        self.assertEqual(len(merged._vec_real), 7)
+        self.assertEqual(len(merged._vec_sl), 7)
+        merged.analise()
+
+        other = SweepQueue(os.path.join(self.directory.name, "other.sqlite"))
+        self._submit(other)
+        other.work()
+        self.assertEqual(repr(other.merge("sweep")._vec_sl), repr(merged._vec_sl))
+        self.assertEqual(merged._vec_real, other.merge("sweep")._vec_real)
+
+    def test_whole(self):
+        queue = SweepQueue(self.path)
+        self._submit(queue, draws="halton")
+        queue.work()
+        e = Experiment()
+        e.setup("sweep", self.template, 1, 7, [5], False, backend="ddnnf")
+        e.run(draws="halton", seed=2, store=False)
+        merged = queue.merge("sweep")
+        self.assertEqual(merged._vec_real, e._vec_real)
+        self.assertEqual(repr(merged._vec_sl), repr(e._vec_sl))
+
+    def test_concurrent_workers(self):
+        queue = SweepQueue(self.path)
+        self._submit(queue, draws="random")
+        with Pool(3) as pool:
+            self.assertEqual(sum(pool.map(_work, [self.path] * 3)), 3)
+        self.assertEqual(len(queue.merge("sweep")._vec_sl_beta), 7)
+
+    def test_lease(self):
+        queue = SweepQueue(self.path, lease=0.05)
+        self._submit(queue, fused=True)
+        name, shard, start, stop, seed, config = queue.claim("crashed")
+        self.assertEqual((shard, start, stop), (0, 0, 3))
+        self.assertEqual(queue.claim("other")[1], 1)
+        time.sleep(0.1)
+        self.assertEqual(queue.claim("other")[1], 0)
+
+        self.assertTrue(queue.commit(name, shard, {"real": [], "sl": [], "sl_beta": []}))
+        self.assertFalse(queue.commit(name, shard, {"real": [], "sl": [], "sl_beta": []}))